@@ -0,0 +1,101 @@
+"""
+Time ``import smartdc`` in fresh interpreters, and check that it stays lazy.
+
+Run from the repository root::
+
+    python benchmarks/import_time.py [--runs N] [--max-ms MS]
+
+Each run starts a new interpreter, so that nothing is already imported. The
+baseline is an interpreter that imports nothing; the overhead of importing
+smartdc is the difference of the medians. Exits non-zero if the import
+loads any of the heavy modules, or if the overhead exceeds `--max-ms`.
+"""
+from __future__ import print_function
+import os
+import sys
+import json
+import time
+import subprocess
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules a bare ``import smartdc`` must not load
+HEAVY_MODULES = ('requests', 'http_signature', 'smartdc.datacenter',
+                 'smartdc.machine', 'smartdc.network', 'smartdc.tef',
+                 'smartdc.legacy', 'subprocess')
+
+CHECK = ("import sys, json, smartdc; "
+         "print(json.dumps(sorted(m for m in {0!r} if m in sys.modules)))"
+         .format(HEAVY_MODULES))
+
+
+def run(code):
+    # keep the caller's PYTHONPATH, from which the dependencies may come
+    path = os.environ.get('PYTHONPATH')
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1',
+               PYTHONPATH=os.pathsep.join([ROOT, path]) if path else ROOT)
+    start = time.time()
+    output = subprocess.check_output([sys.executable, '-c', code], env=env,
+        cwd=ROOT)
+    return time.time() - start, output
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def measure(runs=20):
+    """
+    :Returns: a :py:class:`dict` of the median ``startup_ms`` of a bare
+        interpreter, and ``import_ms`` and ``full_ms`` for ``import smartdc``
+        and ``from smartdc import DataCenter`` beyond it, and the heavy
+        modules ``loaded`` by ``import smartdc``
+    """
+    run('import smartdc')  # warm the filesystem cache
+    baseline = median([run('pass')[0] for _ in range(runs)])
+    bare = median([run('import smartdc')[0] for _ in range(runs)])
+    full = median([run('from smartdc import DataCenter')[0]
+                   for _ in range(runs)])
+    return {
+        'startup_ms': baseline * 1000,
+        'import_ms': (bare - baseline) * 1000,
+        'full_ms': (full - baseline) * 1000,
+        'loaded': json.loads(run(CHECK)[1].decode('utf-8')),
+    }
+
+
+def main():
+    parser = OptionParser(usage='%prog [--runs N] [--max-ms MS]')
+    parser.add_option('--runs', type='int', default=20,
+        help='interpreters to start for each measurement (default: 20)')
+    parser.add_option('--max-ms', type='float', default=50,
+        help='largest acceptable overhead in milliseconds (default: 50)')
+    options, _ = parser.parse_args()
+
+    result = measure(options.runs)
+    startup = result['startup_ms']
+    print('interpreter startup:            {0:8.1f} ms'.format(startup))
+    print('import smartdc:                 {0:8.1f} ms (+{1:.1f} ms)'.format(
+        startup + result['import_ms'], result['import_ms']))
+    print('from smartdc import DataCenter: {0:8.1f} ms (+{1:.1f} ms)'.format(
+        startup + result['full_ms'], result['full_ms']))
+
+    failed = False
+    if result['loaded']:
+        print('FAIL: import smartdc loaded {0}'.format(
+            ', '.join(result['loaded'])))
+        failed = True
+    if result['import_ms'] > options.max_ms:
+        print('FAIL: import smartdc took more than {0} ms'.format(
+            options.max_ms))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+Measure end-to-end client throughput against a local CloudAPI stand-in.
+
+Run from the repository root::
+
+    python benchmarks/suite.py [--output results.json] [--baseline base.json]
+
+Each scenario starts a :py:class:`smartdc.fakeapi.FakeCloudAPI` and drives
+it through the client, recording operations and requests per second and the
+p50/p95/p99 request latencies (from a
+:py:class:`smartdc.hooks.LatencyCollector`). Results are written as JSON;
+given a `--baseline` of earlier results, any scenario whose throughput fell,
+or whose p95 latency rose, by more than `--tolerance` is reported, and the
+run exits non-zero. Record a baseline before a change, and compare after::
+
+    python benchmarks/suite.py --output before.json
+    python benchmarks/suite.py --baseline before.json
+
+The server adds no latency unless asked (`--latency`), so that the numbers
+reflect the cost of the client itself; the server shares the process, so
+compare only runs made on the same machine.
+"""
+from __future__ import print_function
+import os
+import sys
+import json
+import time
+import platform
+from optparse import OptionParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from smartdc import (FakeCloudAPI, AsyncDataCenter, TefDataCenter,
+                     LatencyCollector, Histogram, Urllib3Transport)
+
+import import_time
+
+SCENARIOS = []
+
+# metrics compared with a baseline, and whether higher values are better
+COMPARED = (('ops_per_sec', True), ('p95_ms', False), ('import_ms', False))
+
+
+def scenario(func):
+    """
+    Register a scenario, run in the order of registration.
+    """
+    SCENARIOS.append(func)
+    return func
+
+
+class Run(object):
+    """
+    A measured run of a scenario: a DataCenter connected to the stand-in,
+    whose requests are collected, and a count of `operations`.
+    """
+    def __init__(self, api, cls=None, **kwargs):
+        self.api = api
+        self.collector = LatencyCollector()
+        self.datacenter = api.datacenter(cls=cls, hooks=[self.collector],
+            **kwargs)
+        self.operations = 0
+        self.start = None
+        self.seconds = None
+
+    def __enter__(self):
+        self.collector.reset()
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.seconds = time.time() - self.start
+
+    def result(self):
+        """
+        :Returns: the measurements of the run
+        :rtype: :py:class:`dict`
+        """
+        stats = self.collector.endpoints.values()
+        latency = Histogram(self.collector.buckets)
+        for s in stats:
+            h = s['latency']
+            latency.counts = [a + b for a, b in zip(latency.counts, h.counts)]
+            latency.count += h.count
+            latency.sum += h.sum
+            latency.max = max(latency.max, h.max)
+        return {
+            'seconds': self.seconds,
+            'operations': self.operations,
+            'ops_per_sec': self.operations / self.seconds,
+            'requests': latency.count,
+            'requests_per_sec': latency.count / self.seconds,
+            'errors': sum(s['errors'] for s in stats),
+            'p50_ms': (latency.quantile(0.5) or 0) * 1000,
+            'p95_ms': (latency.quantile(0.95) or 0) * 1000,
+            'p99_ms': (latency.quantile(0.99) or 0) * 1000,
+        }
+
+
+def listing(machines):
+    def list_machines(options):
+        with FakeCloudAPI(machines=machines, latency=options.latency,
+                seed=0) as api:
+            run = Run(api)
+            rounds = max(1, min(options.rounds, 100000 // machines))
+            with run:
+                for _ in range(rounds):
+                    run.operations += len(run.datacenter.machines())
+            return run.result()
+    list_machines.__name__ = 'list_%dk' % (machines // 1000)
+    list_machines.__doc__ = 'machines() over %d machines, in machines' % (
+        machines)
+    return list_machines
+
+for machines in (1000, 10000, 100000):
+    scenario(listing(machines))
+
+
+@scenario
+def create_burst(options):
+    """create_machine() from 10 threads at once, in machines"""
+    with FakeCloudAPI(latency=options.latency, seed=0) as api:
+        run = Run(api, cls=AsyncDataCenter, workers=10)
+        with run:
+            pending = [run.datacenter.create_machine_async(name='m%d' % i)
+                       for i in range(options.rounds * 10)]
+            for result in pending:
+                result.get()
+                run.operations += 1
+        run.datacenter.close()
+        return run.result()
+
+
+@scenario
+def poll_until(options):
+    """poll_until('running') on freshly created machines, in waits"""
+    delay = 0.2
+    with FakeCloudAPI(latency=options.latency, transition_delay=delay,
+            seed=0) as api:
+        run = Run(api)
+        machines = [run.datacenter.create_machine(name='m%d' % i)
+                    for i in range(min(options.rounds, 20))]
+        with run:
+            for machine in machines:
+                machine.poll_until('running', interval=0.02)
+                run.operations += 1
+        return run.result()
+
+
+@scenario
+def metadata_churn(options):
+    """set, read and delete a metadata key, in rounds"""
+    with FakeCloudAPI(latency=options.latency, seed=0) as api:
+        run = Run(api)
+        machine = run.datacenter.create_machine(name='m')
+        with run:
+            for i in range(options.rounds * 10):
+                machine.update_metadata(key=str(i))
+                machine.get_metadata()
+                machine.delete_metadata_at_key('key')
+                run.operations += 1
+        return run.result()
+
+
+@scenario
+def tag_churn(options):
+    """add, read and delete a tag, in rounds"""
+    with FakeCloudAPI(latency=options.latency, seed=0) as api:
+        run = Run(api)
+        machine = run.datacenter.create_machine(name='m')
+        with run:
+            for i in range(options.rounds * 10):
+                machine.add_tags(role=str(i))
+                machine.get_tag('role')
+                machine.delete_tag('role')
+                run.operations += 1
+        return run.result()
+
+
+@scenario
+def inbound_rules(options):
+    """add, disable and delete a TEF inbound rule, in rounds"""
+    with FakeCloudAPI(latency=options.latency, transition_delay=0,
+            seed=0) as api:
+        run = Run(api, cls=TefDataCenter)
+        network = run.datacenter.create_network('bench', '10.0.0.0/24')
+        with run:
+            for i in range(options.rounds * 10):
+                rule = network.add_inbound_rule('rule%d' % i, 8000 + i,
+                    '10.0.0.10')
+                network.set_inbound_rule_status(rule['id'], False)
+                network.delete_inbound_rule(rule['id'])
+                run.operations += 1
+        return run.result()
+
+
+def transport_get(name):
+    def get(options):
+        api = FakeCloudAPI(latency=options.latency, seed=0)
+        if name != 'memory':
+            api.start()  # else the DataCenter reaches it in memory
+        try:
+            kwargs = {}
+            if name == 'urllib3':
+                kwargs['transport'] = Urllib3Transport()
+            run = Run(api, http_cache=False, **kwargs)
+            with run:
+                for _ in range(options.rounds * 100):
+                    run.datacenter.request('GET', 'packages')
+                    run.operations += 1
+            return run.result()
+        finally:
+            api.stop()
+    get.__name__ = 'get_' + name
+    get.__doc__ = 'GET /my/packages through the %s transport, in requests' % (
+        name)
+    return get
+
+for name in ('requests', 'urllib3', 'memory'):
+    scenario(transport_get(name))
+
+
+@scenario
+def import_smartdc(options):
+    """import smartdc in fresh interpreters, in milliseconds"""
+    return import_time.measure(runs=options.rounds)
+
+
+def compare(results, baseline, tolerance):
+    """
+    :Returns: a line describing each regression of `results` from
+        `baseline`
+    :rtype: :py:class:`list` of :py:class:`str`\s
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED:
+            if not before.get(metric) or metric not in result:
+                continue
+            change = (result[metric] - before[metric]) / before[metric]
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append('{0}: {1} {2:.1f} -> {3:.1f} '
+                    '({4:+.0%})'.format(name, metric, before[metric],
+                    result[metric], change))
+    return regressions
+
+
+def main():
+    parser = OptionParser(usage='%prog [options] [scenario ...]',
+        description='Scenarios: ' + ', '.join(f.__name__ for f in SCENARIOS))
+    parser.add_option('--output', metavar='FILE',
+        help='write the results as JSON to FILE')
+    parser.add_option('--baseline', metavar='FILE',
+        help='compare with the results in FILE, failing on regressions')
+    parser.add_option('--tolerance', type='float', default=0.2,
+        help='largest acceptable change from the baseline (default: 0.2)')
+    parser.add_option('--rounds', type='int', default=10,
+        help='repetitions in each scenario (default: 10)')
+    parser.add_option('--latency', type='float', default=0,
+        help='seconds the server waits before each response (default: 0)')
+    options, names = parser.parse_args()
+    unknown = set(names) - set(f.__name__ for f in SCENARIOS)
+    if unknown:
+        parser.error('unknown scenario ' + ', '.join(sorted(unknown)))
+
+    results = {}
+    for func in SCENARIOS:
+        if names and func.__name__ not in names:
+            continue
+        results[func.__name__] = result = func(options)
+        if 'ops_per_sec' in result:
+            print('{0:<16} {1:10.1f} ops/s {2:8.1f} req/s   p50 {3:6.2f} ms  '
+                'p95 {4:6.2f} ms  p99 {5:6.2f} ms'.format(func.__name__,
+                result['ops_per_sec'], result['requests_per_sec'],
+                result['p50_ms'], result['p95_ms'], result['p99_ms']))
+        else:
+            print('{0:<16} {1}'.format(func.__name__, json.dumps(result,
+                sort_keys=True)))
+        sys.stdout.flush()
+
+    report = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'options': {'rounds': options.rounds, 'latency': options.latency},
+        'scenarios': results,
+    }
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)['scenarios']
+        regressions = compare(results, baseline, options.tolerance)
+        for line in regressions:
+            print('REGRESSION: ' + line)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,83 @@
-from .datacenter import *
-from .machine import *
-from .legacy import LegacyDataCenter
-from .network import *
-from .tef import *
-
-from ._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
+import sys
+from types import ModuleType
+
+# Nothing is imported until first used: ``import smartdc`` stays cheap for
+# short-lived scripts, and each submodule (along with its dependencies, such
+# as requests and http_signature) is loaded on first access to one of the
+# names it provides.
+all_by_module = {
+    'smartdc.datacenter':   ['DataCenter', 'KNOWN_LOCATIONS',
+                             'DEFAULT_LOCATION'],
+    'smartdc.asyncdc':      ['AsyncDataCenter'],
+    'smartdc.multidc':      ['MultiDataCenter'],
+    'smartdc.probe':        ['LocationProbe'],
+    'smartdc.machine':      ['Machine', 'Snapshot', 'MACHINE_TRANSITIONS'],
+    'smartdc.legacy':       ['LegacyDataCenter'],
+    'smartdc.network':      ['Network'],
+    'smartdc.watcher':      ['FleetWatcher'],
+    'smartdc.waiter':       ['Waiter', 'OperationTimeout',
+                             'UnexpectedTransition', 'time_limit', 'time_left'],
+    'smartdc.throttle':     ['TokenBucket', 'THROTTLE_STATUSES'],
+    'smartdc.breaker':      ['CircuitBreaker', 'CircuitOpen'],
+    'smartdc.hedge':        ['HedgePolicy', 'HEDGED_METHODS'],
+    'smartdc.hooks':        ['RequestHook', 'RequestEvent', 'VerboseHook',
+                             'LatencyCollector', 'Histogram', 'path_template'],
+    'smartdc.metrics':      ['MetricsCollector'],
+    'smartdc.retry':        ['RetryPolicy', 'RetryBudget', 'IDEMPOTENT_METHODS',
+                             'RETRY_STATUSES'],
+    'smartdc.fakeapi':      ['FakeCloudAPI'],
+    'smartdc.cassette':     ['Cassette', 'CassetteMiss'],
+    'smartdc.keys':         ['KeyCache'],
+    'smartdc.transport':    ['Transport', 'RequestsTransport',
+                             'Urllib3Transport', 'MemoryTransport'],
+    'smartdc.tef':          ['TefDataCenter', 'TELEFONICA_LOCATIONS',
+                             'ACENS_LOCATIONS'],
+}
+
+# ``from smartdc import *`` provides only the names it did before imports
+# became lazy; the others load on attribute access alone
+star_exports = ('DataCenter', 'KNOWN_LOCATIONS', 'DEFAULT_LOCATION',
+                'Machine', 'Snapshot', 'LegacyDataCenter', 'Network',
+                'TefDataCenter', 'TELEFONICA_LOCATIONS', 'ACENS_LOCATIONS')
+
+object_origins = {}
+for module, items in all_by_module.items():
+    for item in items:
+        object_origins[item] = module
+
+
+class module(ModuleType):
+    """Automatically import objects from the modules."""
+
+    def __getattr__(self, name):
+        if name in object_origins:
+            module = __import__(object_origins[name], None, None, [name])
+            for extra_name in all_by_module[module.__name__]:
+                setattr(self, extra_name, getattr(module, extra_name))
+            return getattr(module, name)
+        elif name == '__version__':
+            from ._version import get_versions
+            self.__version__ = get_versions()['version']
+            return self.__version__
+        return ModuleType.__getattribute__(self, name)
+
+    def __dir__(self):
+        result = list(object_origins)
+        result.extend(('__file__', '__path__', '__doc__', '__all__',
+                       '__name__', '__package__', '__version__'))
+        return result
+
+
+# keep a reference to this module so that it's not garbage collected
+old_module = sys.modules['smartdc']
+
+# setup the new module and patch it into the dict of loaded modules
+new_module = sys.modules['smartdc'] = module('smartdc')
+new_module.__dict__.update({
+    '__file__':         __file__,
+    '__package__':      'smartdc',
+    '__path__':         __path__,
+    '__doc__':          __doc__,
+    '__all__':          star_exports,
+    '_old_module':      old_module,
+})
@@ -0,0 +1,139 @@
+import time
+from multiprocessing.pool import ThreadPool
+
+from .datacenter import DataCenter
+from .waiter import time_limit, time_left
+
+__all__ = ['AsyncDataCenter']
+
+DEFAULT_WORKERS = 10
+
+
+class AsyncDataCenter(DataCenter):
+    """
+    A :py:class:`smartdc.datacenter.DataCenter` that can also issue its
+    requests without blocking the caller.
+
+    Each ``*_async`` method (and :py:meth:`submit`) queues the corresponding
+    blocking call on a bounded pool of worker threads, and immediately
+    returns a :py:class:`multiprocessing.pool.AsyncResult`. The result's
+    ``get([timeout])`` method waits for and returns the value of the blocking
+    call, or re-raises its exception; ``ready()`` and ``wait([timeout])``
+    allow polling. All the blocking methods remain available and unchanged,
+    and the worker threads share the DataCenter's pooled keep-alive session,
+    so any number of operations may be queued while at most `workers`
+    requests are on the wire at once.
+    """
+    def __init__(self, *args, **kwargs):
+        """
+        :param workers: maximum number of requests in flight at once
+            (default: 10)
+        :type workers: :py:class:`int`
+
+        All other parameters are as for
+        :py:class:`smartdc.datacenter.DataCenter`. It is advisable to keep
+        `workers` within `pool_maxsize` so that every worker keeps a
+        connection alive.
+        """
+        self.workers = kwargs.pop('workers', DEFAULT_WORKERS)
+        self._pool = None
+        super(AsyncDataCenter, self).__init__(*args, **kwargs)
+
+    @property
+    def pool(self):
+        """
+        The :py:class:`multiprocessing.pool.ThreadPool` running the queued
+        calls, started on first use.
+        """
+        if self._pool is None:
+            self._pool = ThreadPool(self.workers)
+        return self._pool
+
+    def close(self):
+        """
+        Wait for the queued calls to complete, and stop the worker threads.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def datacenter(self, name, cls=None):
+        """
+        :Returns: a new :py:class:`AsyncDataCenter` (or `cls`) for the
+            location `name`, as with
+            :py:meth:`smartdc.datacenter.DataCenter.datacenter`, queueing its
+            calls on this one's worker threads (so that closing either stops
+            them for both)
+        """
+        dc = super(AsyncDataCenter, self).datacenter(name,
+            cls=cls or type(self))
+        if isinstance(dc, AsyncDataCenter):
+            dc.workers = self.workers
+            dc._pool = self.pool
+        return dc
+
+    def submit(self, func, *args, **kwargs):
+        """
+        :param func: any callable, typically a bound method of a
+            :py:class:`smartdc.machine.Machine`,
+            :py:class:`smartdc.machine.Snapshot` or
+            :py:class:`smartdc.network.Network` belonging to this DataCenter
+
+        :Returns: a handle on the eventual result of ``func(*args, **kwargs)``
+        :rtype: :py:class:`multiprocessing.pool.AsyncResult`
+
+        Queue an arbitrary blocking call on the worker threads, e.g.
+        ``dc.submit(machine.stop)`` or ``dc.submit(machine.resize, 'g3-large')``.
+        A call submitted within a :py:func:`smartdc.waiter.time_limit` runs
+        within the same limit, counted from the time of submission.
+        """
+        left = time_left()
+        if left is not None:
+            finish = time.time() + left
+            call = func
+
+            def func(*args, **kwargs):
+                with time_limit(finish - time.time()):
+                    return call(*args, **kwargs)
+        return self.pool.apply_async(func, args, kwargs)
+
+    def request_async(self, method, path, headers=None, data=None, **kwargs):
+        """
+        Non-blocking :py:meth:`smartdc.datacenter.DataCenter.request`.
+
+        :rtype: :py:class:`multiprocessing.pool.AsyncResult` of a tuple of
+            decoded response body & `Response` object
+        """
+        return self.submit(self.request, method, path, headers=headers,
+            data=data, **kwargs)
+
+    def raw_machine_data_async(self, machine_id, credentials=False):
+        """
+        Non-blocking :py:meth:`smartdc.datacenter.DataCenter.raw_machine_data`.
+
+        :rtype: :py:class:`multiprocessing.pool.AsyncResult` of a
+            :py:class:`dict`
+        """
+        return self.submit(self.raw_machine_data, machine_id,
+            credentials=credentials)
+
+    def machines_async(self, **kwargs):
+        """
+        Non-blocking :py:meth:`smartdc.datacenter.DataCenter.machines`,
+        accepting the same keyword arguments.
+
+        :rtype: :py:class:`multiprocessing.pool.AsyncResult` of a
+            :py:class:`list` of :py:class:`smartdc.machine.Machine`\s
+        """
+        return self.submit(self.machines, **kwargs)
+
+    def create_machine_async(self, **kwargs):
+        """
+        Non-blocking :py:meth:`smartdc.datacenter.DataCenter.create_machine`,
+        accepting the same keyword arguments.
+
+        :rtype: :py:class:`multiprocessing.pool.AsyncResult` of a
+            :py:class:`smartdc.machine.Machine`
+        """
+        return self.submit(self.create_machine, **kwargs)
@@ -0,0 +1,203 @@
+import time
+import threading
+from collections import deque
+
+from requests.exceptions import RequestException
+
+__all__ = ['CircuitBreaker', 'CircuitOpen', 'CLOSED', 'OPEN', 'HALF_OPEN']
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpen(RequestException):
+    """
+    Raised at once, without any request being sent, while the circuit of
+    the location requested is open.
+    """
+    pass
+
+
+class Circuit(object):
+    """
+    The state of the circuit of one location.
+    """
+    def __init__(self, window):
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window)
+        self.opened = None
+        self.trials = 0
+
+
+class CircuitBreaker(object):
+    """
+    A thread-safe circuit breaker for each location (by base URL), so that
+    requests to a failing CloudAPI fail at once rather than each waiting for
+    its timeout, e.g.::
+
+        breaker = CircuitBreaker(error_rate=0.5, slow_call=5, cooldown=30)
+        sdc = DataCenter(..., circuit_breaker=breaker)
+
+    Each location's circuit starts `closed`, and counts the outcomes of the
+    last `window` attempts. An attempt fails if it raises a connection error
+    or a timeout, if its response has a 5xx status, or if it takes longer
+    than `slow_call` seconds. Once at least `min_requests` outcomes are
+    counted, of which at least `error_rate` are failures, the circuit
+    `opens`: attempts then raise :py:class:`CircuitOpen` without being sent.
+    After `cooldown` seconds, it turns `half-open`, letting through up to
+    `trials` attempts at a time: a success closes it again, and a failure
+    opens it for another `cooldown`.
+
+    A breaker may be shared by any number of DataCenters (those derived
+    via :py:meth:`smartdc.datacenter.DataCenter.datacenter` share it), and
+    the state of each attempt's circuit, and its changes, are reported to
+    their hooks (see :py:meth:`smartdc.hooks.RequestHook.circuit`).
+    """
+    def __init__(self, error_rate=0.5, slow_call=None, window=20,
+            min_requests=10, cooldown=30, trials=1):
+        """
+        :param error_rate: fraction of failed attempts at which a circuit
+            opens
+        :type error_rate: :py:class:`float`
+
+        :param slow_call: seconds beyond which an attempt counts as failed,
+            even if it succeeds (default: none)
+        :type slow_call: :py:class:`float`
+
+        :param window: number of latest attempts counted for each location
+        :type window: :py:class:`int`
+
+        :param min_requests: number of attempts counted before a circuit may
+            open
+        :type min_requests: :py:class:`int`
+
+        :param cooldown: seconds for which a circuit stays open
+        :type cooldown: :py:class:`float`
+
+        :param trials: attempts let through at a time by a half-open circuit
+        :type trials: :py:class:`int`
+        """
+        self.error_rate = error_rate
+        self.slow_call = slow_call
+        self.window = window
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.trials = trials
+        self.circuits = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<{module}.{cls}: {n} open>'.format(module=self.__module__,
+            cls=self.__class__.__name__, n=sum(1 for state in
+            self.states().values() if state != CLOSED))
+
+    def _circuit(self, url):
+        circuit = self.circuits.get(url)
+        if circuit is None:
+            circuit = self.circuits[url] = Circuit(self.window)
+        return circuit
+
+    def state(self, url):
+        """
+        :Returns: the state of the circuit of the location at `url`:
+            :py:data:`CLOSED`, :py:data:`OPEN` or :py:data:`HALF_OPEN`
+        :rtype: :py:class:`str`
+        """
+        with self._lock:
+            circuit = self.circuits.get(url)
+            return circuit.state if circuit else CLOSED
+
+    def states(self):
+        """
+        :Returns: mapping of the base URL of each location seen to the
+            state of its circuit
+        :rtype: :py:class:`dict`
+        """
+        with self._lock:
+            return dict((url, circuit.state)
+                        for url, circuit in self.circuits.items())
+
+    def allow(self, url):
+        """
+        Ask to send an attempt to the location at `url`, turning its circuit
+        half-open if its `cooldown` has passed.
+
+        :Returns: the circuit's state before and after, and whether the
+            attempt may be sent (in which case its outcome must be
+            :py:meth:`record`\ed, or the attempt :py:meth:`release`\d)
+        :rtype: :py:class:`tuple` of :py:class:`str`, :py:class:`str` and
+            :py:class:`bool`
+        """
+        with self._lock:
+            circuit = self._circuit(url)
+            previous = circuit.state
+            if (circuit.state == OPEN and
+                    time.time() - circuit.opened >= self.cooldown):
+                circuit.state = HALF_OPEN
+                circuit.trials = 0
+            allowed = circuit.state == CLOSED
+            if circuit.state == HALF_OPEN and circuit.trials < self.trials:
+                circuit.trials += 1
+                allowed = True
+            return previous, circuit.state, allowed
+
+    def record(self, url, failed, duration=None):
+        """
+        Count the outcome of an attempt allowed by :py:meth:`allow`.
+
+        :param failed: whether the attempt failed
+        :type failed: :py:class:`bool`
+
+        :param duration: seconds the attempt took
+        :type duration: :py:class:`float`
+
+        :Returns: the circuit's state before and after
+        :rtype: :py:class:`tuple` of two :py:class:`str`\s
+        """
+        if (self.slow_call is not None and duration is not None and
+                duration > self.slow_call):
+            failed = True
+        with self._lock:
+            circuit = self._circuit(url)
+            previous = circuit.state
+            if circuit.state == HALF_OPEN:
+                circuit.trials -= 1
+                if failed:
+                    self._open(circuit)
+                else:
+                    circuit.state = CLOSED
+                    circuit.outcomes.clear()
+            elif circuit.state == CLOSED:
+                circuit.outcomes.append(failed)
+                counted = len(circuit.outcomes)
+                if (counted >= self.min_requests and sum(circuit.outcomes) >=
+                        self.error_rate * counted):
+                    self._open(circuit)
+            return previous, circuit.state
+
+    def release(self, url):
+        """
+        Give up an attempt allowed by :py:meth:`allow` without counting any
+        outcome, such as one abandoned before it was sent, so that a
+        half-open circuit lets another trial through.
+        """
+        with self._lock:
+            circuit = self.circuits.get(url)
+            if circuit is not None and circuit.state == HALF_OPEN:
+                circuit.trials = max(0, circuit.trials - 1)
+
+    def _open(self, circuit):
+        circuit.state = OPEN
+        circuit.opened = time.time()
+        circuit.outcomes.clear()
+
+    def reset(self, url=None):
+        """
+        Close the circuit of the location at `url`, or of every location.
+        """
+        with self._lock:
+            if url is None:
+                self.circuits.clear()
+            else:
+                self.circuits.pop(url, None)
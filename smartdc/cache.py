@@ -0,0 +1,316 @@
+import json
+import time
+import threading
+from copy import deepcopy
+from collections import OrderedDict
+
+__all__ = ['HTTPCache', 'TTLCache', 'SingleFlight', 'CATALOG_PATHS']
+
+CATALOG_PATHS = ('datasets', 'packages', 'images', 'networks', 'keys',
+                 'datacenters')
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class HTTPCache(object):
+    """
+    A bounded, least-recently-used store of GET responses, kept for
+    revalidation with the server.
+
+    Responses carrying an ``ETag`` or ``Last-Modified`` header are kept, and
+    a later GET of the same URL and query parameters is sent with the
+    corresponding ``If-None-Match`` or ``If-Modified-Since`` header. When the
+    server answers ``304 Not Modified``, the stored body is used instead of
+    downloading it again. Only the raw body is stored, so that each caller
+    receives a freshly decoded copy.
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, paths=CATALOG_PATHS):
+        """
+        :param max_bytes: total size of the stored bodies, beyond which the
+            least recently used are evicted
+        :type max_bytes: :py:class:`int`
+
+        :param paths: leading path segments (relative to the `login` path) of
+            the resources to cache; ``None`` caches any GET
+        :type paths: :py:class:`tuple` of :py:class:`basestring`\s
+        """
+        self.max_bytes = max_bytes
+        self.paths = paths
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def accepts(self, method, path):
+        """
+        Whether a request for `path` is eligible for caching.
+        """
+        if method != 'GET':
+            return False
+        return self.paths is None or path.split('/', 1)[0] in self.paths
+
+    @staticmethod
+    def key(url, params=None):
+        """
+        The cache key for a `url` requested with query `params`.
+        """
+        return (url, json.dumps(params or {}, sort_keys=True))
+
+    def validators(self, key):
+        """
+        :Returns: the conditional request headers for the stored response
+        :rtype: :py:class:`dict`
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def lookup(self, key):
+        """
+        :Returns: the stored ``(content, content_type)`` for `key`, marking it
+            as recently used, or ``None``
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._entries[key] = entry
+            return (entry['content'], entry['content_type'])
+
+    def store(self, key, resp):
+        """
+        Keep a successful response if it carries a validator, evicting the
+        least recently used entries beyond `max_bytes`.
+        """
+        etag = resp.headers.get('etag')
+        last_modified = resp.headers.get('last-modified')
+        if resp.status_code != 200 or not (etag or last_modified):
+            return
+        content = resp.content
+        if len(content) > self.max_bytes:
+            return
+        entry = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content': content,
+            'content_type': resp.headers.get('content-type'),
+        }
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, key=None):
+        """
+        Forget the response stored for `key`, or all responses.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self.size = 0
+            else:
+                self._discard(key)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry['content'])
+
+
+class TTLCache(object):
+    """
+    An in-process memo of decoded lookups, each kept for a maximum age.
+
+    Entries are grouped by `kind` (such as ``'packages'``), each with its own
+    maximum age, and may be invalidated a kind at a time. Values are copied
+    in and out, so that callers may freely modify what they receive. An
+    entry found expired is discarded, and beyond `max_entries` the least
+    recently used are evicted, so that lookups by many different keys do
+    not grow the cache without bound.
+    """
+    def __init__(self, ttl=300, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param ttl: maximum age in seconds of every entry, or a mapping of
+            kinds to maximum ages (kinds absent from the mapping are not
+            cached)
+        :type ttl: :py:class:`float` or :py:class:`dict`
+
+        :param max_entries: number of entries kept, beyond which the least
+            recently used are evicted
+        :type max_entries: :py:class:`int`
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def max_age(self, kind):
+        """
+        :Returns: the maximum age in seconds of entries of this `kind`
+        """
+        if isinstance(self.ttl, dict):
+            return self.ttl.get(kind, 0)
+        return self.ttl
+
+    def fetch(self, kind, key, compute):
+        """
+        :param kind: the group to which the entry belongs
+        :type kind: :py:class:`basestring`
+
+        :param key: hashable identifier of the entry within its kind
+
+        :param compute: called to produce the value when no fresh entry is
+            held
+        :type compute: callable
+
+        :Returns: a copy of the fresh value held for `key`, or of the newly
+            computed one
+        """
+        max_age = self.max_age(kind)
+        if not max_age:
+            return compute()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop((kind, key), None)
+            if entry is not None and now - entry[0] < max_age:
+                # keep it, as the most recently used
+                self._entries[(kind, key)] = entry
+            else:
+                entry = None
+        if entry is not None:
+            return deepcopy(entry[1])
+        value = compute()
+        entry = (now, deepcopy(value))
+        with self._lock:
+            self._entries.pop((kind, key), None)
+            self._entries[(kind, key)] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, kind=None):
+        """
+        Forget all entries of the given `kind`, or all entries.
+        """
+        with self._lock:
+            if kind is None:
+                self._entries.clear()
+            else:
+                for k in [k for k in self._entries if k[0] == kind]:
+                    del self._entries[k]
+
+
+class _Flight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+        self.waiting = 0
+        self.copies = []
+
+
+class SingleFlight(object):
+    """
+    Merges concurrent identical calls into one: while a call for a key is
+    in progress, callers asking for the same key wait for it and share its
+    outcome, rather than each making the call.
+
+    The first caller receives the value itself and each of the others a
+    (by default deep) copy, made before any caller is handed its value, so
+    that each may freely modify what it receives; if the call raises, every
+    caller raises the same exception, except for an
+    :py:class:`smartdc.waiter.OperationTimeout`, which may be due to the
+    first caller's own time limit: the others then make the call again
+    (one of them for all the rest), each within its own time. Nothing is
+    kept once the call completes, so a later call is made afresh.
+
+    :var merged: number of calls saved by joining one already in progress
+    """
+    def __init__(self):
+        self.merged = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._flights)
+
+    def do(self, key, compute, timeout=None, copy=deepcopy):
+        """
+        :param key: hashable identifier of the call
+
+        :param compute: makes the call
+        :type compute: callable
+
+        :param timeout: seconds for which to wait on a call in progress
+        :type timeout: :py:class:`float`
+
+        :param copy: makes the copy of the value given to each caller but
+            the first
+        :type copy: callable
+
+        :Returns: the value of the call, or a copy of it
+        :raises: whatever the call raised (short of another caller's
+            timeout), or :py:class:`smartdc.waiter.OperationTimeout` if the
+            `timeout` passes while waiting
+        """
+        from .waiter import OperationTimeout
+        finish = timeout is not None and time.time() + timeout
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                else:
+                    self.merged += 1
+                    flight.waiting += 1
+            if leader:
+                break
+            wait = None if timeout is None else max(finish - time.time(), 0)
+            if not flight.done.wait(wait):
+                raise OperationTimeout('no response to a request in progress '
+                    'after %.1fs' % timeout)
+            if isinstance(flight.error, OperationTimeout):
+                # the call ran out of its caller's time, not necessarily of
+                # this one's, so make it afresh
+                with self._lock:
+                    self.merged -= 1
+                continue
+            if flight.error is not None:
+                raise flight.error
+            return flight.copies.pop()
+        value = None
+        try:
+            value = compute()
+            return value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                waiting = flight.waiting
+            # no one may join once the flight is removed, so each caller
+            # waiting receives a copy made before the first can modify it
+            try:
+                if flight.error is None:
+                    flight.copies = [copy(value) for _ in xrange(waiting)]
+            except Exception as e:
+                flight.error = e
+            finally:
+                flight.done.set()
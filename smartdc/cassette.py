@@ -0,0 +1,356 @@
+import os
+import gzip
+import json
+import time
+import threading
+from datetime import timedelta
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.exceptions import RequestException
+from requests.structures import CaseInsensitiveDict
+
+from .transport import Transport, RequestsTransport, build_response
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+__all__ = ['Cassette', 'CassetteMiss', 'SCRUBBED']
+
+SCRUBBED = '<scrubbed>'
+
+# request headers kept in a cassette, for reference only: the signature
+# (Authorization) and its Date are never written
+REQUEST_HEADERS = ('x-api-version', 'content-type', 'if-none-match',
+                   'if-modified-since')
+
+# request headers by which recorded requests are told apart: a request with
+# validators may have been answered 304 Not Modified, which must never be
+# replayed to one without
+VALIDATOR_HEADERS = ('if-none-match', 'if-modified-since')
+
+# response headers not worth keeping, as they describe the connection or
+# the encoding of a body that is stored decoded
+DROPPED_HEADERS = frozenset(['date', 'server', 'connection', 'keep-alive',
+                             'content-length', 'transfer-encoding',
+                             'content-encoding', 'set-cookie'])
+
+# keys whose values in request and response bodies are secrets
+SECRET_KEYS = frozenset(['credentials', 'password', 'root_pw', 'admin_pw',
+                         'private_key', 'secret'])
+
+
+class CassetteMiss(RequestException):
+    """
+    Raised upon a request that a replaying :py:class:`Cassette` did not
+    record.
+    """
+    pass
+
+
+def scrub(value):
+    """
+    :Returns: a copy of a decoded JSON `value` with every secret (such as
+        the ``credentials`` of a machine listed with ``credentials=True``)
+        replaced by :py:data:`SCRUBBED`
+    """
+    if isinstance(value, dict):
+        return dict((k, SCRUBBED if k.lower() in SECRET_KEYS or
+                     k.lower().endswith('_pw') else scrub(v))
+                    for k, v in value.items())
+    if isinstance(value, list):
+        return [scrub(v) for v in value]
+    return value
+
+
+def scrub_body(body):
+    """
+    :Returns: a request or response `body` as text, exactly as sent unless
+        it is JSON holding secrets, which are scrubbed
+    """
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    try:
+        decoded = json.loads(body)
+    except ValueError:
+        return body
+    scrubbed = scrub(decoded)
+    if scrubbed == decoded:
+        return body
+    return json.dumps(scrubbed, sort_keys=True, separators=(',', ':'))
+
+
+def request_key(method, url, body, headers=None):
+    """
+    :Returns: the key by which a recorded request is found again: its
+        method, path and query (whatever the host, so that a cassette
+        recorded against one server replays against another), its
+        scrubbed body, in a canonical form if JSON, and its cache validators
+        (see :py:data:`VALIDATOR_HEADERS`) among the `headers`
+    """
+    parts = urlsplit(url)
+    query = '&'.join(sorted(parts.query.split('&'))) if parts.query else ''
+    body = scrub_body(body)
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True)
+    except (TypeError, ValueError):
+        pass
+    headers = dict((k.lower(), v) for k, v in (headers or {}).items())
+    validators = tuple(headers.get(name) for name in VALIDATOR_HEADERS)
+    return (method.upper(), parts.path, query, body, validators)
+
+
+class Cassette(object):
+    """
+    Records the HTTP exchanges of DataCenters to a file, and replays them
+    later without any network, e.g.::
+
+        with Cassette('fleet.json.gz', mode='record') as cassette:
+            sdc = DataCenter(..., cassette=cassette)
+            sdc.machines()
+
+        sdc = DataCenter(..., cassette=Cassette('fleet.json.gz'))
+        sdc.machines()      # the recorded responses, byte for byte
+
+    While recording, each request is passed on to the real transport (the
+    DataCenter's session, or any other `transport` it is given), and
+    it and its response are kept, less the request's signature and any
+    secrets in either body (see :py:func:`scrub`), until :py:meth:`save`\d
+    (which closing the context does). The file holds one JSON exchange per
+    line, gzip-compressed if its name ends with ``.gz``.
+
+    While replaying, each request is answered with the next unused recorded
+    response to a request with the same method, path, query, body and cache
+    validators (so that a ``304 Not Modified`` is only replayed to a
+    conditional request for the version it validated), so that repeated
+    requests (such as polls) get their responses in the recorded order;
+    once those are used up, the last is repeated. A request
+    never recorded raises :py:class:`CassetteMiss`. Responses arrive at
+    once, or after their recorded duration multiplied by `timing`.
+
+    A cassette is thread-safe, and may be shared by any number of
+    DataCenters (those derived via
+    :py:meth:`smartdc.datacenter.DataCenter.datacenter` share it).
+    """
+    def __init__(self, path=None, mode=None, timing=0):
+        """
+        :param path: file from which to replay, or to which to record
+        :type path: :py:class:`str`
+
+        :param mode: ``'record'`` or ``'replay'`` (default: replay if the
+            file exists, else record)
+        :type mode: :py:class:`str`
+
+        :param timing: factor applied to the recorded duration of each
+            response before replaying it (default: ``0``, no delay)
+        :type timing: :py:class:`float`
+        """
+        if mode is None:
+            mode = 'replay' if path and os.path.exists(path) else 'record'
+        if mode not in ('record', 'replay'):
+            raise ValueError('mode must be record or replay, not %r' % mode)
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self.interactions = []
+        self._recorded = {}
+        self._played = {}
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            self.load()
+
+    def __repr__(self):
+        return '<{module}.{cls}: {mode} {path} ({n} exchanges)>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            mode=self.mode, path=self.path, n=len(self.interactions))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.mode == 'record' and self.path:
+            self.save()
+
+    def _open(self, mode):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode)
+        return open(self.path, mode)
+
+    def load(self):
+        """
+        Read the exchanges from the `path`, replacing any held.
+        """
+        with self._open('rb') as f:
+            interactions = [json.loads(line.decode('utf-8')) for line in f
+                            if line.strip()]
+        with self._lock:
+            self.interactions = interactions
+            self._index()
+
+    def save(self):
+        """
+        Write the exchanges held to the `path`.
+        """
+        with self._lock:
+            lines = [json.dumps(i, sort_keys=True, separators=(',', ':'))
+                     for i in self.interactions]
+        with self._open('wb') as f:
+            for line in lines:
+                f.write(line.encode('utf-8') + b'\n')
+
+    def _index(self):
+        self._recorded = {}
+        for interaction in self.interactions:
+            r = interaction['request']
+            key = request_key(r['method'], r['url'], r['body'],
+                r.get('headers'))
+            self._recorded.setdefault(key, []).append(interaction['response'])
+        self._played = {}
+
+    def session(self, session):
+        """
+        :param session: the session through which requests would be sent
+        :type session: :py:class:`requests.Session`
+
+        :Returns: a session sending requests through this cassette, and
+            (while recording) through the transports of `session`
+        :rtype: :py:class:`requests.Session`
+        """
+        if getattr(session, 'cassette', None) is self:
+            return session
+        recorder = requests.Session()
+        for prefix in ('https://', 'http://'):
+            recorder.mount(prefix, CassetteAdapter(self,
+                session.get_adapter(prefix)))
+        recorder.cassette = self
+        return recorder
+
+    def transport(self, transport):
+        """
+        :param transport: the transport through which requests would be sent
+        :type transport: :py:class:`smartdc.transport.Transport`
+
+        :Returns: a transport sending requests through this cassette, and
+            (while recording) through `transport`
+        :rtype: :py:class:`smartdc.transport.Transport`
+        """
+        if getattr(transport, 'cassette', None) is self:
+            return transport
+        if isinstance(transport, RequestsTransport):
+            session = self.session(transport.session)
+            if session is transport.session:
+                return transport
+            return RequestsTransport(session)
+        return CassetteTransport(self, transport)
+
+    def record(self, request, response, elapsed):
+        """
+        Keep an exchange made through the real transport.
+        """
+        headers = dict((k.lower(), v) for k, v in request.headers.items()
+                       if k.lower() in REQUEST_HEADERS)
+        interaction = {
+            'request': {
+                'method': request.method,
+                'url': request.url,
+                'headers': headers,
+                'body': scrub_body(request.body),
+            },
+            'response': {
+                'status': response.status_code,
+                'reason': response.reason,
+                'headers': dict((k.lower(), v)
+                                for k, v in response.headers.items()
+                                if k.lower() not in DROPPED_HEADERS),
+                'body': scrub_body(response.content),
+                'elapsed': round(elapsed, 6),
+            },
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def play(self, request):
+        """
+        :Returns: the recorded response to a request
+        :rtype: :py:class:`dict`
+        :raises: :py:class:`CassetteMiss` if there is none
+        """
+        key = request_key(request.method, request.url, request.body,
+            request.headers)
+        with self._lock:
+            responses = self._recorded.get(key)
+            if not responses:
+                raise CassetteMiss('no recorded response to %s %s' % (
+                    request.method, request.url), request=request)
+            played = self._played.get(key, 0)
+            self._played[key] = played + 1
+        return responses[min(played, len(responses) - 1)]
+
+
+class CassetteTransport(Transport):
+    """
+    A :py:class:`smartdc.transport.Transport` recording the exchanges of
+    another transport to a :py:class:`Cassette`, or replaying them.
+    """
+    def __init__(self, cassette, transport):
+        self.cassette = cassette
+        self.transport = transport
+
+    def send(self, request, timeout=None, verify=True):
+        if self.cassette.mode == 'record':
+            start = time.time()
+            status, reason, headers, content = self.transport.send(request,
+                timeout=timeout, verify=verify)
+            self.cassette.record(request, build_response(request, status,
+                reason, headers, content), time.time() - start)
+            return status, reason, headers, content
+        recorded = self.cassette.play(request)
+        if self.cassette.timing:
+            time.sleep(recorded['elapsed'] * self.cassette.timing)
+        body = recorded['body']
+        return (recorded['status'], recorded['reason'], recorded['headers'],
+                body.encode('utf-8') if body is not None else b'')
+
+    def close(self):
+        self.transport.close()
+
+
+class CassetteAdapter(BaseAdapter):
+    """
+    The transport of a :py:class:`Cassette`, recording the exchanges of a
+    real transport or replaying them.
+    """
+    def __init__(self, cassette, adapter):
+        super(CassetteAdapter, self).__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        if self.cassette.mode == 'record':
+            start = time.time()
+            response = self.adapter.send(request, **kwargs)
+            response.content  # read the body before timing the exchange
+            self.cassette.record(request, response, time.time() - start)
+            return response
+        recorded = self.cassette.play(request)
+        if self.cassette.timing:
+            time.sleep(recorded['elapsed'] * self.cassette.timing)
+        response = requests.Response()
+        response.status_code = recorded['status']
+        response.reason = recorded['reason']
+        response.headers = CaseInsensitiveDict(recorded['headers'])
+        body = recorded['body']
+        response._content = body.encode('utf-8') if body is not None else b''
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = timedelta(seconds=recorded['elapsed'])
+        return response
+
+    def close(self):
+        self.adapter.close()
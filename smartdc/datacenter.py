@@ -3,17 +3,29 @@ import sys
 import json
 from operator import itemgetter
 import re
-from datetime import datetime
+import time
+import threading
+import Queue
+from copy import deepcopy
+from multiprocessing.pool import ThreadPool
 from exceptions import FutureWarning
 from warnings import warn
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, HTTPError, Timeout
 from http_signature.requests_auth import HTTPSignatureAuth
 
 from .machine import Machine
-from ._version import get_versions
-__version__ = get_versions()['version']
-del get_versions
+from .cache import HTTPCache, TTLCache, SingleFlight
+from .throttle import TokenBucket
+from .retry import RetryPolicy
+from .hooks import RequestEvent, VerboseHook
+from .keys import KeyCache, AgentKeyAuth, fingerprint
+from .breaker import CircuitBreaker, CircuitOpen
+from .hedge import HedgePolicy
+from .transport import RequestsTransport
+from .waiter import OperationTimeout, time_limit, time_left
 
 __all__ = ['DataCenter', 'KNOWN_LOCATIONS', 'DEFAULT_LOCATION']
 
@@ -28,13 +40,67 @@ KNOWN_LOCATIONS = {
 
 DEFAULT_LOCATION = 'us-west-1'
 
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+DEFAULT_BULK_CONCURRENCY = 10
+
+DEFAULT_TIMEOUT = (10, 60)
+
+# methods whose concurrent identical requests are merged into one
+COALESCED_METHODS = frozenset(['GET', 'HEAD'])
+
 DEFAULT_HEADERS = {
     'Accept':        'application/json',
     'Content-Type':  'application/json; charset=UTF-8',
-    'User-Agent':    'py-smartdc (%s)' % __version__
 }
 
 
+_user_agent = None
+
+
+def user_agent():
+    """
+    :Returns: the ``User-Agent`` sent with every request, naming this version
+        of py-smartdc
+    """
+    # the version comes from release metadata alone: in a checkout, finding 
+    # it would run git, which has no place on the request path, so it is 
+    # "unknown" there unless ``smartdc.__version__`` was already looked up
+    global _user_agent
+    if _user_agent is None:
+        from ._version import get_versions
+        _user_agent = 'py-smartdc (%s)' % get_versions(vcs=False)['version']
+    return _user_agent
+
+
+def bounded_timeout(timeout, limit):
+    """
+    :param timeout: seconds, or a ``(connect, read)`` tuple of seconds, as
+        accepted by :py:mod:`requests`
+    
+    :param limit: seconds beyond which no timeout may extend, if any
+    :type limit: :py:class:`float`
+    
+    :Returns: the `timeout`, with each part cut down to the `limit`
+    """
+    if limit is None:
+        return timeout
+    if timeout is None:
+        return limit
+    if isinstance(timeout, tuple):
+        return tuple(limit if t is None else min(t, limit) for t in timeout)
+    return min(timeout, limit)
+
+
+def copy_result(result):
+    """
+    :Returns: a copy of a ``(decoded body, response)`` pair, for a caller 
+        sharing another's request
+    """
+    return (deepcopy(result[0]), result[1])
+
+
 def search_dicts(dicts, predicate, fields):
     matcher = re.compile(predicate, re.IGNORECASE)
     for d in dicts:
@@ -44,6 +110,41 @@ def search_dicts(dicts, predicate, fields):
             continue
 
 
+def decode_body(content, content_type):
+    """
+    :Returns: the response `content` decoded from JSON if its `content_type` 
+        says so, else the raw content, or ``None`` if empty
+    """
+    if not content:
+        return None
+    ctype = re.match('application/json(; +charset *= *([a-zA-z0-9-_]+))?',
+        content_type or '')
+    if ctype:
+        return json.loads(content, ctype.groups('utf-8')[1])
+    else:
+        return content
+
+
+def pooled_session(pool_connections=DEFAULT_POOL_CONNECTIONS, 
+        pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    """
+    :param pool_connections: number of per-host connection pools to cache
+    :type pool_connections: :py:class:`int`
+    
+    :param pool_maxsize: maximum number of connections kept alive per host
+    :type pool_maxsize: :py:class:`int`
+    
+    :Returns: a keep-alive :py:class:`requests.Session` whose adapters pool 
+        connections (and their TLS sessions) across requests
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, 
+        pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
 class DataCenter(object):
     """
     Basic connection object that makes all API requests.
@@ -58,7 +159,13 @@ class DataCenter(object):
     
     def __init__(self, location=None, key_id=None, secret='~/.ssh/id_rsa', 
                 headers=None, login=None, known_locations=None,
-                allow_agent=False, verify=True, verbose=None):
+                allow_agent=False, verify=True, verbose=None, session=None,
+                pool_connections=DEFAULT_POOL_CONNECTIONS,
+                pool_maxsize=DEFAULT_POOL_MAXSIZE, http_cache=True,
+                catalog_ttl=None, rate_limit=None, retry=True, 
+                timeout=DEFAULT_TIMEOUT, hooks=None, cassette=None, 
+                key_cache=True, coalesce=True, transport=None, 
+                circuit_breaker=None, hedge=None):
         """
         A :py:class:`smartdc.datacenter.DataCenter` object may be instantiated 
         without any parameters, but practically speaking, the `key_id` and 
@@ -92,6 +199,87 @@ class DataCenter(object):
         :param verbose: whether or not to print request URLs to stderr, overrides config
         :type verbose: :py:class:`bool`
         
+        :param session: an existing session whose connection pools to reuse
+        :type session: :py:class:`requests.Session`
+        
+        :param pool_connections: number of per-host connection pools kept by 
+            a newly created session
+        :type pool_connections: :py:class:`int`
+        
+        :param pool_maxsize: maximum number of keep-alive connections per host 
+            in a newly created session
+        :type pool_maxsize: :py:class:`int`
+        
+        :param http_cache: revalidate catalog GETs (datasets, packages, 
+            images, networks, keys and datacenters) with the server rather 
+            than re-downloading them, using a default or the given cache
+        :type http_cache: :py:class:`bool` or 
+            :py:class:`smartdc.cache.HTTPCache`
+        
+        :param catalog_ttl: seconds for which to reuse the results of 
+            :py:meth:`packages`, :py:meth:`package`, :py:meth:`datasets`, 
+            :py:meth:`dataset`, :py:meth:`images`, :py:meth:`image`, 
+            :py:meth:`networks`, :py:meth:`network` and :py:meth:`me` without 
+            any request, or a mapping of the kinds ``'packages'``, 
+            ``'datasets'``, ``'images'``, ``'networks'`` and ``'me'`` to 
+            seconds (default: no reuse)
+        :type catalog_ttl: :py:class:`float`, :py:class:`dict` or 
+            :py:class:`smartdc.cache.TTLCache`
+        
+        :param rate_limit: maximum sustained requests per second, or a 
+            (possibly shared) rate limiter
+        :type rate_limit: :py:class:`float` or 
+            :py:class:`smartdc.throttle.TokenBucket`
+        
+        :param retry: retry transient failures according to a default or the 
+            given policy
+        :type retry: :py:class:`bool` or 
+            :py:class:`smartdc.retry.RetryPolicy`
+        
+        :param timeout: default seconds to wait for each connection and each 
+            read, either as one number or a ``(connect, read)`` tuple, or 
+            ``None`` to wait forever (default: ``(10, 60)``)
+        :type timeout: :py:class:`float` or :py:class:`tuple`
+        
+        :param hooks: observers of every request, such as a 
+            :py:class:`smartdc.hooks.LatencyCollector`
+        :type hooks: :py:class:`list` of 
+            :py:class:`smartdc.hooks.RequestHook`\s
+        
+        :param cassette: record every exchange with the server to, or replay 
+            them from, a cassette
+        :type cassette: :py:class:`smartdc.cassette.Cassette`
+        
+        :param key_cache: with `allow_agent`, remember which key the server 
+            accepted for each location and login, and sign with it first, 
+            using a default or the given cache, or one kept in the file at 
+            the given path
+        :type key_cache: :py:class:`bool`, :py:class:`str` or 
+            :py:class:`smartdc.keys.KeyCache`
+        
+        :param coalesce: merge concurrent identical GET and HEAD requests 
+            into one, through a default or the given (possibly shared) 
+            :py:class:`smartdc.cache.SingleFlight`
+        :type coalesce: :py:class:`bool` or 
+            :py:class:`smartdc.cache.SingleFlight`
+        
+        :param transport: the transport through which to send requests, 
+            by way of any `cassette` (default: one sending through the 
+            `session`)
+        :type transport: :py:class:`smartdc.transport.Transport`
+        
+        :param circuit_breaker: fail requests at once while the location 
+            keeps failing, using a default or the given (possibly shared) 
+            breaker (default: none)
+        :type circuit_breaker: :py:class:`bool` or 
+            :py:class:`smartdc.breaker.CircuitBreaker`
+        
+        :param hedge: send a duplicate of a GET or HEAD request whose response 
+            is slow to arrive, and take the first response, when and as a 
+            default or the given (possibly shared) policy allows (default: 
+            never)
+        :type hedge: :py:class:`bool` or :py:class:`smartdc.hedge.HedgePolicy`
+        
         The `location` is notionally a hostname, but it may be 
         expressed as an FQDN, one of the keys to the `known_locations` dict, 
         or, as a fallback, a bare hostname as prefix to the API_HOST_SUFFIX.
@@ -101,23 +289,107 @@ class DataCenter(object):
         The `known_locations` dict allows for custom access to a private 
         cloud.
         
+        All requests go through a keep-alive `session`, so that successive 
+        calls to the same CloudAPI host reuse connections rather than 
+        performing a new TCP and TLS handshake each time. DataCenters derived 
+        via :py:meth:`datacenter` share the session (and so its pools).
+        Requests may instead go through another `transport`, such as a 
+        :py:class:`smartdc.transport.Urllib3Transport` for high request 
+        rates.
+        
         Attributes:
         
         :var location: location of the machine
         :var known_locations: :py:class:`dict` of known locations for this 
             cluster of datacenters
         :var login: user path in the SmartDC
+        :var session: :py:class:`requests.Session` making all requests
+        :var http_cache: :py:class:`smartdc.cache.HTTPCache` or ``None``
+        :var catalog_cache: :py:class:`smartdc.cache.TTLCache` or ``None``
+        :var rate_limiter: :py:class:`smartdc.throttle.TokenBucket` or 
+            ``None``
+        :var retry_policy: :py:class:`smartdc.retry.RetryPolicy` or ``None``
+        :var retry_budget: this DataCenter's own 
+            :py:class:`smartdc.retry.RetryBudget` or ``None``
+        :var hooks: :py:class:`list` of :py:class:`smartdc.hooks.RequestHook`\s 
+            called upon each request, including a 
+            :py:class:`smartdc.hooks.VerboseHook` when `verbose`
+        :var cassette: :py:class:`smartdc.cassette.Cassette` or ``None``
+        :var key_cache: :py:class:`smartdc.keys.KeyCache` or ``None``
+        :var single_flight: :py:class:`smartdc.cache.SingleFlight` or 
+            ``None``
+        :var transport: :py:class:`smartdc.transport.Transport` sending all 
+            requests
+        :var circuit_breaker: :py:class:`smartdc.breaker.CircuitBreaker` or 
+            ``None``
+        :var hedge_policy: :py:class:`smartdc.hedge.HedgePolicy` or ``None``
         """
         self.location = location or DEFAULT_LOCATION
         self.known_locations = known_locations or KNOWN_LOCATIONS
         self.verbose = verbose and sys.stderr
         self.verify = verify
+        self.session = session or pooled_session(
+            pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.cassette = cassette
+        if cassette is not None:
+            self.session = cassette.session(self.session)
+        if transport is None:
+            transport = RequestsTransport(self.session)
+        elif cassette is not None:
+            transport = cassette.transport(transport)
+        self.transport = transport
+        if http_cache is True:
+            http_cache = HTTPCache()
+        elif http_cache is False:
+            http_cache = None
+        self.http_cache = http_cache
+        if isinstance(catalog_ttl, TTLCache) or catalog_ttl is None:
+            self.catalog_cache = catalog_ttl
+        else:
+            self.catalog_cache = TTLCache(catalog_ttl)
+        if isinstance(rate_limit, TokenBucket) or rate_limit is None:
+            self.rate_limiter = rate_limit
+        else:
+            self.rate_limiter = TokenBucket(rate_limit)
+        if retry is True:
+            retry = RetryPolicy()
+        elif retry is False:
+            retry = None
+        self.retry_policy = retry
+        self.retry_budget = retry and retry.budget()
+        self.timeout = timeout
+        if key_cache is True:
+            key_cache = KeyCache()
+        elif key_cache is False:
+            key_cache = None
+        elif isinstance(key_cache, basestring):
+            key_cache = KeyCache(key_cache)
+        self.key_cache = key_cache
+        if coalesce is True:
+            coalesce = SingleFlight()
+        elif coalesce is False:
+            coalesce = None
+        self.single_flight = coalesce
+        if circuit_breaker is True:
+            circuit_breaker = CircuitBreaker()
+        elif circuit_breaker is False:
+            circuit_breaker = None
+        self.circuit_breaker = circuit_breaker
+        if hedge is True:
+            hedge = HedgePolicy()
+        elif hedge is False:
+            hedge = None
+        self.hedge_policy = hedge
+        self.hooks = list(hooks or [])
+        if self.verbose and not any(isinstance(hook, VerboseHook) 
+                                    for hook in self.hooks):
+            self.hooks.append(VerboseHook(self.verbose))
         if key_id and secret:
             self.auth = HTTPSignatureAuth(key_id=key_id, secret=secret,
                 allow_agent=allow_agent)
         else:
             self.auth = None
-        self.default_headers = DEFAULT_HEADERS
+        self.default_headers = dict(DEFAULT_HEADERS)
         self.default_headers['X-Api-Version'] = self.API_VERSION
         if headers:
             self.default_headers.update(headers)
@@ -201,7 +473,33 @@ class DataCenter(object):
             self.auth = HTTPSignatureAuth(key_id=key_id, secret=secret, 
                 allow_agent=allow_agent)
     
-    def request(self, method, path, headers=None, data=None, **kwargs):
+    def invalidate(self, kind=None):
+        """
+        :param kind: one of ``'packages'``, ``'datasets'``, ``'images'``, 
+            ``'networks'`` or ``'me'``
+        :type kind: :py:class:`basestring`
+        
+        Discard the reusable lookups of the given `kind` (or of all kinds) 
+        kept under `catalog_ttl`, so that the next ones query the API.
+        """
+        if self.catalog_cache is not None:
+            self.catalog_cache.invalidate(kind)
+    
+    def _catalog_get(self, kind, path, params=None):
+        """
+        GET the decoded body at `path`, reusing a previous result of the 
+        same `kind` if `catalog_ttl` allows.
+        """
+        def fetch():
+            j, _ = self.request('GET', path, params=params)
+            return j
+        if self.catalog_cache is None:
+            return fetch()
+        key = (self.url, path, tuple(sorted((params or {}).items())))
+        return self.catalog_cache.fetch(kind, key, fetch)
+    
+    def request(self, method, path, headers=None, data=None, timeout=None, 
+            **kwargs):
         """
         (Primarily) internal method for making all requests to the datacenter.
         
@@ -214,58 +512,334 @@ class DataCenter(object):
         :param headers: additional headers to send
         :type headers: :py:class:`dict`
         
+        :param timeout: seconds to wait for the connection and each read, 
+            overriding the DataCenter's `timeout`
+        :type timeout: :py:class:`float` or :py:class:`tuple`
+        
         :Returns: tuple of decoded response body & `Response` object
-        :raises: client (4xx) errors
+        :raises: client (4xx) and server (5xx) errors, connection errors and 
+            timeouts, and :py:class:`smartdc.waiter.OperationTimeout` once the 
+            enclosing :py:func:`smartdc.waiter.time_limit` has passed
+        
+        GETs eligible for the `http_cache` are sent as conditional requests 
+        when a validated copy is held, and a ``304 Not Modified`` response 
+        returns the held body (along with the 304 `Response`). Should the 
+        copy be evicted meanwhile, the GET is sent once more without 
+        validators.
+        
+        Each attempt first waits its turn with the `rate_limiter`, if any. A 
+        failed attempt is repeated when and as the `retry_policy` allows, 
+        drawing on this DataCenter's `retry_budget`; a server's 
+        ``Retry-After`` also holds back every other request through the same 
+        `rate_limiter`. Once no more retries are allowed, the failure is 
+        raised.
+        
+        Within a :py:func:`smartdc.waiter.time_limit`, each attempt's timeout 
+        is cut to the time left, and no retry is made that could not start 
+        in time.
+        
+        Concurrent identical GET and HEAD requests (same URL, query 
+        parameters, headers and authentication) through the `single_flight` 
+        are merged: only the first is sent, and the others wait for and 
+        share its outcome, each with its own copy of the decoded body.
+        """
+        if (self.single_flight is None or method not in COALESCED_METHODS or 
+                data or set(kwargs) - set(['params'])):
+            return self._request(method, path, headers=headers, data=data, 
+                timeout=timeout, **kwargs)
+        key = (method, self.url + path, id(self.auth), 
+               json.dumps(kwargs.get('params'), sort_keys=True), 
+               json.dumps(headers, sort_keys=True))
+        return self.single_flight.do(key, lambda: self._request(method, path, 
+            headers=headers, timeout=timeout, **kwargs), timeout=time_left(), 
+            copy=copy_result)
+    
+    def _request(self, method, path, headers=None, data=None, timeout=None, 
+            conditional=True, **kwargs):
+        """
+        Make a request, as :py:meth:`request` describes, without merging it 
+        with any other, and sending the `http_cache` validators only if 
+        `conditional`.
         """
         full_path = self.url + path
         request_headers = {}
         request_headers.update(self.default_headers)
+        if 'User-Agent' not in request_headers:
+            request_headers['User-Agent'] = user_agent()
         if headers:
             request_headers.update(headers)
+        cache_key = None
+        if (self.http_cache is not None and 
+                self.http_cache.accepts(method, path)):
+            cache_key = self.http_cache.key(full_path, kwargs.get('params'))
+            if conditional:
+                request_headers.update(self.http_cache.validators(cache_key))
         jdata = None
         if data:
             jdata = json.dumps(data)
-        if self.verbose:
-            print("%s\t%s\t%s" % 
-                (datetime.now().isoformat(), method, full_path), 
-                file=sys.stderr)
-        resp = requests.request(method, full_path, auth=self.auth, 
-            headers=request_headers, data=jdata,
-            verify=self.verify, **kwargs)
-        if (resp.status_code == 401 and self.auth and 
-                self.auth.signer._agent_key):
-            self.auth.signer.swap_keys()
-            return self.request(method, path, headers=headers, data=data,
-                **kwargs)
-        if 400 <= resp.status_code < 499:
-            if resp.content and self.verbose:
-                print(resp.content, file=sys.stderr)
+        if self.retry_budget is not None:
+            self.retry_budget.deposit()
+        if timeout is None:
+            timeout = self.timeout
+        keys = self._signing_keys()
+        swaps = 0
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(time_left())
+            left = time_left()
+            if left is not None and left <= 0:
+                raise OperationTimeout('time limit reached before %s %s' % 
+                    (method, full_path))
+            resp, error = None, None
+            try:
+                resp = self._attempt(method, full_path, path, 
+                    attempt + swaps, auth=self._signing_auth(keys[swaps]), 
+                    headers=request_headers, data=jdata,
+                    verify=self.verify, timeout=bounded_timeout(timeout, left), 
+                    **kwargs)
+            except (ConnectionError, Timeout) as e:
+                left = time_left()
+                if left is not None and left <= 0:
+                    # the attempt was cut short by the time limit
+                    raise OperationTimeout('time limit reached during %s %s '
+                        '(%s)' % (method, full_path, e))
+                error = e
+            if resp is not None and resp.status_code < 400:
+                break
+            if (resp is not None and resp.status_code == 401 and 
+                    swaps + 1 < len(keys)):
+                # the key was rejected, so sign again with the next one
+                swaps += 1
+                continue
+            delay = None
+            if self.retry_policy is not None:
+                delay = self.retry_policy.delay(method, attempt, resp=resp, 
+                    error=error, budget=self.retry_budget)
+            left = time_left()
+            if delay is not None and left is not None and delay >= left:
+                delay = None
+            if delay is None:
+                if error is not None:
+                    raise error
+                break
+            if self.hooks:
+                event = RequestEvent(self, method, full_path, path, 
+                    attempt + swaps)
+                event.error = error
+                if resp is not None:
+                    event.response = resp
+                    event.status = resp.status_code
+                for hook in self.hooks:
+                    hook.retry(event, delay)
+            if (self.rate_limiter is not None and resp is not None and 
+                    'retry-after' in resp.headers):
+                self.rate_limiter.hold(delay)
+            time.sleep(delay)
+            attempt += 1
+        if (keys[swaps] is not None and self.key_cache is not None and 
+                resp is not None and resp.status_code < 400):
+            self.key_cache.store(self.location, self.login, 
+                fingerprint(keys[swaps]))
+        if resp.status_code >= 400:
             resp.raise_for_status()
-        if resp.content:
-            ctype = re.match('application/json(; +charset *= *([a-zA-z0-9-_]+))?',
-                resp.headers['content-type'])
-            if ctype:
-                return (json.loads(resp.content, ctype.groups('utf-8')[1]), resp)
-            else:
-                return (resp.content, resp)
-        else:
-            return (None, resp)
+        if cache_key:
+            if resp.status_code == 304:
+                cached = self.http_cache.lookup(cache_key)
+                if cached:
+                    return (decode_body(*cached), resp)
+                if not conditional:
+                    raise HTTPError('304 Not Modified without validators for '
+                        '%s %s' % (method, full_path), response=resp)
+                # evicted since the validators were sent, so fetch it afresh, 
+                # once, without them
+                return self._request(method, path, headers=headers, data=data,
+                    timeout=timeout, conditional=False, **kwargs)
+            self.http_cache.store(cache_key, resp)
+        return (decode_body(resp.content, resp.headers.get('content-type')), 
+                resp)
+    
+    def _signing_keys(self):
+        """
+        :Returns: the ssh-agent keys with which to try signing a request, the 
+            one last accepted for this location and login first, or 
+            ``[None]`` to sign as the `auth` would
+        """
+        signer = getattr(self.auth, 'signer', None)
+        if signer is None or not signer._agent_key:
+            return [None]
+        keys = [signer._agent_key] + list(signer._keys)
+        preferred = self.key_cache and self.key_cache.lookup(self.location, 
+            self.login)
+        if preferred:
+            keys.sort(key=lambda k: fingerprint(k) != preferred)
+        return keys
     
-    def api(self):
+    def _signing_auth(self, key):
+        """
+        :Returns: the authentication signing with the ssh-agent `key`, if any
+        """
+        if key is None:
+            return self.auth
+        return AgentKeyAuth(self.auth, key)
+    
+    def _attempt(self, method, url, path, attempt=0, **kwargs):
+        """
+        Make a single attempt at a request, hedged if the `hedge_policy` 
+        allows: if no response has arrived after the policy's delay, send a 
+        duplicate, and return whichever response arrives first (or raise the 
+        last error, if neither does).
+        """
+        policy = self.hedge_policy
+        if (policy is None or method not in policy.methods or 
+                kwargs.get('data')):
+            return self._send(method, url, path, attempt, **kwargs)
+        delay = policy.delay(method, path)
+        if delay is None:
+            start = time.time()
+            resp = self._send(method, url, path, attempt, **kwargs)
+            policy.observe(method, path, time.time() - start)
+            return resp
+        done = Queue.Queue()
+        # the workers do not share this thread's time limit
+        left = time_left()
+        finish = left is not None and time.time() + left
+        
+        def send(hedge):
+            try:
+                if hedge and self.rate_limiter is not None:
+                    self.rate_limiter.acquire(finish - time.time() 
+                                              if finish else None)
+                start = time.time()
+                resp = self._send(method, url, path, attempt, hedge=hedge, 
+                    **kwargs)
+                policy.observe(method, path, time.time() - start)
+                done.put((hedge, resp, None))
+            except Exception as e:
+                done.put((hedge, None, e))
+        
+        # the attempts run on the policy's reused workers, and its timers wake 
+        # the wait below for the hedge, so that the wait itself blocks without 
+        # polling, and a response is taken as soon as it comes
+        policy.workers.submit(send, False)
+        timer = policy.timers.schedule(delay, done.put, (None, None, None))
+        pending = 1
+        while True:
+            hedge, resp, error = done.get()
+            if hedge is None:
+                if policy.withdraw():
+                    policy.workers.submit(send, True)
+                    pending += 1
+                continue
+            pending -= 1
+            if error is None or not pending:
+                timer.cancel()
+            if error is None:
+                if hedge:
+                    policy.hedge_won()
+                return resp
+            if not pending:
+                raise error
+    
+    def _send(self, method, url, path, attempt=0, hedge=False, **kwargs):
+        """
+        Make a single attempt at a request through the `transport`, unless 
+        the `circuit_breaker` refuses it, reporting it to the `hooks`.
+        """
+        breaker = self.circuit_breaker
+        if not self.hooks and breaker is None:
+            return self.transport.request(method, url, **kwargs)
+        event = RequestEvent(self, method, url, path, attempt)
+        event.hedge = hedge
+        allowed = True
+        if breaker is not None:
+            previous, event.circuit, allowed = breaker.allow(self.base_url)
+        # whether the breaker still awaits the outcome of the attempt
+        owed = breaker is not None and allowed
+        # hooks told of the attempt, and not yet of its outcome
+        started = []
+        try:
+            for hook in self.hooks:
+                hook.before(event)
+                started.append(hook)
+            if breaker is not None and event.circuit != previous:
+                for hook in self.hooks:
+                    hook.circuit(event, previous)
+            event.start = time.time()
+            try:
+                if not allowed:
+                    raise CircuitOpen('circuit open for %s, not sending %s %s' 
+                        % (self.base_url, method, url))
+                resp = self.transport.request(method, url, **kwargs)
+            except Exception as e:
+                event.duration = time.time() - event.start
+                event.error = e
+                if owed:
+                    owed = False
+                    self._record_outcome(event, 
+                        isinstance(e, (ConnectionError, Timeout)))
+                while started:
+                    started.pop(0).error(event)
+                raise
+            event.duration = time.time() - event.start
+            event.response = resp
+            event.status = resp.status_code
+            event.bytes = len(resp.content)
+            if owed:
+                owed = False
+                self._record_outcome(event, resp.status_code >= 500)
+            while started:
+                started.pop(0).after(event)
+            return resp
+        except Exception as e:
+            # a hook failed, so report the attempt as failed to the hooks 
+            # that have yet to hear of its outcome, as they may be counting it
+            if event.error is None:
+                event.error = e
+            if event.duration is None:
+                event.duration = (time.time() - event.start 
+                                  if event.start else 0)
+            for hook in started:
+                try:
+                    hook.error(event)
+                except Exception:
+                    pass
+            raise
+        finally:
+            if owed:
+                # a hook failed (or the attempt was interrupted) before its 
+                # outcome was known, so give back its place
+                breaker.release(self.base_url)
+    
+    def _record_outcome(self, event, failed):
+        """
+        Count the outcome of an attempt with the `circuit_breaker`, reporting 
+        any change of its circuit to the `hooks`.
+        """
+        previous, event.circuit = self.circuit_breaker.record(self.base_url, 
+            failed, event.duration)
+        if event.circuit != previous:
+            for hook in self.hooks:
+                hook.circuit(event, previous)
+    
+    def api(self, timeout=None):
         """
         ::
         
             GET /
         
+        :param timeout: seconds to wait for the connection and the read, 
+            overriding the DataCenter's `timeout`
+        :type timeout: :py:class:`float` or :py:class:`tuple`
+        
         :Returns: a programmatically-generated API summary using HTTP verbs 
             and URL templates
         :rtype: :py:class:`dict`
         """
-        if self.verbose:
-            print("%s\t%s\t%s" % 
-                (datetime.now().isoformat(), 'GET', self.base_url), 
-                file=sys.stderr)
-        resp = requests.request('GET', self.base_url, verify=self.verify)
+        if timeout is None:
+            timeout = self.timeout
+        resp = self._send('GET', self.base_url, '/', verify=self.verify,
+            timeout=bounded_timeout(timeout, time_left()))
         if 400 <= resp.status_code < 499:
             resp.raise_for_status()
         if resp.content:
@@ -340,7 +914,7 @@ class DataCenter(object):
         :Returns: basic information about the authenticated account
         :rtype: :py:class:`dict`
         """
-        j, _ = self.request('GET', '')
+        j = self._catalog_get('me', '')
         if 'login' in j and self.login == 'my':
             self.login = j['login']
         return j
@@ -362,11 +936,14 @@ class DataCenter(object):
         self.known_locations.update(j)
         return j
     
-    def datacenter(self, name):
+    def datacenter(self, name, cls=None):
         """
         :param name: location key
         :type name: :py:class:`basestring`
         
+        :param cls: the class of the new DataCenter (default: 
+            :py:class:`smartdc.datacenter.DataCenter`)
+        
         :Returns: a new DataCenter object
         
         This method treats the 'name' argument as a location key (on the 
@@ -377,9 +954,18 @@ class DataCenter(object):
         # j, _ = self.request('GET', 'datacenters/' + str(name))
         if name not in self.known_locations and '.' not in name:
             self.datacenters()
-        dc = DataCenter(location=name, headers=self.default_headers, 
+        if cls is None:
+            cls = DataCenter
+        dc = cls(location=name, headers=self.default_headers, 
                 login=self.login, verbose=self.verbose, 
-                verify=self.verify, known_locations=self.known_locations)
+                verify=self.verify, known_locations=self.known_locations,
+                session=self.session, http_cache=self.http_cache,
+                catalog_ttl=self.catalog_cache, rate_limit=self.rate_limiter,
+                retry=self.retry_policy, timeout=self.timeout, 
+                hooks=self.hooks, cassette=self.cassette, 
+                key_cache=self.key_cache, coalesce=self.single_flight, 
+                transport=self.transport, 
+                circuit_breaker=self.circuit_breaker, hedge=self.hedge_policy)
         dc.auth = self.auth
         return dc
     
@@ -402,7 +988,7 @@ class DataCenter(object):
             datacenter 
         :rtype: :py:class:`list` of :py:class:`dict`\s
         """
-        j, _ = self.request('GET', 'datasets')
+        j = self._catalog_get('datasets', 'datasets')
         if search:
             return list(search_dicts(j, search, fields))
         else:
@@ -425,7 +1011,7 @@ class DataCenter(object):
         """
         if isinstance(identifier, dict):
             identifier = identifier.get('id', identifier['urn'])
-        j, _ = self.request('GET', 'datasets/' + str(identifier))
+        j = self._catalog_get('datasets', 'datasets/' + str(identifier))
         return j
 
     def packages(self, name=None, memory=None, disk=None, swap=None,
@@ -475,7 +1061,7 @@ class DataCenter(object):
             params['vcpus'] = vcpus
         if group:
             params['group'] = group
-        j, _ = self.request('GET', 'packages', params=params)
+        j = self._catalog_get('packages', 'packages', params=params)
         return j
     
     def default_package(self):
@@ -514,7 +1100,7 @@ class DataCenter(object):
         """
         if isinstance(name, dict):
             name = name.get('id', name.get('name'))
-        j, _ = self.request('GET', 'packages/' + str(name))
+        j = self._catalog_get('packages', 'packages/' + str(name))
         return j
     
     def num_machines(self, machine_type=None, dataset=None, state=None, 
@@ -549,7 +1135,10 @@ class DataCenter(object):
             owned by the user at this datacenter
         :rtype: :py:class:`int`
         """
-        _, r = self.request('HEAD', 'machines')
+        params = self._machine_params(machine_type=machine_type, 
+            dataset=dataset, state=state, memory=memory, tombstone=tombstone, 
+            tags=tags)
+        _, r = self.request('HEAD', 'machines', params=params)
         num = r.headers.get('x-resource-count', 0)
         return int(num)
     
@@ -580,7 +1169,7 @@ class DataCenter(object):
     
     def machines(self, machine_type=None, name=None, dataset=None, state=None, 
             memory=None, tombstone=None, tags=None, credentials=False, 
-            paged=False, limit=None, offset=None):
+            paged=False, limit=None, offset=None, workers=None):
         """
         ::
         
@@ -625,11 +1214,148 @@ class DataCenter(object):
         :param offset: get the next `limit` of machines starting at this point
         :type offset: :py:class:`int`
         
+        :param workers: fetch the remaining pages concurrently with up to this 
+            many threads
+        :type workers: :py:class:`int`
+        
         :rtype: :py:class:`list` of :py:class:`smartdc.machine.Machine`\s
         
         The `limit` and `offset` are the REST API's raw paging mechanism. 
         Alternatively, one can let `paged` remain `False`, and let the method 
-        call attempt to collect all of the machines in multiple calls.
+        call collect all of the machines in multiple calls of `limit` 
+        machines each, via :py:meth:`iter_machines`.
+        
+        When collecting all machines, the pages are fetched one after another 
+        unless `workers` is greater than 1. In that case, the first page 
+        reveals the total (``x-resource-count``) and page size 
+        (``x-query-limit``), and the remaining pages are requested in 
+        parallel, still returning machines in listing order. Keep `workers` 
+        within the DataCenter's `pool_maxsize` so that the connections are 
+        all reused.
+        """
+        params = self._machine_params(machine_type=machine_type, name=name, 
+            dataset=dataset, state=state, memory=memory, tombstone=tombstone, 
+            tags=tags, credentials=credentials)
+        if paged:
+            if limit:
+                params['limit'] = limit
+            if offset:
+                params['offset'] = offset
+            j, _ = self.request('GET', 'machines', params=params)
+            return [Machine(datacenter=self, data=m) for m in j]
+        if workers and workers > 1:
+            pages = self._prefetch_machine_pages(params, page_size=limit, 
+                offset=offset, workers=workers)
+            return [Machine(datacenter=self, data=m) 
+                    for page in pages for m in page]
+        return list(self.iter_machines(machine_type=machine_type, name=name, 
+            dataset=dataset, state=state, memory=memory, tombstone=tombstone, 
+            tags=tags, credentials=credentials, page_size=limit, 
+            offset=offset))
+    
+    def iter_machines(self, machine_type=None, name=None, dataset=None, 
+            state=None, memory=None, tombstone=None, tags=None, 
+            credentials=False, page_size=None, offset=None):
+        """
+        ::
+        
+            GET /:login/machines
+        
+        Lazily page through the machines in the current DataCenter matching 
+        the input criteria, yielding each as an instantiated 
+        :py:class:`smartdc.machine.Machine` object. The query parameters are 
+        as with :py:meth:`machines`.
+        
+        :param page_size: number of machines to request per page (the server 
+            default, typically 1000, if omitted)
+        :type page_size: :py:class:`int`
+        
+        :param offset: position in the listing from which to start (or 
+            resume) iterating
+        :type offset: :py:class:`int`
+        
+        :rtype: generator of :py:class:`smartdc.machine.Machine`\s
+        
+        Only a single page of raw machine data is held at any time, and the 
+        next page is requested only once the current one has been consumed. 
+        Paging stops once the ``x-resource-count`` header reports that the 
+        listing is exhausted.
+        """
+        params = self._machine_params(machine_type=machine_type, name=name, 
+            dataset=dataset, state=state, memory=memory, tombstone=tombstone, 
+            tags=tags, credentials=credentials)
+        for page in self._machine_pages(params, page_size=page_size, 
+                offset=offset):
+            for m in page:
+                yield Machine(datacenter=self, data=m)
+    
+    def _machine_pages(self, params, page_size=None, offset=None):
+        """
+        Generate successive pages of raw machine data matching `params`, 
+        until ``x-resource-count`` is reached.
+        """
+        params = dict(params)
+        if page_size:
+            params['limit'] = page_size
+        offset = offset or 0
+        while True:
+            if offset:
+                params['offset'] = offset
+            j, r = self.request('GET', 'machines', params=params)
+            if not j:
+                break
+            offset += len(j)
+            resource_count = int(r.headers.get('x-resource-count', 0))
+            yield j
+            if offset >= resource_count:
+                break
+    
+    def _prefetch_machine_pages(self, params, page_size=None, offset=None, 
+            workers=2):
+        """
+        Fetch the first page of machines matching `params`, then all the 
+        following pages concurrently on a bounded thread pool, returning the 
+        raw pages in order.
+        """
+        offset = offset or 0
+        first = dict(params)
+        if page_size:
+            first['limit'] = page_size
+        if offset:
+            first['offset'] = offset
+        j, r = self.request('GET', 'machines', params=first)
+        if not j:
+            # no machines (or an empty body)
+            return []
+        resource_count = int(r.headers.get('x-resource-count', 0))
+        query_limit = int(r.headers.get('x-query-limit', page_size or len(j)))
+        offsets = range(offset + len(j), resource_count, query_limit)
+        if not offsets:
+            return [j]
+        
+        # the pool's threads do not inherit this thread's time limit
+        left = time_left()
+        finish = left is not None and time.time() + left
+        
+        def fetch_page(page_offset):
+            page_params = dict(params, offset=page_offset, limit=query_limit)
+            with time_limit(finish - time.time() if finish else None):
+                page, _ = self.request('GET', 'machines', params=page_params)
+            return page
+        
+        pool = ThreadPool(min(workers, len(offsets)))
+        try:
+            pages = pool.map(fetch_page, offsets)
+        finally:
+            pool.close()
+            pool.join()
+        return [j] + pages
+    
+    def _machine_params(self, machine_type=None, name=None, dataset=None, 
+            state=None, memory=None, tombstone=None, tags=None, 
+            credentials=False):
+        """
+        Build the query parameters for listing or counting machines.
         """
         params = {}
         if machine_type:
@@ -651,29 +1377,7 @@ class DataCenter(object):
                 params['tag.' + str(k)] = v
         if credentials:
             params['credentials'] = True
-        if limit:
-            params['limit'] = limit
-        else:
-            limit = 1000
-        if offset:
-            params['offset'] = offset
-        else:
-            offset = 0
-        machines = []
-        while True:
-            j, r = self.request('GET', 'machines', params=params)
-            machines.extend(j)
-            if not paged:
-                query_limit = int(r.headers['x-query-limit'])
-                resource_count = int(r.headers['x-resource-count'])
-                if resource_count > query_limit:
-                    data['offset'] = (params.get('offset', offset) + 
-                                      params.get('limit', limit)    )
-                else:
-                    break
-            else:
-                break
-        return [Machine(datacenter=self, data=m) for m in machines]
+        return params
     
     def create_machine(self, name=None, package=None, dataset=None,
             metadata=None, tags=None, boot_script=None, credentials=False,
@@ -782,6 +1486,132 @@ class DataCenter(object):
         return Machine(datacenter=self, machine_id=machine_id, 
                 credentials=credentials)
     
+    def bulk(self, action, machines, concurrency=DEFAULT_BULK_CONCURRENCY, 
+            timeout=None, deadline=None, **kwargs):
+        """
+        :param action: name of a :py:class:`smartdc.machine.Machine` method 
+            (such as ``'start'``, ``'stop'``, ``'reboot'``, ``'resize'`` or 
+            ``'delete'``), or a callable taking a machine as first argument
+        :type action: :py:class:`basestring` or callable
+        
+        :param machines: machines to act upon
+        :type machines: iterable of :py:class:`smartdc.machine.Machine`\s
+        
+        :param concurrency: maximum number of operations in flight at once
+        :type concurrency: :py:class:`int`
+        
+        :param timeout: seconds after which a single operation is reported as 
+            timed out
+        :type timeout: :py:class:`float`
+        
+        :param deadline: seconds after which all outstanding operations are 
+            reported as timed out, and no new ones are started
+        :type deadline: :py:class:`float`
+        
+        :Returns: a ``(machine, result, error)`` tuple for each machine, in 
+            order of completion
+        :rtype: generator of :py:class:`tuple`\s
+        
+        Apply the same action to many machines using a pool of worker 
+        threads, e.g. ``dc.bulk('resize', machines, package='g3-large')``. 
+        Any further keyword arguments are passed to the action. Either 
+        `result` is the action's return value and `error` is ``None``, or 
+        `error` is the exception the action raised. An operation exceeding 
+        `timeout`, or unfinished by the `deadline`, is reported with an 
+        :py:class:`smartdc.waiter.OperationTimeout` error; any result it 
+        produces later is discarded. Each operation runs within a 
+        :py:func:`smartdc.waiter.time_limit` of its `timeout` (or the time to 
+        the `deadline`), so that its requests and waits are cut short rather 
+        than tying up a worker. A `deadline` beyond the caller's own enclosing
+        time limit is brought forward to it.
+
+        The operations run on a :py:class:`multiprocessing.pool.ThreadPool`
+        of `concurrency` threads. Once the `deadline` passes (or the
+        generator is closed), no further operation is started, and the
+        generator finishes only once those in flight have returned or been
+        cut short, so that none keeps making requests afterwards.
+        """
+        if callable(action):
+            call = lambda m: action(m, **kwargs)
+        else:
+            call = lambda m: getattr(m, action)(**kwargs)
+        tasks = list(enumerate(machines))
+        total = len(tasks)
+        if not total:
+            return
+        done = Queue.Queue()
+        started = {}
+        halt = threading.Event()
+        start = time.time()
+        finish = deadline and start + deadline
+        left = time_left()
+        if left is not None and (not finish or start + left < finish):
+            finish = start + left
+        
+        def work(i, machine):
+            if halt.is_set():
+                # given up on before it started
+                return
+            began = time.time()
+            started[i] = (machine, began)
+            limit = timeout
+            if finish and (limit is None or finish - began < limit):
+                limit = finish - began
+            try:
+                with time_limit(limit):
+                    result = call(machine)
+                done.put((i, machine, result, None))
+            except Exception as e:
+                done.put((i, machine, None, e))
+        
+        pool = ThreadPool(min(concurrency, total))
+        for i, machine in tasks:
+            pool.apply_async(work, (i, machine))
+        pool.close()
+        
+        reported = set()
+        try:
+            while len(reported) < total:
+                now = time.time()
+                if finish and now >= finish:
+                    halt.set()
+                    break
+                if timeout:
+                    for i, (machine, began) in started.items():
+                        if i not in reported and now - began >= timeout:
+                            reported.add(i)
+                            yield (machine, None, OperationTimeout(
+                                'operation exceeded %ss' % timeout))
+                    if len(reported) == total:
+                        break
+                waits = [1.0]
+                if finish:
+                    waits.append(finish - now)
+                if timeout:
+                    waits.extend(began + timeout - now for i, (_, began) 
+                                 in started.items() if i not in reported)
+                try:
+                    i, machine, result, error = done.get(
+                        timeout=max(min(waits), 0.001))
+                except Queue.Empty:
+                    continue
+                if i not in reported:
+                    reported.add(i)
+                    yield (machine, result, error)
+            # past the deadline, report the stragglers, including any that 
+            # were never started
+            for i, machine in tasks:
+                if i not in reported:
+                    reported.add(i)
+                    yield (machine, None, OperationTimeout(
+                        'deadline passed after %.1fs' % (time.time() - start)))
+        finally:
+            # skip the operations not yet started, and wait for those in 
+            # flight, each cut short by its time limit, so that none is left 
+            # making requests once this returns
+            halt.set()
+            pool.join()
+    
     def networks(self, search=None, fields=('name,')):
         """
         ::
@@ -801,7 +1631,7 @@ class DataCenter(object):
         :rtype: :py:class:`list` of :py:class:`dict`\s
         """
         
-        j, _ = self.request('GET', 'networks')
+        j = self._catalog_get('networks', 'networks')
         if search:
             return list(search_dicts(j, search, fields))
         else:
@@ -824,7 +1654,7 @@ class DataCenter(object):
         
         if isinstance(identifier, dict):
             identifier = identifier.get('id')
-        j, _ = self.request('GET', 'networks/' + str(identifier))
+        j = self._catalog_get('networks', 'networks/' + str(identifier))
         return j
     
     def images(self, name=None, os=None, version=None):
@@ -853,7 +1683,7 @@ class DataCenter(object):
             params['os'] = os
         if version:
             params['version'] = version
-        j, _ = self.request('GET', 'images', params=params)
+        j = self._catalog_get('images', 'images', params=params)
         
         return j
     
@@ -875,7 +1705,7 @@ class DataCenter(object):
         
         if isinstance(identifier, dict):
             identifier = identifier.get('id', '')
-        j, _ = self.request('GET', 'images/' + str(identifier))
+        j = self._catalog_get('images', 'images/' + str(identifier))
         
         return j
     
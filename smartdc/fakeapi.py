@@ -0,0 +1,932 @@
+"""
+A local stand-in for the CloudAPI, for tests, examples and benchmarks.
+
+:py:class:`FakeCloudAPI` serves, from a background thread of the running
+process, the CloudAPI (v7.0) endpoints used by
+:py:class:`smartdc.datacenter.DataCenter`,
+:py:class:`smartdc.machine.Machine`, :py:class:`smartdc.machine.Snapshot`,
+:py:class:`smartdc.tef.TefDataCenter` and :py:class:`smartdc.network.Network`,
+keeping its state in memory. It may also be run on its own::
+
+    python -m smartdc.fakeapi --port 8080 --machines 5000 --latency 0.05
+"""
+from __future__ import print_function
+import re
+import sys
+import json
+import time
+import uuid
+import errno
+import socket
+import random
+import hashlib
+import heapq
+import itertools
+import threading
+import urlparse
+import BaseHTTPServer
+import SocketServer
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from .hooks import path_template
+
+__all__ = ['FakeCloudAPI']
+
+DEFAULT_QUERY_LIMIT = 1000
+
+EPOCH = datetime(2013, 1, 1)
+
+# errors of writing to or reading from a client that has gone away
+DISCONNECTED_ERRNOS = frozenset([errno.EPIPE, errno.ECONNRESET])
+
+# CloudAPI marks the default package with the string 'true', not a boolean
+PACKAGES = [
+    {'name': 'g3-standard-0.625-smartos', 'memory': 640, 'disk': 20480,
+     'swap': 1280, 'vcpus': 0, 'default': 'false'},
+    {'name': 'g3-standard-1-smartos', 'memory': 1024, 'disk': 30720,
+     'swap': 2048, 'vcpus': 0, 'default': 'true'},
+    {'name': 'g3-standard-4-smartos', 'memory': 4096, 'disk': 131072,
+     'swap': 8192, 'vcpus': 0, 'default': 'false'},
+    {'name': 'g3-standard-16-kvm', 'memory': 16384, 'disk': 491520,
+     'swap': 32768, 'vcpus': 4, 'default': 'false'},
+]
+
+IMAGES = [
+    {'id': 'f669428c-a939-11e2-a485-b790efc0f0c1', 'name': 'base64',
+     'version': '13.1.0', 'os': 'smartos', 'type': 'smartmachine',
+     'urn': 'sdc:sdc:base64:13.1.0', 'description': 'A 64-bit SmartOS '
+     'image with just essential packages installed.', 'default': True},
+    {'id': 'd2ba0f30-bbe8-11e2-a9a2-6bc116856d85', 'name': 'ubuntu-12.04',
+     'version': '2.4.2', 'os': 'linux', 'type': 'virtualmachine',
+     'urn': 'sdc:jpc:ubuntu-12.04:2.4.2', 'description': 'Ubuntu 12.04 '
+     'LTS (64-bit).', 'default': False},
+    {'id': '3766a6d0-a1c8-11e2-9306-0b8ac2a2c9a8', 'name': 'centos-6',
+     'version': '2.4.1', 'os': 'linux', 'type': 'virtualmachine',
+     'urn': 'sdc:jpc:centos-6:2.4.1', 'description': 'CentOS 6.4 '
+     '(64-bit).', 'default': False},
+]
+
+PUBLIC_NETWORKS = [
+    {'id': '42325ea0-eb62-44c1-8eb6-0af3e2f83abc', 'name': 'Joyent-SDC-Public',
+     'public': True},
+    {'id': 'c8cde927-6277-49ca-82a3-741e8b23b02f',
+     'name': 'Joyent-SDC-Private', 'public': False},
+]
+
+
+class Fault(Exception):
+    """
+    An error response, as ``{"code": ..., "message": ...}``.
+    """
+    def __init__(self, status, code, message):
+        Exception.__init__(self, message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def timestamp(when):
+    return when.strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def public(record):
+    """
+    :Returns: a copy of a stored `record` without its private keys
+    """
+    return dict((k, v) for k, v in record.items() if not k.startswith('_'))
+
+
+def route(name, method, template):
+    """
+    Declare a method of :py:class:`FakeCloudAPI` as the handler of the
+    endpoint `name`, for `method` on the path `template` (relative to the
+    login, such as ``'machines/:id'``).
+    """
+    pattern = re.compile('^' + re.sub(r':(\w+)', r'(?P<\1>[^/]+)', template) +
+                         '$')
+
+    def decorate(handler):
+        handler.route = (name, method, template, pattern)
+        return handler
+    return decorate
+
+
+class FakeCloudAPIHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # buffer each response, so that it leaves in as few packets as possible
+    wbufsize = -1
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.api._connected()
+
+    def handle_request(self):
+        length = int(self.headers.get('content-length') or 0)
+        body = self.rfile.read(length) if length else ''
+        status, content, headers = self.server.api.respond(self.command,
+            self.path, self.headers, body)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(content)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = handle_request
+
+    def log_message(self, format, *args):
+        if self.server.api.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format,
+                *args)
+
+
+class FakeCloudAPIServer(SocketServer.ThreadingMixIn,
+        BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    # accept bursts of new connections without the kernel dropping them
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        error = sys.exc_info()[1]
+        if (isinstance(error, socket.error) and
+                error.errno in DISCONNECTED_ERRNOS):
+            # the client gave up on the response (it timed out, or a hedged
+            # duplicate won), which is no fault of the server
+            if self.api.verbose:
+                print('%s disconnected: %s' % (client_address[0], error),
+                    file=sys.stderr)
+            return
+        BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+
+class FakeCloudAPI(object):
+    """
+    An in-process, in-memory CloudAPI for a single location.
+
+    Machines move through their states as the real ones do, only after
+    `transition_delay` seconds: ``provisioning`` to ``running`` once
+    created, ``stopping`` to ``stopped`` once stopped, ``stopped`` to
+    ``running`` once started, and ``deleted`` to gone once deleted (while
+    ``deleted``, a machine is only listed with ``tombstone``, and fetching
+    it answers ``410 Gone``). Snapshots are ``queued`` until ``success``,
+    and networks ``provisioning`` until ``ready``.
+
+    Every response is delayed by `latency` seconds, plus up to `jitter`.
+    Beyond `rate_limit` requests per second, requests are refused with
+    ``429 Too Many Requests`` and a ``Retry-After`` (in fractions of a
+    second, where the CloudAPI gives whole seconds); a fraction
+    `error_rate` of the rest fail with ``503 Service Unavailable``. GETs
+    carry an ``ETag``, and are answered ``304 Not Modified`` when it
+    matches the request's ``If-None-Match``.
+
+    Use it as a context manager, or :py:meth:`start` and :py:meth:`stop`
+    it, and connect with :py:meth:`datacenter`::
+
+        with FakeCloudAPI(machines=2500, latency=0.02) as api:
+            sdc = api.datacenter()
+            sdc.machines()
+
+    Signatures are not checked, so any (or no) key may be used.
+
+    :var requests: :py:class:`dict` of the number of requests served for
+        each ``(method, template)`` endpoint, such as ``('GET', 'machines')``
+    :var connections: number of TCP connections accepted
+    :var throttled: number of requests refused for exceeding `rate_limit`
+    """
+    def __init__(self, machines=0, name='local', login='my', latency=0,
+            jitter=0, rate_limit=None, error_rate=0, transition_delay=1.0,
+            query_limit=DEFAULT_QUERY_LIMIT, address='127.0.0.1', port=0,
+            seed=None, verbose=False):
+        """
+        :param machines: number of running machines to start with
+        :type machines: :py:class:`int`
+
+        :param name: the location's name, as listed in ``datacenters``
+        :type name: :py:class:`basestring`
+
+        :param login: account name, answering as well as ``my``
+        :type login: :py:class:`basestring`
+
+        :param latency: seconds to wait before each response, or a callable
+            taking the method and path template and returning seconds
+        :type latency: :py:class:`float` or callable
+
+        :param jitter: largest random number of seconds added to `latency`
+        :type jitter: :py:class:`float`
+
+        :param rate_limit: sustained requests per second served, beyond which
+            they are refused with 429 (default: no limit)
+        :type rate_limit: :py:class:`float`
+
+        :param error_rate: fraction of requests failing with 503
+        :type error_rate: :py:class:`float`
+
+        :param transition_delay: seconds each machine, snapshot or network
+            spends in a transitional state
+        :type transition_delay: :py:class:`float`
+
+        :param query_limit: largest page of machines listed at once
+        :type query_limit: :py:class:`int`
+
+        :param address: interface on which to listen
+        :type address: :py:class:`str`
+
+        :param port: TCP port on which to listen (default: any free port)
+        :type port: :py:class:`int`
+
+        :param seed: seed for the machine identifiers and random behaviour,
+            to make runs repeatable
+        :type seed: :py:class:`int`
+
+        :param verbose: whether to log each request to stderr
+        :type verbose: :py:class:`bool`
+        """
+        self.name = name
+        self.login = login
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.transition_delay = transition_delay
+        self.query_limit = query_limit
+        self.address = address
+        self.port = port
+        self.verbose = verbose
+        self.random = random.Random(seed)
+        self.requests = {}
+        self.connections = 0
+        self.throttled = 0
+        self.server = None
+        self._lock = threading.RLock()
+        self._tokens = rate_limit
+        self._transitions = []
+        self._sequence = itertools.count()
+        self._listings = {}
+        self._updated = time.time()
+        handlers = [getattr(self, attr) for attr in dir(type(self))
+                    if hasattr(getattr(type(self), attr), 'route')]
+        self._routes = sorted(h.route for h in handlers)
+        self._handlers = dict((h.route[0], h) for h in handlers)
+        self.machines = OrderedDict()
+        self.networks = dict((n['id'], dict(n)) for n in PUBLIC_NETWORKS)
+        self.keys = {}
+        self.account = {
+            'id': self._uuid(),
+            'login': login,
+            'email': login + '@example.com',
+            'firstName': 'Test',
+            'lastName': 'User',
+            'companyName': 'Example',
+            'created': timestamp(EPOCH),
+            'updated': timestamp(EPOCH),
+        }
+        for i in range(machines):
+            self._add_machine({'name': 'machine-%05d' % i},
+                created=EPOCH + timedelta(minutes=i), state='running')
+
+    def __repr__(self):
+        return '<{module}.{cls}: {name} at {url}>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            name=self.name, url=self.url if self.server else '<stopped>')
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Start serving from a background thread.
+
+        :Returns: this object
+        """
+        self.server = FakeCloudAPIServer((self.address, self.port),
+            FakeCloudAPIHandler)
+        self.server.api = self
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving, and close the listening socket.
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    @property
+    def url(self):
+        """Protocol, host and port at which the API is served"""
+        host, port = self.server.server_address[:2]
+        return 'http://{0}:{1}'.format(host, port)
+
+    @property
+    def known_locations(self):
+        """
+        A `known_locations` mapping for a
+        :py:class:`smartdc.datacenter.DataCenter`, naming this API.
+        """
+        return {self.name: self.url}
+
+    def datacenter(self, cls=None, **kwargs):
+        """
+        :param cls: the class of the DataCenter, such as
+            :py:class:`smartdc.tef.TefDataCenter` (default:
+            :py:class:`smartdc.datacenter.DataCenter`)
+
+        :Returns: a DataCenter connected to this API; further keyword
+            arguments are passed to it
+
+        Unless the API is started, the DataCenter reaches it in memory,
+        through a :py:class:`smartdc.transport.MemoryTransport`, rather than
+        over HTTP.
+        """
+        if cls is None:
+            from .datacenter import DataCenter as cls
+        if self.server is None:
+            from .transport import MemoryTransport
+            kwargs.setdefault('transport', MemoryTransport(self.respond))
+            kwargs.setdefault('known_locations',
+                {self.name: 'http://{0}.invalid'.format(self.name)})
+        else:
+            kwargs.setdefault('known_locations', self.known_locations)
+        return cls(location=self.name, **kwargs)
+
+    def _uuid(self):
+        return str(uuid.UUID(int=self.random.getrandbits(128), version=4))
+
+    def _connected(self):
+        with self._lock:
+            self.connections += 1
+
+    def _later(self, records, key, field, value):
+        """
+        Schedule the `field` of the record at `key` in a store to change to
+        `value` (or the record to go, for ``None``) after the
+        `transition_delay`, replacing any change already scheduled for it.
+        """
+        token = next(self._sequence)
+        records[key]['_pending'] = token
+        heapq.heappush(self._transitions, (time.time() +
+            self.transition_delay, token, records, key, field, value))
+
+    def _settle(self):
+        """
+        Apply the scheduled changes that are due.
+        """
+        now = time.time()
+        while self._transitions and self._transitions[0][0] <= now:
+            _, token, records, key, field, value = heapq.heappop(
+                self._transitions)
+            record = records.get(key)
+            if record is None or record.get('_pending') != token:
+                continue
+            del record['_pending']
+            if value is None:
+                del records[key]
+            else:
+                record[field] = value
+                record['updated'] = timestamp(datetime.utcnow())
+            self._listings.clear()
+
+    def _throttle(self):
+        """
+        :Returns: seconds after which to retry if the request is refused for
+            exceeding the `rate_limit`, else ``None``
+        """
+        if not self.rate_limit:
+            return None
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.rate_limit,
+                self._tokens + (now - self._updated) * self.rate_limit)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            self.throttled += 1
+            return (1 - self._tokens) / self.rate_limit
+
+    def respond(self, method, path, headers, body):
+        """
+        :Returns: the ``(status, content, headers)`` of the response to a
+            request
+        """
+        parsed = urlparse.urlsplit(path)
+        query = dict((k, v[-1]) for k, v in
+                     urlparse.parse_qs(parsed.query, True).items())
+        segments = parsed.path.strip('/').split('/', 1)
+        relative = segments[1].strip('/') if len(segments) > 1 else ''
+        template = path_template(relative) if segments[0] else '/'
+        with self._lock:
+            self.requests[(method, template)] = (
+                self.requests.get((method, template), 0) + 1)
+        latency = self.latency
+        if callable(latency):
+            latency = latency(method, template)
+        if latency or self.jitter:
+            time.sleep(latency + self.random.uniform(0, self.jitter))
+        try:
+            wait = self._throttle()
+            if wait is not None:
+                return self._reply(429, {'code': 'TooManyRequests',
+                    'message': 'rate limit exceeded'},
+                    [('Retry-After', '%.3f' % wait)])
+            if self.error_rate and self.random.random() < self.error_rate:
+                raise Fault(503, 'ServiceUnavailable', 'try again later')
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                raise Fault(400, 'InvalidArgument', 'malformed JSON body')
+            if not segments[0]:
+                return self._reply(200, self._api_summary())
+            if segments[0] not in ('my', self.login):
+                raise Fault(404, 'ResourceNotFound', 'no such account')
+            name, params = self._match('GET' if method == 'HEAD' else method,
+                relative)
+            with self._lock:
+                self._settle()
+                result = self._handlers[name](params, query, data)
+                if method not in ('GET', 'HEAD'):
+                    self._listings.clear()
+            if len(result) == 2:
+                result += ([],)
+            status, content, extra = result
+            if method in ('GET', 'HEAD') and status == 200:
+                return self._conditional(headers, content, extra)
+            return self._reply(status, content, extra)
+        except Fault as f:
+            return self._reply(f.status, {'code': f.code,
+                'message': f.message})
+        except Exception as e:
+            return self._reply(500, {'code': 'InternalError',
+                'message': '%s: %s' % (type(e).__name__, e)})
+
+    def _match(self, method, path):
+        allowed = False
+        for name, route_method, template, pattern in self._routes:
+            m = pattern.match(path)
+            if m:
+                if route_method == method:
+                    return name, m.groupdict()
+                allowed = True
+        if allowed:
+            raise Fault(405, 'BadMethod', '%s is not allowed' % method)
+        raise Fault(404, 'ResourceNotFound', '%s does not exist' % path)
+
+    def _reply(self, status, content=None, headers=None):
+        headers = list(headers or [])
+        if content is None:
+            return status, '', headers
+        if isinstance(content, basestring):
+            headers.append(('Content-Type', 'text/plain'))
+            return status, content.encode('utf-8'), headers
+        headers.append(('Content-Type', 'application/json'))
+        return status, json.dumps(content), headers
+
+    def _conditional(self, request_headers, content, headers):
+        status, encoded, headers = self._reply(200, content, headers)
+        etag = '"%s"' % hashlib.md5(encoded).hexdigest()[:16]
+        if request_headers.get('if-none-match') == etag:
+            return 304, '', [('ETag', etag)]
+        return status, encoded, headers + [('ETag', etag)]
+
+    def _api_summary(self):
+        return dict((name, '%s /:login/%s' % (method, template))
+                    for name, method, template, _ in self._routes)
+
+    # account, keys and datacenters
+
+    @route('GetAccount', 'GET', '')
+    def get_account(self, params, query, data):
+        return 200, self.account
+
+    @route('ListKeys', 'GET', 'keys')
+    def list_keys(self, params, query, data):
+        return 200, self.keys.values()
+
+    @route('GetKey', 'GET', 'keys/:key')
+    def get_key(self, params, query, data):
+        return 200, self._find(self.keys, params['key'], 'key')
+
+    @route('CreateKey', 'POST', 'keys')
+    def create_key(self, params, query, data):
+        if not data.get('key'):
+            raise Fault(409, 'MissingParameter', 'key is required')
+        name = data.get('name') or hashlib.md5(data['key']).hexdigest()
+        self.keys[name] = {'name': name, 'key': data['key'],
+                           'created': timestamp(datetime.utcnow())}
+        return 201, self.keys[name]
+
+    @route('DeleteKey', 'DELETE', 'keys/:key')
+    def delete_key(self, params, query, data):
+        self._find(self.keys, params['key'], 'key')
+        del self.keys[params['key']]
+        return 204, None
+
+    @route('ListDatacenters', 'GET', 'datacenters')
+    def list_datacenters(self, params, query, data):
+        return 200, self.known_locations
+
+    # catalog
+
+    @route('ListPackages', 'GET', 'packages')
+    def list_packages(self, params, query, data):
+        return 200, PACKAGES
+
+    @route('GetPackage', 'GET', 'packages/:package')
+    def get_package(self, params, query, data):
+        return 200, self._package(params['package'])
+
+    @route('ListDatasets', 'GET', 'datasets')
+    def list_datasets(self, params, query, data):
+        return 200, IMAGES
+
+    @route('GetDataset', 'GET', 'datasets/:id')
+    def get_dataset(self, params, query, data):
+        return 200, self._image(params['id'])
+
+    @route('ListImages', 'GET', 'images')
+    def list_images(self, params, query, data):
+        return 200, [image for image in IMAGES
+                     if all(image.get(k) == v for k, v in query.items())]
+
+    @route('GetImage', 'GET', 'images/:id')
+    def get_image(self, params, query, data):
+        return 200, self._image(params['id'])
+
+    def _package(self, name):
+        for package in PACKAGES:
+            if name in (package['name'], package.get('id')):
+                return package
+        raise Fault(404, 'ResourceNotFound', 'package %s not found' % name)
+
+    def _image(self, identifier):
+        for image in IMAGES:
+            if identifier in (image['id'], image['urn'], image['name']):
+                return image
+        raise Fault(404, 'ResourceNotFound', 'image %s not found' % identifier)
+
+    def _find(self, records, key, kind):
+        if key not in records:
+            raise Fault(404, 'ResourceNotFound', '%s %s not found' % (kind,
+                key))
+        return records[key]
+
+    # networks, with the NetworkAPI extensions of TEF datacenters
+
+    @route('ListNetworks', 'GET', 'networks')
+    def list_networks(self, params, query, data):
+        return 200, [public(n) for n in self.networks.values()]
+
+    @route('GetNetwork', 'GET', 'networks/:id')
+    def get_network(self, params, query, data):
+        return 200, public(self._find(self.networks, params['id'], 'network'))
+
+    @route('CreateNetwork', 'POST', 'networks')
+    def create_network(self, params, query, data):
+        if not data.get('name') or not data.get('subnet'):
+            raise Fault(409, 'MissingParameter', 'name and subnet are required')
+        base = data['subnet'].split('/')[0].rsplit('.', 1)[0]
+        network = {
+            'id': self._uuid(),
+            'name': data['name'],
+            'subnet': data['subnet'],
+            'resolver_ips': data.get('resolver_ips', ['8.8.8.8', '4.4.4.4']),
+            'private_gw_ip': base + '.1',
+            'public_gw_ip': '165.225.%d.%d' % (self.random.randint(128, 255),
+                                               self.random.randint(1, 254)),
+            'status': 'provisioning',
+            '_outbound': False,
+            '_inbound': {},
+        }
+        self.networks[network['id']] = network
+        self._later(self.networks, network['id'], 'status', 'ready')
+        return 201, public(network)
+
+    @route('DeleteNetwork', 'DELETE', 'networks/:id')
+    def delete_network(self, params, query, data):
+        self._find(self.networks, params['id'], 'network')
+        del self.networks[params['id']]
+        return 204, None
+
+    @route('GetNetworkOutbound', 'GET', 'networks/:id/outbound')
+    def get_outbound(self, params, query, data):
+        network = self._find(self.networks, params['id'], 'network')
+        return 200, {'enabled': network.get('_outbound', False)}
+
+    @route('SetNetworkOutbound', 'PUT', 'networks/:id/outbound')
+    def set_outbound(self, params, query, data):
+        network = self._find(self.networks, params['id'], 'network')
+        network['_outbound'] = bool(data.get('enabled'))
+        return 200, {'enabled': network['_outbound']}
+
+    @route('ListInboundRules', 'GET', 'networks/:id/inbound')
+    def list_inbound(self, params, query, data):
+        network = self._find(self.networks, params['id'], 'network')
+        return 200, network.setdefault('_inbound', {}).values()
+
+    @route('CreateInboundRule', 'POST', 'networks/:id/inbound')
+    def create_inbound(self, params, query, data):
+        network = self._find(self.networks, params['id'], 'network')
+        rule = dict(data, id=self._uuid(), enabled=True)
+        network.setdefault('_inbound', {})[rule['id']] = rule
+        return 201, rule
+
+    @route('GetInboundRule', 'GET', 'networks/:id/inbound/:rule')
+    def get_inbound(self, params, query, data):
+        network = self._find(self.networks, params['id'], 'network')
+        return 200, self._find(network.setdefault('_inbound', {}),
+            params['rule'], 'rule')
+
+    @route('UpdateInboundRule', 'PUT', 'networks/:id/inbound/:rule')
+    def update_inbound(self, params, query, data):
+        network = self._find(self.networks, params['id'], 'network')
+        rule = self._find(network.setdefault('_inbound', {}), params['rule'],
+            'rule')
+        rule['enabled'] = bool(data.get('enabled'))
+        return 200, rule
+
+    @route('DeleteInboundRule', 'DELETE', 'networks/:id/inbound/:rule')
+    def delete_inbound(self, params, query, data):
+        network = self._find(self.networks, params['id'], 'network')
+        self._find(network.setdefault('_inbound', {}), params['rule'], 'rule')
+        del network['_inbound'][params['rule']]
+        return 204, None
+
+    # machines
+
+    def _add_machine(self, data, created=None, state='provisioning'):
+        package = self._package(data.get('package') or
+            [p['name'] for p in PACKAGES if p['default'] == 'true'][0])
+        image = self._image(data.get('image') or data.get('dataset') or
+            [i['id'] for i in IMAGES if i['default']][0])
+        created = timestamp(created or datetime.utcnow())
+        machine_id = self._uuid()
+        machine = {
+            'id': machine_id,
+            'name': data.get('name') or machine_id[:7],
+            'type': image['type'],
+            'state': state,
+            'dataset': image['urn'],
+            'image': image['id'],
+            'package': package['name'],
+            'memory': package['memory'],
+            'disk': package['disk'],
+            'ips': ['10.%d.%d.%d' % tuple(self.random.randint(0, 254)
+                                          for _ in range(3))],
+            'metadata': {},
+            'tags': {},
+            'created': created,
+            'updated': created,
+            '_snapshots': {},
+        }
+        if not data.get('network_id'):
+            machine['ips'].insert(0, '165.225.%d.%d' % (
+                self.random.randint(128, 255), self.random.randint(1, 254)))
+        for key, value in data.items():
+            if key.startswith('metadata.'):
+                machine['metadata'][key[len('metadata.'):]] = value
+            elif key.startswith('tag.'):
+                machine['tags'][key[len('tag.'):]] = value
+        self.machines[machine_id] = machine
+        if state == 'provisioning':
+            self._later(self.machines, machine_id, 'state', 'running')
+        return machine
+
+    def _machine(self, machine_id):
+        machine = self._find(self.machines, machine_id, 'machine')
+        if machine['state'] == 'deleted':
+            raise Fault(410, 'ResourceNotFound', 'machine %s was deleted' %
+                machine_id)
+        return machine
+
+    def _listing(self, query):
+        """
+        :Returns: the machines matching the filters of a listing `query`,
+            oldest first, reused until any change to the machines
+        """
+        filters = tuple(sorted((k, v) for k, v in query.items()
+                               if k not in ('limit', 'offset')))
+        matches = self._listings.get(filters)
+        if matches is not None:
+            return matches
+        tombstone = query.get('tombstone')
+        tags = dict((k[len('tag.'):], v) for k, v in query.items()
+                    if k.startswith('tag.'))
+        matches = []
+        for machine in self.machines.itervalues():
+            if machine['state'] == 'deleted' and not tombstone:
+                continue
+            if query.get('type') and machine['type'] != query['type']:
+                continue
+            if query.get('name') and machine['name'] != query['name']:
+                continue
+            if query.get('state') and machine['state'] != query['state']:
+                continue
+            if (query.get('memory') and
+                    str(machine['memory']) != query['memory']):
+                continue
+            if query.get('dataset') and query['dataset'] not in (
+                    machine['dataset'], machine['image']):
+                continue
+            if query.get('image') and machine['image'] != query['image']:
+                continue
+            if any(machine['tags'].get(k) != v for k, v in tags.items()):
+                continue
+            matches.append(machine)
+        self._listings[filters] = matches
+        return matches
+
+    @route('ListMachines', 'GET', 'machines')
+    def list_machines(self, params, query, data):
+        matches = self._listing(query)
+        limit = min(int(query.get('limit') or self.query_limit),
+                    self.query_limit)
+        offset = int(query.get('offset') or 0)
+        page = [public(m) for m in matches[offset:offset + limit]]
+        return 200, page, [('x-resource-count', str(len(matches))),
+                           ('x-query-limit', str(limit))]
+
+    @route('CreateMachine', 'POST', 'machines')
+    def create_machine(self, params, query, data):
+        return 201, public(self._add_machine(data))
+
+    @route('GetMachine', 'GET', 'machines/:id')
+    def get_machine(self, params, query, data):
+        return 200, public(self._machine(params['id']))
+
+    @route('UpdateMachine', 'POST', 'machines/:id')
+    def machine_action(self, params, query, data):
+        machine = self._machine(params['id'])
+        action = query.get('action') or data.get('action')
+        if action == 'stop':
+            if machine['state'] == 'running':
+                machine['state'] = 'stopping'
+                self._later(self.machines, machine['id'], 'state', 'stopped')
+        elif action == 'start':
+            if machine['state'] == 'stopped':
+                self._later(self.machines, machine['id'], 'state', 'running')
+        elif action == 'reboot':
+            if machine['state'] != 'running':
+                raise Fault(409, 'InvalidState', 'machine is not running')
+        elif action == 'resize':
+            package = self._package(query.get('package') or
+                data.get('package'))
+            machine['package'] = package['name']
+            machine['memory'] = package['memory']
+            machine['disk'] = package['disk']
+        else:
+            raise Fault(409, 'InvalidArgument', 'unknown action %r' % action)
+        return 202, None
+
+    @route('DeleteMachine', 'DELETE', 'machines/:id')
+    def delete_machine(self, params, query, data):
+        machine = self._machine(params['id'])
+        machine['state'] = 'deleted'
+        self._later(self.machines, machine['id'], 'state', None)
+        return 204, None
+
+    @route('ListMachineMetadata', 'GET', 'machines/:id/metadata')
+    def list_metadata(self, params, query, data):
+        return 200, self._machine(params['id'])['metadata']
+
+    @route('UpdateMachineMetadata', 'POST', 'machines/:id/metadata')
+    def update_metadata(self, params, query, data):
+        metadata = self._machine(params['id'])['metadata']
+        metadata.update(data)
+        return 200, metadata
+
+    @route('DeleteAllMachineMetadata', 'DELETE', 'machines/:id/metadata')
+    def delete_all_metadata(self, params, query, data):
+        self._machine(params['id'])['metadata'].clear()
+        return 204, None
+
+    @route('GetMachineMetadata', 'GET', 'machines/:id/metadata/:key')
+    def get_metadata(self, params, query, data):
+        metadata = self._machine(params['id'])['metadata']
+        return 200, unicode(self._find(metadata, params['key'], 'metadata'))
+
+    @route('DeleteMachineMetadata', 'DELETE', 'machines/:id/metadata/:key')
+    def delete_metadata(self, params, query, data):
+        metadata = self._machine(params['id'])['metadata']
+        metadata.pop(params['key'], None)
+        return 204, None
+
+    @route('ListMachineTags', 'GET', 'machines/:id/tags')
+    def list_tags(self, params, query, data):
+        return 200, self._machine(params['id'])['tags']
+
+    @route('AddMachineTags', 'POST', 'machines/:id/tags')
+    def add_tags(self, params, query, data):
+        tags = self._machine(params['id'])['tags']
+        tags.update(data)
+        return 200, tags
+
+    @route('ReplaceMachineTags', 'PUT', 'machines/:id/tags')
+    def replace_tags(self, params, query, data):
+        tags = self._machine(params['id'])['tags']
+        tags.clear()
+        tags.update(data)
+        return 200, tags
+
+    @route('DeleteMachineTags', 'DELETE', 'machines/:id/tags')
+    def delete_tags(self, params, query, data):
+        self._machine(params['id'])['tags'].clear()
+        return 204, None
+
+    @route('GetMachineTag', 'GET', 'machines/:id/tags/:tag')
+    def get_tag(self, params, query, data):
+        tags = self._machine(params['id'])['tags']
+        return 200, unicode(self._find(tags, params['tag'], 'tag'))
+
+    @route('DeleteMachineTag', 'DELETE', 'machines/:id/tags/:tag')
+    def delete_tag(self, params, query, data):
+        tags = self._machine(params['id'])['tags']
+        self._find(tags, params['tag'], 'tag')
+        del tags[params['tag']]
+        return 204, None
+
+    @route('ListMachineSnapshots', 'GET', 'machines/:id/snapshots')
+    def list_snapshots(self, params, query, data):
+        snapshots = self._machine(params['id'])['_snapshots']
+        return 200, [public(s) for s in snapshots.values()]
+
+    @route('CreateMachineSnapshot', 'POST', 'machines/:id/snapshots')
+    def create_snapshot(self, params, query, data):
+        machine = self._machine(params['id'])
+        now = timestamp(datetime.utcnow())
+        name = data.get('name') or now
+        snapshot = {'name': name, 'state': 'queued', 'created': now,
+                    'updated': now}
+        machine['_snapshots'][name] = snapshot
+        self._later(machine['_snapshots'], name, 'state', 'success')
+        return 201, public(snapshot)
+
+    @route('GetMachineSnapshot', 'GET', 'machines/:id/snapshots/:name')
+    def get_snapshot(self, params, query, data):
+        snapshots = self._machine(params['id'])['_snapshots']
+        return 200, public(self._find(snapshots, params['name'], 'snapshot'))
+
+    @route('StartMachineFromSnapshot', 'POST', 'machines/:id/snapshots/:name')
+    def start_from_snapshot(self, params, query, data):
+        machine = self._machine(params['id'])
+        self._find(machine['_snapshots'], params['name'], 'snapshot')
+        if machine['state'] == 'stopped':
+            self._later(self.machines, machine['id'], 'state', 'running')
+        return 202, None
+
+    @route('DeleteMachineSnapshot', 'DELETE', 'machines/:id/snapshots/:name')
+    def delete_snapshot(self, params, query, data):
+        snapshots = self._machine(params['id'])['_snapshots']
+        self._find(snapshots, params['name'], 'snapshot')
+        del snapshots[params['name']]
+        return 204, None
+
+
+def main(argv=None):
+    from optparse import OptionParser
+    parser = OptionParser(usage='python -m smartdc.fakeapi [options]',
+        description='Serve a local stand-in for the CloudAPI.')
+    parser.add_option('--address', default='127.0.0.1')
+    parser.add_option('--port', type='int', default=8080)
+    parser.add_option('--name', default='local',
+        help='location name (default: local)')
+    parser.add_option('--machines', type='int', default=0,
+        help='size of the initial fleet')
+    parser.add_option('--latency', type='float', default=0,
+        help='seconds before each response')
+    parser.add_option('--jitter', type='float', default=0,
+        help='largest random addition to the latency')
+    parser.add_option('--rate-limit', type='float', default=None,
+        help='requests per second before answering 429')
+    parser.add_option('--error-rate', type='float', default=0,
+        help='fraction of requests answered 503')
+    parser.add_option('--transition-delay', type='float', default=1.0,
+        help='seconds spent in each transitional state')
+    parser.add_option('--seed', type='int', default=None)
+    parser.add_option('-v', '--verbose', action='store_true', default=False)
+    options, _ = parser.parse_args(argv)
+    api = FakeCloudAPI(machines=options.machines, name=options.name,
+        latency=options.latency, jitter=options.jitter,
+        rate_limit=options.rate_limit, error_rate=options.error_rate,
+        transition_delay=options.transition_delay, address=options.address,
+        port=options.port, seed=options.seed, verbose=options.verbose)
+    api.start()
+    print('serving {0} at {1}'.format(api.name, api.url), file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        api.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import time
+import heapq
+import itertools
+import threading
+import Queue
+
+from .hooks import Histogram, DEFAULT_BUCKETS, path_template
+from .retry import RetryBudget
+
+__all__ = ['HedgePolicy', 'HEDGED_METHODS']
+
+# only requests that are safe to send twice may be hedged
+HEDGED_METHODS = frozenset(['GET', 'HEAD'])
+
+
+class Workers(object):
+    """
+    Daemon threads that run tasks and are kept for reuse, a new one being
+    started only when none is idle, so that running a task costs a hand-over
+    rather than a new thread.
+    """
+    def __init__(self):
+        self.tasks = Queue.Queue()
+        self.idle = 0
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        """
+        Run ``func(*args)`` on a worker, ignoring its result and any error.
+        """
+        with self._lock:
+            start = not self.idle
+            if not start:
+                self.idle -= 1
+        if start:
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+        self.tasks.put((func, args))
+
+    def _work(self):
+        while True:
+            func, args = self.tasks.get()
+            try:
+                func(*args)
+            except Exception:
+                pass
+            with self._lock:
+                self.idle += 1
+
+
+class Timer(object):
+    """
+    A call scheduled with :py:class:`Timers`.
+    """
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """
+        Stop the call from being made, if it is not already.
+        """
+        self.cancelled = True
+
+
+class Timers(object):
+    """
+    Makes scheduled calls from a single daemon thread, started upon the
+    first, rather than from a thread for each call.
+    """
+    def __init__(self):
+        self.pending = []
+        self._sequence = itertools.count()
+        self._thread = None
+        self._condition = threading.Condition()
+
+    def schedule(self, delay, func, *args):
+        """
+        Call ``func(*args)`` after `delay` seconds, unless cancelled. The
+        call is made from the timers' thread, so it should be quick.
+
+        :rtype: :py:class:`Timer`
+        """
+        timer = Timer(func, args)
+        with self._condition:
+            heapq.heappush(self.pending, (time.time() + delay,
+                next(self._sequence), timer))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        return timer
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    # most calls are cancelled before they are due, their
+                    # attempt having been answered in time
+                    while self.pending and self.pending[0][2].cancelled:
+                        heapq.heappop(self.pending)
+                    if not self.pending:
+                        self._condition.wait()
+                        continue
+                    wait = self.pending[0][0] - time.time()
+                    if wait <= 0:
+                        break
+                    self._condition.wait(wait)
+                timer = heapq.heappop(self.pending)[2]
+            if not timer.cancelled:
+                timer.func(*timer.args)
+
+
+class HedgePolicy(object):
+    """
+    Decides when to hedge a request: to send a duplicate of an attempt still
+    awaiting its response, and take whichever response arrives first, so
+    that an occasional slow response (from a busy server or a lost packet)
+    does not hold up the caller, e.g.::
+
+        sdc = DataCenter(..., hedge=HedgePolicy(quantile=0.95))
+
+    The duplicate is sent after a fixed `delay`, or else after the
+    `quantile` of the latencies observed for the same endpoint (method and
+    path template), once `min_samples` are observed. The slower response is
+    ignored once it arrives, since a request in flight cannot be withdrawn.
+
+    Hedges are drawn from a :py:class:`smartdc.retry.RetryBudget`, to which
+    each eligible request adds `budget_ratio`, so that hedging adds at most
+    that fraction to the load on the server: with a `quantile` of ``0.95``,
+    about one request in twenty is hedged while latencies are steady, and
+    fewer once the budget runs out. Only GET and HEAD requests (without a
+    body) are ever hedged.
+    """
+    def __init__(self, delay=None, quantile=0.95, min_delay=0.01,
+            min_samples=20, budget_ratio=0.1, budget_reserve=5,
+            methods=HEDGED_METHODS, buckets=DEFAULT_BUCKETS):
+        """
+        :param delay: seconds after which to send a duplicate (default:
+            the `quantile` of observed latencies)
+        :type delay: :py:class:`float`
+
+        :param quantile: fraction of the observed latencies of an endpoint
+            within which no duplicate is sent
+        :type quantile: :py:class:`float`
+
+        :param min_delay: fewest seconds after which to send a duplicate
+        :type min_delay: :py:class:`float`
+
+        :param min_samples: latencies of an endpoint to observe before
+            hedging its requests by `quantile`
+        :type min_samples: :py:class:`int`
+
+        :param budget_ratio: duplicates allowed per request
+        :type budget_ratio: :py:class:`float`
+
+        :param budget_reserve: largest number of duplicates that may
+            accumulate
+        :type budget_reserve: :py:class:`float`
+
+        :param methods: HTTP verbs whose requests may be hedged, which must
+            be safe to repeat
+        :type methods: :py:class:`frozenset`
+
+        :param buckets: upper bounds in seconds of the latency buckets
+        :type buckets: :py:class:`tuple` of :py:class:`float`\s
+
+        :var hedged: number of duplicates sent
+        :var won: number of duplicates whose response arrived first
+        :var workers: :py:class:`Workers` sending hedged attempts
+        :var timers: :py:class:`Timers` scheduling the duplicates
+        """
+        unsafe = set(methods) - HEDGED_METHODS
+        if unsafe:
+            raise ValueError('cannot hedge %s requests' % ', '.join(
+                sorted(unsafe)))
+        self.fixed_delay = delay
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.methods = frozenset(methods)
+        self.buckets = buckets
+        self.budget = RetryBudget(ratio=budget_ratio, reserve=budget_reserve)
+        self.latency = {}
+        self.hedged = 0
+        self.won = 0
+        self.workers = Workers()
+        self.timers = Timers()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<{module}.{cls}: {won} of {hedged} hedges won>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            won=self.won, hedged=self.hedged)
+
+    def delay(self, method, path):
+        """
+        Record a request eligible for hedging.
+
+        :param path: path relative to the `login` path
+        :type path: :py:class:`str`
+
+        :Returns: seconds after which to send a duplicate of an attempt at
+            the request, or ``None`` not to (yet)
+        :rtype: :py:class:`float`
+        """
+        self.budget.deposit()
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+        with self._lock:
+            histogram = self.latency.get((method, path_template(path)))
+            if histogram is None or histogram.count < self.min_samples:
+                return None
+            return max(self.min_delay, histogram.quantile(self.quantile))
+
+    def observe(self, method, path, duration):
+        """
+        Record the latency of an attempt at a request.
+        """
+        endpoint = (method, path_template(path))
+        with self._lock:
+            histogram = self.latency.get(endpoint)
+            if histogram is None:
+                histogram = self.latency[endpoint] = Histogram(self.buckets)
+            histogram.observe(duration)
+
+    def withdraw(self):
+        """
+        :Returns: whether a duplicate may be sent, in which case it is
+            deducted from the budget and counted
+        :rtype: :py:class:`bool`
+        """
+        if not self.budget.withdraw():
+            return False
+        with self._lock:
+            self.hedged += 1
+        return True
+
+    def hedge_won(self):
+        """
+        Count a duplicate whose response arrived first.
+        """
+        with self._lock:
+            self.won += 1
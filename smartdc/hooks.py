@@ -0,0 +1,338 @@
+from __future__ import print_function
+import re
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+__all__ = ['RequestHook', 'RequestEvent', 'VerboseHook', 'LatencyCollector',
+           'Histogram', 'path_template']
+
+# names of the identifiers following each collection in CloudAPI paths, as
+# in the CloudAPI documentation (e.g. /:login/machines/:id/tags/:tag)
+PATH_PARAMETERS = {
+    'machines':     ':id',
+    'metadata':     ':key',
+    'tags':         ':tag',
+    'snapshots':    ':name',
+    'packages':     ':package',
+    'keys':         ':key',
+    'datacenters':  ':name',
+}
+
+# upper bounds in seconds of the histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75,
+                   1.0, 2.5, 5.0, 7.5, 10.0, 30.0, 60.0)
+
+_uuid = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                   r'[0-9a-f]{12}$', re.IGNORECASE)
+
+
+def path_template(path):
+    """
+    :param path: a request path relative to the `login` path, such as
+        ``'machines/0b6e.../metadata/foo'``
+    :type path: :py:class:`basestring`
+
+    :Returns: the path with its identifiers replaced by placeholders, such
+        as ``'machines/:id/metadata/:key'``, so that requests for different
+        resources of the same kind are counted together
+    :rtype: :py:class:`str`
+    """
+    segments = path.split('?', 1)[0].strip('/').split('/')
+    template = []
+    for i, segment in enumerate(segments):
+        if i % 2 and segment:
+            template.append(PATH_PARAMETERS.get(segments[i - 1], ':id'))
+        elif _uuid.match(segment):
+            template.append(':id')
+        else:
+            template.append(segment)
+    return '/'.join(template) or '/'
+
+
+class RequestEvent(object):
+    """
+    A single attempt at a request, as passed to each
+    :py:class:`RequestHook`.
+
+    :var datacenter: the :py:class:`smartdc.datacenter.DataCenter` making
+        the request
+    :var method: HTTP verb
+    :var url: full URL requested
+    :var path: path relative to the `login` path
+    :var template: the `path` with identifiers replaced by placeholders
+        (see :py:func:`path_template`)
+    :var attempt: number of earlier attempts at the same request (retries)
+    :var hedge: whether the attempt duplicates another still awaiting its
+        response (see :py:class:`smartdc.hedge.HedgePolicy`)
+    :var start: time at which the attempt was sent
+    :var duration: seconds until the response arrived or the attempt failed
+    :var status: HTTP status of the response, if any
+    :var bytes: length of the response body, if any
+    :var response: the `Response`, if any
+    :var error: the exception raised instead of a response, if any
+    :var circuit: state of the circuit of the location requested (see
+        :py:class:`smartdc.breaker.CircuitBreaker`), if the DataCenter has a
+        `circuit_breaker`
+    """
+    def __init__(self, datacenter, method, url, path, attempt=0):
+        self.datacenter = datacenter
+        self.method = method
+        self.url = url
+        self.path = path
+        self.template = path_template(path)
+        self.attempt = attempt
+        self.hedge = False
+        self.start = None
+        self.duration = None
+        self.status = None
+        self.bytes = None
+        self.response = None
+        self.error = None
+        self.circuit = None
+
+    def __repr__(self):
+        return '<{module}.{cls}: {method} {template} {status}>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            method=self.method, template=self.template,
+            status=self.status or type(self.error).__name__)
+
+    @property
+    def endpoint(self):
+        """
+        The ``(method, template)`` pair identifying the kind of request.
+        """
+        return (self.method, self.template)
+
+
+class RequestHook(object):
+    """
+    Base class for observers of every request made by a
+    :py:class:`smartdc.datacenter.DataCenter`, given via its `hooks`.
+
+    Each attempt at a request (including retries) is reported first to
+    :py:meth:`before`, then to either :py:meth:`after` once a response of
+    any status arrives, or :py:meth:`error` if the attempt fails with an
+    exception. All three receive the same :py:class:`RequestEvent`, which
+    they may annotate. An attempt refused by an open circuit (see
+    :py:class:`smartdc.breaker.CircuitBreaker`) is reported as failing with
+    a :py:class:`smartdc.breaker.CircuitOpen` error, without taking any
+    time. Hooks are called on the thread making the request, so they should
+    be quick and, if shared, thread-safe; an exception raised by a hook
+    propagates to the caller, the attempt being reported to :py:meth:`error`
+    for each hook already told of it but not yet of its outcome.
+    """
+    def before(self, event):
+        """
+        Called as the attempt is about to be sent.
+        """
+        pass
+
+    def after(self, event):
+        """
+        Called once a response has arrived, with `status`, `bytes`,
+        `duration` and `response` set on the `event`.
+        """
+        pass
+
+    def error(self, event):
+        """
+        Called once the attempt has failed, with `duration` and `error` set
+        on the `event`.
+        """
+        pass
+
+    def retry(self, event, delay):
+        """
+        Called once the failed attempt reported by `event` (with its
+        `status` and `response`, or `error`) is to be repeated, after a
+        pause of `delay` seconds.
+        """
+        pass
+
+    def circuit(self, event, previous):
+        """
+        Called when the attempt moves the circuit of its location from the
+        `previous` state to that now set on the `event`: either as it is
+        sent (an open circuit turning half-open), or once its outcome is
+        known.
+        """
+        pass
+
+
+class VerboseHook(RequestHook):
+    """
+    Prints a timestamped line for each request and each retry to a stream,
+    along with the body of each error response, as enabled by the `verbose`
+    option of :py:class:`smartdc.datacenter.DataCenter`.
+    """
+    def __init__(self, stream):
+        """
+        :param stream: file-like object to which lines are written
+        """
+        self.stream = stream
+
+    def before(self, event):
+        print("%s\t%s\t%s" % (datetime.now().isoformat(), event.method,
+            event.url), file=self.stream)
+
+    def after(self, event):
+        if event.status >= 400 and event.response.content:
+            print(event.response.content, file=self.stream)
+
+    def retry(self, event, delay):
+        print("%s\tretrying %s %s in %.2fs after %s" % (
+            datetime.now().isoformat(), event.method, event.url, delay,
+            event.error or event.status), file=self.stream)
+
+
+class Histogram(object):
+    """
+    Counts of observed values (such as latencies in seconds) in fixed
+    buckets, from which quantiles are estimated.
+
+    Each quantile is interpolated within the bucket containing it, so its
+    accuracy depends on the bucket widths; values beyond the last bucket
+    are estimated by the largest value observed.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: increasing upper bounds of the buckets
+        :type buckets: :py:class:`tuple` of :py:class:`float`\s
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = None
+
+    def observe(self, value):
+        """
+        Count one `value`.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """
+        :param q: the fraction of values at or below the estimate, e.g.
+            ``0.95``
+        :type q: :py:class:`float`
+
+        :Returns: estimated `q`-quantile of the observed values, or ``None``
+            if none were observed
+        :rtype: :py:class:`float`
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.max
+            if n and seen + n >= rank:
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return self.max
+
+
+class LatencyCollector(RequestHook):
+    """
+    Keeps request counts, errors, bytes received and a latency
+    :py:class:`Histogram` for each endpoint (method and path template),
+    such as ``('GET', 'machines/:id')``.
+
+    Pass one collector in the `hooks` of any number of DataCenters to
+    aggregate all of their requests, e.g.::
+
+        collector = LatencyCollector()
+        sdc = DataCenter(..., hooks=[collector])
+        ...
+        print(collector.summary())
+
+    Every attempt is counted, so retries show up as additional requests.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: upper bounds in seconds of the latency buckets
+        :type buckets: :py:class:`tuple` of :py:class:`float`\s
+        """
+        self.buckets = buckets
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def _record(self, event):
+        with self._lock:
+            stats = self.endpoints.get(event.endpoint)
+            if stats is None:
+                stats = self.endpoints[event.endpoint] = {
+                    'latency': Histogram(self.buckets),
+                    'errors': 0,
+                    'bytes': 0,
+                    'statuses': {},
+                }
+            stats['latency'].observe(event.duration)
+            if event.error is not None or event.status >= 400:
+                stats['errors'] += 1
+            if event.status is not None:
+                stats['statuses'][event.status] = (
+                    stats['statuses'].get(event.status, 0) + 1)
+            stats['bytes'] += event.bytes or 0
+
+    after = _record
+    error = _record
+
+    def reset(self):
+        """
+        Forget everything collected so far.
+        """
+        with self._lock:
+            self.endpoints.clear()
+
+    def stats(self):
+        """
+        :Returns: mapping of each ``(method, template)`` endpoint to a
+            :py:class:`dict` of its ``count``, ``errors``, ``bytes``,
+            ``statuses`` (counts by HTTP status), ``total``, ``mean`` and
+            ``max`` (seconds), and estimated ``p50``, ``p95`` and ``p99``
+            latencies (seconds)
+        :rtype: :py:class:`dict`
+        """
+        result = {}
+        with self._lock:
+            for endpoint, stats in self.endpoints.items():
+                latency = stats['latency']
+                result[endpoint] = {
+                    'count': latency.count,
+                    'errors': stats['errors'],
+                    'bytes': stats['bytes'],
+                    'statuses': dict(stats['statuses']),
+                    'total': latency.sum,
+                    'mean': latency.sum / latency.count,
+                    'max': latency.max,
+                    'p50': latency.quantile(0.5),
+                    'p95': latency.quantile(0.95),
+                    'p99': latency.quantile(0.99),
+                }
+        return result
+
+    def summary(self):
+        """
+        :Returns: a table of the :py:meth:`stats` of each endpoint,
+            latencies in milliseconds, the endpoints taking the most time in
+            total first
+        :rtype: :py:class:`str`
+        """
+        rows = sorted(self.stats().items(), key=lambda i: -i[1]['total'])
+        lines = ['%-40s %7s %6s %9s %8s %8s %8s' % ('endpoint', 'count',
+            'errors', 'total(s)', 'p50', 'p95', 'p99')]
+        for (method, template), s in rows:
+            lines.append('%-40s %7d %6d %9.2f %8.1f %8.1f %8.1f' % (
+                method + ' ' + template, s['count'], s['errors'], s['total'],
+                s['p50'] * 1000, s['p95'] * 1000, s['p99'] * 1000))
+        return '\n'.join(lines)
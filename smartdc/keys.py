@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import base64
+import binascii
+import tempfile
+import threading
+from wsgiref.handlers import format_date_time
+
+from requests.auth import AuthBase
+from http_signature.utils import sig
+
+__all__ = ['KeyCache', 'AgentKeyAuth', 'fingerprint']
+
+
+def fingerprint(key):
+    """
+    :param key: an ssh-agent key, as held by
+        :py:class:`http_signature.sign.Signer`
+
+    :Returns: the key's MD5 fingerprint, such as ``'a1:b2:...'``, as used
+        for SmartDC key identifiers
+    :rtype: :py:class:`str`
+    """
+    digest = binascii.hexlify(key.get_fingerprint())
+    return ':'.join(digest[i:i + 2] for i in range(0, len(digest), 2))
+
+
+class AgentKeyAuth(AuthBase):
+    """
+    Signs a request as a :py:class:`http_signature.HTTPSignatureAuth` does,
+    but with the given ssh-agent key, rather than whichever key the shared
+    signer currently holds.
+    """
+    def __init__(self, auth, key):
+        """
+        :param auth: the DataCenter's authentication, giving the key
+            identifier and signed headers
+        :type auth: :py:class:`http_signature.requests_auth.HTTPSignatureAuth`
+
+        :param key: the ssh-agent key with which to sign
+        """
+        self.auth = auth
+        self.key = key
+
+    def __call__(self, r):
+        if 'Date' not in r.headers:
+            r.headers['Date'] = format_date_time(time.time())
+        if self.auth.headers:
+            signable = '\n'.join(r.headers[x] for x in self.auth.headers)
+        else:
+            signable = r.headers['Date']
+        signature = base64.b64encode(sig(self.key.sign_ssh_data(None,
+            signable)))
+        r.headers['Authorization'] = (self.auth.signature_string_head %
+            signature)
+        return r
+
+
+class KeyCache(object):
+    """
+    A thread-safe record of the ssh-agent key (by fingerprint) last accepted
+    for each location and login, so that a DataCenter signs with it first
+    rather than spending a rejected request on each key before it.
+
+    Given a `path`, the record is kept in that JSON file, so that it
+    survives from one process to the next. It holds only fingerprints,
+    which are not secret.
+    """
+    def __init__(self, path=None):
+        """
+        :param path: file in which to keep the record (default: memory only)
+        :type path: :py:class:`str`
+        """
+        self.path = path and os.path.expanduser(path)
+        self.keys = {}
+        self._lock = threading.Lock()
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as f:
+                self.keys = json.load(f)
+
+    def __repr__(self):
+        return '<{module}.{cls}: {n} locations{path}>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            n=len(self.keys), path=' in ' + self.path if self.path else '')
+
+    def lookup(self, location, login):
+        """
+        :Returns: the fingerprint of the key last accepted, if any
+        :rtype: :py:class:`str`
+        """
+        with self._lock:
+            return self.keys.get(location, {}).get(login)
+
+    def store(self, location, login, key_fingerprint):
+        """
+        Record the fingerprint of a key just accepted, saving it to the
+        `path` if it changed.
+        """
+        with self._lock:
+            if self.keys.get(location, {}).get(login) == key_fingerprint:
+                return
+            self.keys.setdefault(location, {})[login] = key_fingerprint
+            if self.path:
+                self._save()
+
+    def _save(self):
+        # replace the file at once, so that concurrent processes never read
+        # it half-written
+        directory = os.path.dirname(self.path) or '.'
+        fd, temporary = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.keys, f, indent=2, sort_keys=True)
+        os.rename(temporary, self.path)
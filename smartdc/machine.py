@@ -1,8 +1,18 @@
-import time
 from datetime import datetime
 import uuid
+# strptime imports _strptime upon first use, which fails when threads (such
+# as those of a MultiDataCenter) parse their first dates at once
+import _strptime
 
-__all__ = ['Machine', 'Snapshot']
+from .waiter import Waiter, UnexpectedTransition
+
+__all__ = ['Machine', 'Snapshot', 'MACHINE_TRANSITIONS']
+
+# a machine that fails to provision stays 'failed' for good
+MACHINE_TRANSITIONS = {
+    u'provisioning': (u'running', u'stopped', u'failed'),
+    u'stopping': (u'stopped',),
+}
 
 def priv(x): 
     """
@@ -318,7 +328,8 @@ class Machine(object):
         j, r = self.datacenter.request('DELETE', self.path)
         r.raise_for_status()
     
-    def poll_until(self, state, interval=2):
+    def poll_until(self, state, interval=2, timeout=None, transitions=None, 
+            waiter=None):
         """
         ::
         
@@ -327,21 +338,46 @@ class Machine(object):
         :param state: target state
         :type state: :py:class:`basestring`
         
-        :param interval: pause in seconds between polls
+        :param interval: initial pause in seconds between polls
         :type interval: :py:class:`int`
         
+        :param timeout: seconds after which to give up
+        :type timeout: :py:class:`float`
+        
+        :param transitions: expected state transitions, such as 
+            :py:data:`MACHINE_TRANSITIONS`
+        :type transitions: :py:class:`dict`
+        
+        :param waiter: polling policy, overriding the above
+        :type waiter: :py:class:`smartdc.waiter.Waiter`
+        
+        :raises: :py:class:`smartdc.waiter.OperationTimeout` or 
+            :py:class:`smartdc.waiter.UnexpectedTransition`
+        
         Convenience method that continuously polls the current state of the 
         machine remotely, and returns until the named `state` argument is 
-        reached. The default wait `interval` between requests is 2 seconds, 
-        but it may be changed.
-        
-        .. Note:: If the next state is wrongly identified, this method may
-            loop forever.
-        """
-        while self.status() != state:
-            time.sleep(interval)
-    
-    def poll_while(self, state, interval=2):
+        reached. The first wait `interval` between requests is 2 seconds, 
+        but it may be changed; subsequent waits back off exponentially (see 
+        :py:class:`smartdc.waiter.Waiter`). A machine that turns ``failed`` 
+        (unless that is the target) raises 
+        :py:class:`smartdc.waiter.UnexpectedTransition` at once, since it will 
+        never reach any other state.
+        
+        .. Note:: If the next state is wrongly identified and neither a 
+            `timeout` nor `transitions` are given, this method may loop 
+            forever, unless within a :py:func:`smartdc.waiter.time_limit`.
+        """
+        waiter = waiter or Waiter(interval=interval, timeout=timeout, 
+            transitions=transitions)
+        def reached(current):
+            if current == u'failed' and state != u'failed':
+                raise UnexpectedTransition('machine {0} failed while waiting '
+                    'for {1!r}'.format(self.id, state))
+            return current == state
+        return waiter.wait(self.status, reached)
+    
+    def poll_while(self, state, interval=2, timeout=None, transitions=None, 
+            waiter=None):
         """
         ::
         
@@ -350,19 +386,35 @@ class Machine(object):
         :param state: (assumed) current state
         :type state: :py:class:`basestring`
         
-        :param interval: pause in seconds between polls
+        :param interval: initial pause in seconds between polls
         :type interval: :py:class:`int`
         
+        :param timeout: seconds after which to give up
+        :type timeout: :py:class:`float`
+        
+        :param transitions: expected state transitions, such as 
+            :py:data:`MACHINE_TRANSITIONS`
+        :type transitions: :py:class:`dict`
+        
+        :param waiter: polling policy, overriding the above
+        :type waiter: :py:class:`smartdc.waiter.Waiter`
+        
+        :raises: :py:class:`smartdc.waiter.OperationTimeout` or 
+            :py:class:`smartdc.waiter.UnexpectedTransition`
+        
         Convenience method that continuously polls the current state of the 
         machine remotely, and returns while the machine has the named `state` 
-        argument. Once the state changes, the method returns. The default wait 
-        `interval` between requests is 2 seconds, but it may be changed.
+        argument. Once the state changes, the method returns the new state. 
+        The first wait `interval` between requests is 2 seconds, but it may 
+        be changed; subsequent waits back off exponentially.
         
-        .. Note:: If a state transition has not correctly been triggered, this
-            method may loop forever.
+        .. Note:: If a state transition has not correctly been triggered and 
+            no `timeout` is given, this method may loop forever, unless within 
+            a :py:func:`smartdc.waiter.time_limit`.
         """
-        while self.status() == state:
-            time.sleep(interval)
+        waiter = waiter or Waiter(interval=interval, timeout=timeout, 
+            transitions=transitions)
+        return waiter.wait(self.status, lambda s: s != state)
     
     def get_metadata(self):
         """
@@ -0,0 +1,235 @@
+import threading
+
+from .hooks import RequestHook, Histogram, DEFAULT_BUCKETS
+from .throttle import THROTTLE_STATUSES
+from .breaker import CLOSED, OPEN, HALF_OPEN
+
+__all__ = ['MetricsCollector', 'CONTENT_TYPE']
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+DEFAULT_METRICS_PORT = 9163
+
+LABELS = ('location', 'method', 'endpoint')
+
+CIRCUIT_STATES = (CLOSED, HALF_OPEN, OPEN)
+
+
+def escape(value):
+    """
+    Escape a label value for the OpenMetrics text format.
+    """
+    return (unicode(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def labels(names, values):
+    """
+    :Returns: the ``{name="value",...}`` label set of a sample
+    """
+    return u'{' + u','.join(u'%s="%s"' % (name, escape(value))
+                            for name, value in zip(names, values)) + u'}'
+
+
+def number(value):
+    """
+    :Returns: `value` as written in a sample
+    """
+    if value == float('inf'):
+        return u'+Inf'
+    return repr(float(value)) if isinstance(value, float) else unicode(value)
+
+
+class MetricsCollector(RequestHook):
+    """
+    Client-side CloudAPI metrics, rendered in the OpenMetrics (Prometheus)
+    text format.
+
+    As a hook given to one or more DataCenters (``hooks=[collector]``), it
+    counts each attempt at a request by ``location``, ``method`` and
+    ``endpoint`` (the path template, such as ``machines/:id``):
+
+    * ``smartdc_requests_total``: attempts, retries included
+    * ``smartdc_request_errors_total``: failed attempts, by ``status`` (an
+      HTTP status, or the name of the exception raised)
+    * ``smartdc_retries_total``: attempts repeating an earlier one
+    * ``smartdc_throttled_total``: attempts refused with 429 or 503
+    * ``smartdc_response_bytes_total``: bytes of response bodies received
+    * ``smartdc_request_duration_seconds``: a latency histogram
+    * ``smartdc_requests_in_flight``: a gauge of attempts awaiting a
+      response, by ``location``
+    * ``smartdc_circuit_state``: a state set of each ``location``'s circuit
+      (``closed``, ``open`` or ``half-open``), for DataCenters with a
+      `circuit_breaker`
+
+    :py:meth:`render` produces the exposition text, and :py:meth:`serve`
+    offers it to a scraper over HTTP.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='smartdc'):
+        """
+        :param buckets: upper bounds in seconds of the latency buckets
+        :type buckets: :py:class:`tuple` of :py:class:`float`\s
+
+        :param prefix: prefix of every metric name
+        :type prefix: :py:class:`str`
+        """
+        self.buckets = buckets
+        self.prefix = prefix
+        self.requests = {}
+        self.errors = {}
+        self.retries = {}
+        self.throttled = {}
+        self.bytes = {}
+        self.latency = {}
+        self.in_flight = {}
+        self.circuits = {}
+        self._lock = threading.Lock()
+
+    def _key(self, event):
+        return (event.datacenter.location, event.method, event.template)
+
+    def before(self, event):
+        location = event.datacenter.location
+        with self._lock:
+            self.in_flight[location] = self.in_flight.get(location, 0) + 1
+            if event.circuit is not None:
+                self.circuits[location] = event.circuit
+
+    def _record(self, event, status):
+        key = self._key(event)
+        with self._lock:
+            self.in_flight[key[0]] = self.in_flight.get(key[0], 1) - 1
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if event.attempt:
+                self.retries[key] = self.retries.get(key, 0) + 1
+            if status is not None:
+                self.errors[key + (status,)] = (
+                    self.errors.get(key + (status,), 0) + 1)
+            if event.status in THROTTLE_STATUSES:
+                self.throttled[key] = self.throttled.get(key, 0) + 1
+            self.bytes[key] = self.bytes.get(key, 0) + (event.bytes or 0)
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram(self.buckets)
+            histogram.observe(event.duration)
+
+    def after(self, event):
+        self._record(event, event.status if event.status >= 400 else None)
+
+    def error(self, event):
+        self._record(event, type(event.error).__name__)
+
+    def circuit(self, event, previous):
+        with self._lock:
+            self.circuits[event.datacenter.location] = event.circuit
+
+    def reset(self):
+        """
+        Forget all counts, except for requests in flight and circuit states.
+        """
+        with self._lock:
+            for metric in (self.requests, self.errors, self.retries,
+                    self.throttled, self.bytes, self.latency):
+                metric.clear()
+
+    def _family(self, lines, name, kind, help, samples):
+        name = self.prefix + '_' + name
+        lines.append(u'# TYPE %s %s' % (name, kind))
+        lines.append(u'# HELP %s %s' % (name, help))
+        for suffix, names, values, value in samples:
+            lines.append(u'%s%s%s %s' % (name, suffix, labels(names, values),
+                number(value)))
+
+    def render(self):
+        """
+        :Returns: all metrics in the OpenMetrics text format
+        :rtype: :py:class:`unicode`
+        """
+        lines = []
+        with self._lock:
+            counters = [
+                ('requests', 'CloudAPI requests made, including retries.',
+                 self.requests, LABELS),
+                ('request_errors', 'CloudAPI requests failed, by HTTP '
+                 'status or exception.', self.errors, LABELS + ('status',)),
+                ('retries', 'CloudAPI requests repeating a failed request.',
+                 self.retries, LABELS),
+                ('throttled', 'CloudAPI requests refused with 429 or 503.',
+                 self.throttled, LABELS),
+                ('response_bytes', 'Bytes of CloudAPI response bodies.',
+                 self.bytes, LABELS),
+            ]
+            for name, help, counts, names in counters:
+                self._family(lines, name, 'counter', help, [
+                    ('_total', names, key, count)
+                    for key, count in sorted(counts.items())])
+            self._family(lines, 'requests_in_flight', 'gauge',
+                'CloudAPI requests awaiting a response.', [
+                    ('', ('location',), (location,), count)
+                    for location, count in sorted(self.in_flight.items())])
+            state_label = self.prefix + '_circuit_state'
+            self._family(lines, 'circuit_state', 'stateset',
+                'State of the circuit breaker of each CloudAPI location.', [
+                    ('', ('location', state_label), (location, state),
+                     int(state == current))
+                    for location, current in sorted(self.circuits.items())
+                    for state in CIRCUIT_STATES])
+            samples = []
+            for key, histogram in sorted(self.latency.items()):
+                cumulative = 0
+                bounds = histogram.buckets + (float('inf'),)
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    samples.append(('_bucket', LABELS + ('le',),
+                        key + (number(float(bound)),), cumulative))
+                samples.append(('_count', LABELS, key, histogram.count))
+                samples.append(('_sum', LABELS, key, histogram.sum))
+            self._family(lines, 'request_duration_seconds', 'histogram',
+                'Seconds from sending a CloudAPI request to its response.',
+                samples)
+        lines.append(u'# EOF')
+        return u'\n'.join(lines) + u'\n'
+
+    def serve(self, port=DEFAULT_METRICS_PORT, address='127.0.0.1'):
+        """
+        :param port: TCP port on which to listen (``0`` for any free port)
+        :type port: :py:class:`int`
+
+        :param address: interface on which to listen (default: local only)
+        :type address: :py:class:`str`
+
+        :Returns: the running server, whose ``server_address`` gives the
+            port actually used, and whose ``shutdown()`` method stops it
+        :rtype: :py:class:`BaseHTTPServer.HTTPServer`
+
+        Answer ``GET /metrics`` with the :py:meth:`render`\ed metrics from
+        a background thread.
+        """
+        import BaseHTTPServer
+        import SocketServer
+        collector = self
+
+        class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = collector.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        class MetricsServer(SocketServer.ThreadingMixIn,
+                BaseHTTPServer.HTTPServer):
+            daemon_threads = True
+
+        server = MetricsServer((address, port), MetricsHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return server
@@ -0,0 +1,180 @@
+import threading
+import Queue
+
+from .waiter import time_limit, time_left
+
+__all__ = ['MultiDataCenter']
+
+
+class MultiDataCenter(object):
+    """
+    Runs the same query against several locations at once, e.g.::
+
+        multi = MultiDataCenter(DataCenter(key_id=..., secret=...))
+        machines, errors = multi.machines(state='running')
+        for location, error in errors.items():
+            print(location, 'failed:', error)
+
+    Each location gets a DataCenter derived via
+    :py:meth:`smartdc.datacenter.DataCenter.datacenter` (so sharing the
+    session, caches, rate limiter, hooks and so on of the given one), and
+    its own worker thread, so that a sweep takes as long as the slowest
+    location rather than the sum of them all. A location failing, or taking
+    longer than the `timeout`, is reported in the errors alongside the
+    results of the others.
+    """
+    def __init__(self, datacenter, locations=None, timeout=None):
+        """
+        :param datacenter: DataCenter from which to derive the others,
+            itself used for its own location
+        :type datacenter: :py:class:`smartdc.datacenter.DataCenter`
+
+        :param locations: locations to query (default: every one of the
+            DataCenter's `known_locations`)
+        :type locations: :py:class:`list` of :py:class:`basestring`\s
+
+        :param timeout: seconds after which a location's query fails with a
+            :py:class:`smartdc.waiter.OperationTimeout`
+        :type timeout: :py:class:`float`
+        """
+        self.datacenter = datacenter
+        self.locations = list(locations or sorted(datacenter.known_locations))
+        self.timeout = timeout
+        self._datacenters = {datacenter.location: datacenter}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<{module}.{cls}: {locations}>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            locations=', '.join(self.locations))
+
+    def location(self, name):
+        """
+        :Returns: the DataCenter for the location `name`, derived upon
+            first use
+        :rtype: :py:class:`smartdc.datacenter.DataCenter`
+        """
+        with self._lock:
+            dc = self._datacenters.get(name)
+        if dc is None:
+            dc = self.datacenter.datacenter(name)
+            with self._lock:
+                dc = self._datacenters.setdefault(name, dc)
+        return dc
+
+    def each(self, call, *args, **kwargs):
+        """
+        :param call: name of a :py:class:`smartdc.datacenter.DataCenter`
+            method (such as ``'machines'``), or a callable taking a
+            DataCenter as first argument
+        :type call: :py:class:`basestring` or callable
+
+        :Returns: a ``(location, result, error)`` tuple for each location, in
+            order of completion
+        :rtype: generator of :py:class:`tuple`\s
+
+        Call the method (with any further arguments) on the DataCenter for
+        every location concurrently. Either `result` is the call's return
+        value and `error` is ``None``, or `error` is the exception it raised.
+        Each call runs within a :py:func:`smartdc.waiter.time_limit` of the
+        `timeout`, brought forward to the caller's own enclosing time limit.
+        """
+        if callable(call):
+            func = lambda dc: call(dc, *args, **kwargs)
+        else:
+            func = lambda dc: getattr(dc, call)(*args, **kwargs)
+        limit = self.timeout
+        left = time_left()
+        if left is not None and (limit is None or left < limit):
+            limit = left
+        done = Queue.Queue()
+
+        def work(name):
+            try:
+                with time_limit(limit):
+                    result = func(self.location(name))
+                done.put((name, result, None))
+            except Exception as e:
+                done.put((name, None, e))
+
+        for name in self.locations:
+            worker = threading.Thread(target=work, args=(name,))
+            worker.daemon = True
+            worker.start()
+        for _ in self.locations:
+            yield done.get()
+
+    def call(self, call, *args, **kwargs):
+        """
+        :Returns: a mapping of each location to its result, and another of
+            each failed location to its error
+        :rtype: :py:class:`tuple` of two :py:class:`dict`\s
+
+        Arguments are as for :py:meth:`each`.
+        """
+        results, errors = {}, {}
+        for name, result, error in self.each(call, *args, **kwargs):
+            if error is None:
+                results[name] = result
+            else:
+                errors[name] = error
+        return results, errors
+
+    def _merged(self, call, tag, *args, **kwargs):
+        results, errors = self.call(call, *args, **kwargs)
+        merged = []
+        for name in self.locations:
+            for item in results.get(name, ()):
+                merged.append(dict(item, location=name) if tag else item)
+        return merged, errors
+
+    def machines(self, **kwargs):
+        """
+        ::
+
+            GET /:login/machines
+
+        :Returns: the machines of every location (each knowing its own
+            `datacenter`), in order of location, and a mapping of each
+            failed location to its error
+        :rtype: :py:class:`tuple` of a :py:class:`list` of
+            :py:class:`smartdc.machine.Machine`\s and a :py:class:`dict`
+
+        Keyword arguments are as for
+        :py:meth:`smartdc.datacenter.DataCenter.machines`.
+        """
+        return self._merged('machines', False, **kwargs)
+
+    def images(self, **kwargs):
+        """
+        ::
+
+            GET /:login/images
+
+        :Returns: the images of every location, each with a ``location``
+            key, in order of location, and a mapping of each failed location
+            to its error
+        :rtype: :py:class:`tuple` of a :py:class:`list` of
+            :py:class:`dict`\s and a :py:class:`dict`
+
+        Keyword arguments are as for
+        :py:meth:`smartdc.datacenter.DataCenter.images`.
+        """
+        return self._merged('images', True, **kwargs)
+
+    def packages(self, **kwargs):
+        """
+        ::
+
+            GET /:login/packages
+
+        :Returns: the packages of every location, each with a ``location``
+            key, in order of location, and a mapping of each failed location
+            to its error
+        :rtype: :py:class:`tuple` of a :py:class:`list` of
+            :py:class:`dict`\s and a :py:class:`dict`
+
+        Keyword arguments are as for
+        :py:meth:`smartdc.datacenter.DataCenter.packages`.
+        """
+        return self._merged('packages', True, **kwargs)
@@ -1,9 +1,9 @@
-import requests
-import time
 import uuid
 import json
 import re
 
+from .waiter import Waiter
+
 __all__ = ['Network']
 
 class Network(object):
@@ -168,7 +168,8 @@ class Network(object):
         j, r = self.datacenter.request('DELETE', self.path)
         r.raise_for_status()
 
-    def poll_until(self, status, interval=2):
+    def poll_until(self, status, interval=2, timeout=None, transitions=None,
+            waiter=None):
         """
         ::
 
@@ -177,21 +178,37 @@ class Network(object):
         :param status: target status
         :type status: :py:class:`basestring`
 
-        :param interal: pause in seconds between polls
+        :param interval: initial pause in seconds between polls
         :type interval: :py:class:`int`
 
+        :param timeout: seconds after which to give up
+        :type timeout: :py:class:`float`
+
+        :param transitions: expected status transitions
+        :type transitions: :py:class:`dict`
+
+        :param waiter: polling policy, overriding the above
+        :type waiter: :py:class:`smartdc.waiter.Waiter`
+
+        :raises: :py:class:`smartdc.waiter.OperationTimeout` or
+            :py:class:`smartdc.waiter.UnexpectedTransition`
+
         Convenience method that continuously polls the current state of the
         machine remotely, and returns until the named `status` argument is
-        reached. The default wait `interval` between requests is 2 seconds,
-        but it may be changed.
+        reached. The first wait `interval` between requests is 2 seconds,
+        but it may be changed; subsequent waits back off exponentially (see
+        :py:class:`smartdc.waiter.Waiter`).
 
-        .. Note:: If the next status is wrongly identified, this method may
-            loop forever.
+        .. Note:: If the next status is wrongly identified and neither a
+            `timeout` nor `transitions` are given, this method may loop
+            forever, unless within a :py:func:`smartdc.waiter.time_limit`.
         """
-        while self.status() != status:
-            time.sleep(interval)
+        waiter = waiter or Waiter(interval=interval, timeout=timeout,
+            transitions=transitions)
+        return waiter.wait(self.status, lambda s: s == status)
 
-    def poll_while(self, status, interval=2):
+    def poll_while(self, status, interval=2, timeout=None, transitions=None,
+            waiter=None):
         """
         ::
 
@@ -200,19 +217,34 @@ class Network(object):
         :param status: (assumed) current status
         :type status: :py:class:`basestring`
 
-        :param interval: pause in seconds between polls
+        :param interval: initial pause in seconds between polls
         :type interval: :py:class:`int`
 
+        :param timeout: seconds after which to give up
+        :type timeout: :py:class:`float`
+
+        :param transitions: expected status transitions
+        :type transitions: :py:class:`dict`
+
+        :param waiter: polling policy, overriding the above
+        :type waiter: :py:class:`smartdc.waiter.Waiter`
+
+        :raises: :py:class:`smartdc.waiter.OperationTimeout` or
+            :py:class:`smartdc.waiter.UnexpectedTransition`
+
         Convenience method that continuously polls the current status of the
         network remotely, and returns while the network has the named `status`
-        argument. Once the status changes, the method returns. The default wait
-        `interval` between requests is 2 seconds, but it may be changed.
+        argument. Once the status changes, the method returns the new status.
+        The first wait `interval` between requests is 2 seconds, but it may
+        be changed; subsequent waits back off exponentially.
 
-        .. Note:: If a status transition has not correctly been triggered, this
-            method may loop forever.
+        .. Note:: If a status transition has not correctly been triggered and
+            no `timeout` is given, this method may loop forever, unless within
+            a :py:func:`smartdc.waiter.time_limit`.
         """
-        while self.status() == status:
-            time.sleep(interval)
+        waiter = waiter or Waiter(interval=interval, timeout=timeout,
+            transitions=transitions)
+        return waiter.wait(self.status, lambda s: s != status)
 
     def set_outbound_status(self, enabled):
         """
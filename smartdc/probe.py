@@ -0,0 +1,231 @@
+import ssl
+import time
+import socket
+import httplib
+import threading
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+__all__ = ['LocationProbe', 'measure']
+
+DEFAULT_PROBE_TIMEOUT = 2
+
+
+def measure(url, timeout=DEFAULT_PROBE_TIMEOUT, verify=True):
+    """
+    :param url: the CloudAPI URL of a location
+    :type url: :py:class:`basestring`
+
+    :param timeout: seconds to wait for each step
+    :type timeout: :py:class:`float`
+
+    :param verify: whether to verify the server's TLS certificate
+    :type verify: :py:class:`bool`
+
+    :Returns: seconds taken to open a TCP connection (``connect``), to
+        perform the TLS handshake over it (``tls``, zero for plain HTTP),
+        and for a ``HEAD /`` request's round trip over it (``rtt``)
+    :rtype: :py:class:`dict`
+    :raises: :py:class:`socket.error` (including
+        :py:class:`ssl.SSLError`) or :py:class:`httplib.HTTPException` if
+        the location is unreachable, or :py:class:`ssl.CertificateError`
+        (a :py:class:`ValueError`) if its certificate does not match
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    start = time.time()
+    sock = socket.create_connection((parts.hostname, port), timeout)
+    try:
+        connected = time.time()
+        if secure:
+            context = ssl.create_default_context()
+            if not verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            sock = context.wrap_socket(sock, server_hostname=parts.hostname)
+        secured = time.time()
+        conn = httplib.HTTPConnection(parts.hostname, port, timeout=timeout)
+        conn.sock = sock
+        conn.request('HEAD', '/', headers={'Accept': 'application/json'})
+        conn.getresponse().read()
+        done = time.time()
+    finally:
+        sock.close()
+    return {'connect': connected - start, 'tls': secured - connected,
+            'rtt': done - secured}
+
+
+class LocationProbe(object):
+    """
+    Measures how quickly each location can be reached from here, and picks
+    the fastest, e.g.::
+
+        probe = LocationProbe()
+        sdc = probe.datacenter(key_id=..., secret=...)
+
+    A probe of a location (see :py:func:`measure`) makes a few fresh
+    connections to it, and scores it by the quickest: the sum of the TCP
+    connection, TLS handshake and request round-trip times. Scores are
+    smoothed across probes (an exponentially weighted moving average), so
+    that a single slow probe does not move a client between locations. A
+    location whose every attempt fails is unreachable until a later probe
+    succeeds.
+
+    Any mapping of locations to URLs may be probed, such as
+    :py:data:`smartdc.tef.TELEFONICA_LOCATIONS` (together with
+    ``cls=TefDataCenter`` for :py:meth:`datacenter`).
+    """
+    def __init__(self, known_locations=None, attempts=3,
+            timeout=DEFAULT_PROBE_TIMEOUT, smoothing=0.3, verify=True):
+        """
+        :param known_locations: keys-to-URLs mapping of locations to probe
+            (default: :py:data:`smartdc.datacenter.KNOWN_LOCATIONS`)
+        :type known_locations: :py:class:`dict`
+
+        :param attempts: connections made to each location per probe
+        :type attempts: :py:class:`int`
+
+        :param timeout: seconds to wait for each step of each connection
+        :type timeout: :py:class:`float`
+
+        :param smoothing: weight of each new probe in a location's score,
+            from ``0`` (ignored) to ``1`` (replacing the score)
+        :type smoothing: :py:class:`float`
+
+        :param verify: whether to verify servers' TLS certificates
+        :type verify: :py:class:`bool`
+
+        :var results: :py:class:`dict` of each probed location's latest
+            ``connect``, ``tls`` and ``rtt`` times, smoothed ``score``
+            (seconds), number of ``probes``, last ``error`` (or ``None`` if
+            reachable) and ``time`` of probing
+        """
+        if known_locations is None:
+            from .datacenter import KNOWN_LOCATIONS as known_locations
+        self.known_locations = known_locations
+        self.attempts = attempts
+        self.timeout = timeout
+        self.smoothing = smoothing
+        self.verify = verify
+        self.results = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<{module}.{cls}: {n} locations>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            n=len(self.known_locations))
+
+    def probe_location(self, location):
+        """
+        Probe one location, and update its score.
+
+        :Returns: the location's updated entry in `results`
+        :rtype: :py:class:`dict`
+        """
+        best, error = None, None
+        for _ in range(self.attempts):
+            try:
+                sample = measure(self.known_locations[location],
+                    timeout=self.timeout, verify=self.verify)
+            except (socket.error, httplib.HTTPException, ValueError) as e:
+                # ValueError includes ssl.CertificateError, upon a
+                # certificate not matching the location's hostname
+                error = e
+                continue
+            if best is None or sum(sample.values()) < sum(best.values()):
+                best = sample
+        with self._lock:
+            result = dict(self.results.get(location) or
+                          {'score': None, 'probes': 0, 'error': None})
+            result['time'] = time.time()
+            result['probes'] += 1
+            if best is None:
+                result['error'] = error
+            else:
+                total = sum(best.values())
+                # start afresh with a location first reached, or reached
+                # again after being unreachable
+                if result['score'] is None or result['error'] is not None:
+                    result['score'] = total
+                else:
+                    result['score'] += self.smoothing * (total -
+                                                         result['score'])
+                result.update(best)
+                result['error'] = None
+            self.results[location] = result
+        return result
+
+    def probe(self, locations=None):
+        """
+        Probe every location (or those given) at once.
+
+        :Returns: the reachable locations, fastest first
+        :rtype: :py:class:`list` of :py:class:`basestring`\s
+        """
+        threads = []
+        for location in locations or self.known_locations:
+            thread = threading.Thread(target=self.probe_location,
+                args=(location,))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return self.ranking(locations)
+
+    def ranking(self, locations=None):
+        """
+        :Returns: the reachable locations among those probed (or given),
+            fastest first, without probing
+        :rtype: :py:class:`list` of :py:class:`basestring`\s
+        """
+        with self._lock:
+            scores = [(r['score'], location)
+                      for location, r in self.results.items()
+                      if r['error'] is None and
+                      (not locations or location in locations)]
+        return [location for _, location in sorted(scores)]
+
+    def fastest(self, locations=None, max_age=None):
+        """
+        :param max_age: seconds after which earlier probes are repeated
+            (default: probe only the first time)
+        :type max_age: :py:class:`float`
+
+        :Returns: the fastest reachable location (among those given), or
+            ``None`` if none is reachable
+        :rtype: :py:class:`basestring`
+        """
+        candidates = locations or list(self.known_locations)
+        now = time.time()
+        stale = [location for location in candidates
+                 if location not in self.results or (max_age is not None and
+                    now - self.results[location]['time'] > max_age)]
+        if stale:
+            self.probe(stale)
+        ranking = self.ranking(candidates)
+        return ranking[0] if ranking else None
+
+    def datacenter(self, cls=None, locations=None, max_age=None, **kwargs):
+        """
+        :param cls: the class of the DataCenter (default:
+            :py:class:`smartdc.datacenter.DataCenter`)
+
+        :Returns: a DataCenter for the :py:meth:`fastest` location (among
+            those given); further keyword arguments are passed to it
+        :raises: :py:class:`requests.exceptions.ConnectionError` if no
+            location is reachable
+        """
+        location = self.fastest(locations, max_age=max_age)
+        if location is None:
+            from requests.exceptions import ConnectionError
+            raise ConnectionError('no location is reachable')
+        if cls is None:
+            from .datacenter import DataCenter as cls
+        kwargs.setdefault('known_locations', self.known_locations)
+        kwargs.setdefault('verify', self.verify)
+        return cls(location=location, **kwargs)
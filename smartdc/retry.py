@@ -0,0 +1,223 @@
+import random
+import threading
+
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+
+from .throttle import THROTTLE_STATUSES, retry_after
+
+__all__ = ['RetryPolicy', 'RetryBudget', 'IDEMPOTENT_METHODS',
+           'RETRY_STATUSES']
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'])
+
+RETRY_STATUSES = frozenset([500, 502, 503, 504])
+
+
+def never_sent(error):
+    """
+    Whether a failed request certainly never reached the server, so that
+    even a non-idempotent request may be safely repeated.
+    """
+    if isinstance(error, ConnectTimeout):
+        return True
+    if isinstance(error, ConnectionError) and error.args:
+        # urllib3 reports a refused or unresolvable connection as a
+        # NewConnectionError (or a subclass), which requests wraps as the
+        # reason of a MaxRetryError, and Urllib3Transport passes on as is
+        cause = error.args[0]
+        for failure in (cause, getattr(cause, 'reason', None)):
+            if any(cls.__name__ == 'NewConnectionError'
+                   for cls in type(failure).__mro__):
+                return True
+    return False
+
+
+class RetryBudget(object):
+    """
+    A thread-safe allowance of retries, in proportion to requests made.
+
+    Every request adds `ratio` to the allowance, up to `reserve`, and every
+    retry takes one from it; when less than one remains, failures are
+    raised without a retry. While the server is healthy the allowance fills
+    up to `reserve`, so that occasional failures are all retried, but during
+    an outage retries add no more than `ratio` to the load on the server.
+    """
+    def __init__(self, ratio=0.2, reserve=10):
+        """
+        :param ratio: retries allowed per request
+        :type ratio: :py:class:`float`
+
+        :param reserve: largest number of retries that may accumulate
+        :type reserve: :py:class:`float`
+        """
+        self.ratio = ratio
+        self.reserve = reserve
+        self.balance = float(reserve)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<{module}.{cls}: {balance:.1f} of {reserve}>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            balance=self.balance, reserve=self.reserve)
+
+    def deposit(self):
+        """
+        Record a request, adding `ratio` to the allowance.
+        """
+        with self._lock:
+            self.balance = min(self.reserve, self.balance + self.ratio)
+
+    def withdraw(self):
+        """
+        :Returns: whether a retry is allowed, in which case it is deducted
+        :rtype: :py:class:`bool`
+        """
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """
+    Decides which failed requests to repeat, and after what pause.
+
+    A request that never reached the server (its connection was refused or
+    timed out), or that the server refused with ``429 Too Many Requests``,
+    or with ``503 Service Unavailable`` and a ``Retry-After`` header, is
+    retried whatever its method. Requests with an idempotent method (GET,
+    HEAD, PUT, DELETE and OPTIONS) are also retried after any connection
+    error or timeout, any 503, or an error status in `statuses`; a POST,
+    which may have been acted upon (such as creating a machine), is not.
+
+    The pause before each retry is the one asked for by the server's
+    ``Retry-After`` header, or else `backoff` seconds doubling with each
+    attempt, randomly shortened by up to the fraction `jitter`; in either
+    case it is at most `max_delay`. Retries of requests refused with 429 and
+    a ``Retry-After`` are paced by the server, and so are not drawn from
+    the :py:class:`RetryBudget` (only `retries` limits them); those of a 503
+    are, whether or not it carries a ``Retry-After``, since a load balancer
+    may send one with every 503 during an outage.
+    Subclasses may override :py:meth:`retryable` and :py:meth:`backoff_delay`
+    to change either decision.
+    """
+    def __init__(self, retries=3, backoff=0.5, max_delay=30, jitter=0.1,
+            budget_ratio=0.2, budget_reserve=10, methods=IDEMPOTENT_METHODS,
+            statuses=RETRY_STATUSES):
+        """
+        :param retries: largest number of retries of each request
+        :type retries: :py:class:`int`
+
+        :param backoff: pause in seconds before the first retry
+        :type backoff: :py:class:`float`
+
+        :param max_delay: longest pause in seconds before any retry
+        :type max_delay: :py:class:`float`
+
+        :param jitter: fraction by which each pause is randomly shortened
+        :type jitter: :py:class:`float`
+
+        :param budget_ratio: retries allowed per request by each
+            DataCenter's :py:class:`RetryBudget`, or ``None`` for no budget
+        :type budget_ratio: :py:class:`float`
+
+        :param budget_reserve: largest number of retries that may accumulate
+            in each DataCenter's :py:class:`RetryBudget`
+        :type budget_reserve: :py:class:`float`
+
+        :param methods: HTTP methods that are safe to repeat
+        :type methods: :py:class:`frozenset`
+
+        :param statuses: error statuses upon which to repeat an idempotent
+            request
+        :type statuses: :py:class:`frozenset`
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.budget_ratio = budget_ratio
+        self.budget_reserve = budget_reserve
+        self.methods = methods
+        self.statuses = statuses
+
+    def __repr__(self):
+        return '<{module}.{cls}: {retries} retries>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            retries=self.retries)
+
+    def budget(self):
+        """
+        :Returns: a new, full retry budget for a DataCenter using this policy
+        :rtype: :py:class:`RetryBudget` or ``None``
+        """
+        if self.budget_ratio is None:
+            return None
+        return RetryBudget(ratio=self.budget_ratio,
+            reserve=self.budget_reserve)
+
+    def retryable(self, method, resp=None, error=None):
+        """
+        :param method: HTTP verb of the failed request
+        :type method: :py:class:`str`
+
+        :param resp: the response received, if any
+        :type resp: :py:class:`requests.Response`
+
+        :param error: the exception raised instead of a response, if any
+        :type error: :py:class:`requests.exceptions.RequestException`
+
+        :Returns: whether the request may be repeated
+        :rtype: :py:class:`bool`
+        """
+        idempotent = method.upper() in self.methods
+        if error is not None:
+            if never_sent(error):
+                return True
+            return idempotent and isinstance(error, (ConnectionError, Timeout))
+        if idempotent and (resp.status_code in THROTTLE_STATUSES or
+                           resp.status_code in self.statuses):
+            return True
+        # a 503 from a proxy or load balancer does not prove that the server
+        # skipped the request, unless it asks for a retry
+        return resp.status_code == 429 or (resp.status_code == 503 and
+                                           'retry-after' in resp.headers)
+
+    def backoff_delay(self, attempt, resp=None):
+        """
+        :Returns: seconds to pause before retry number `attempt` (counting
+            from 0) of a request that failed with `resp`, if any
+        :rtype: :py:class:`float`
+        """
+        delay = retry_after(resp) if resp is not None else None
+        if delay is not None:
+            return min(delay, self.max_delay)
+        delay = min(self.backoff * 2 ** attempt, self.max_delay)
+        return delay * (1 - random.uniform(0, self.jitter))
+
+    def delay(self, method, attempt, resp=None, error=None, budget=None):
+        """
+        :param attempt: number of retries already made (counting from 0)
+        :type attempt: :py:class:`int`
+
+        :param budget: the retry budget to draw upon, if any
+        :type budget: :py:class:`RetryBudget`
+
+        :Returns: seconds to pause before repeating the request, or ``None``
+            if it is not to be repeated
+        :rtype: :py:class:`float`
+
+        `method`, `resp` and `error` are as for :py:meth:`retryable`.
+        """
+        if attempt >= self.retries:
+            return None
+        if not self.retryable(method, resp=resp, error=error):
+            return None
+        # a server throttling requests sets the pace of their retries, but a
+        # 503 may come from an outage that retries would only amplify
+        paced = (resp is not None and resp.status_code == 429 and
+                 retry_after(resp) is not None)
+        if budget is not None and not paced and not budget.withdraw():
+            return None
+        return self.backoff_delay(attempt, resp=resp)
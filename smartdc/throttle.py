@@ -0,0 +1,110 @@
+import time
+import threading
+from email.utils import parsedate_tz, mktime_tz
+
+from .waiter import OperationTimeout
+
+__all__ = ['TokenBucket', 'THROTTLE_STATUSES']
+
+THROTTLE_STATUSES = frozenset([429, 503])
+
+
+class TokenBucket(object):
+    """
+    A thread-safe token-bucket rate limiter.
+
+    The bucket holds up to `burst` tokens and refills at `rate` tokens per
+    second; each request takes a token, waiting for one if the bucket is
+    empty. The same bucket may be shared by several
+    :py:class:`smartdc.datacenter.DataCenter` objects to limit their
+    combined request rate.
+    """
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: sustained number of requests per second
+        :type rate: :py:class:`float`
+
+        :param burst: number of requests that may be made at once after an
+            idle period (default: `rate`, and at least 1)
+        :type burst: :py:class:`float`
+
+        :raises: :py:class:`ValueError` unless `rate` is positive and
+            `burst` at least 1
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive, not %r' % rate)
+        if burst is not None and burst < 1:
+            raise ValueError('burst must be at least 1, not %r' % burst)
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self.tokens = self.burst
+        self._updated = time.time()
+        self._held_until = 0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '<{module}.{cls}: {rate}/s, burst {burst}>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            rate=self.rate, burst=self.burst)
+
+    def _refill(self, now):
+        self.tokens = min(self.burst,
+            self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        """
+        Take a token, first waiting for one to become available and for any
+        :py:meth:`hold` to pass.
+
+        :param timeout: longest wait in seconds, such as the time left by a
+            :py:func:`smartdc.waiter.time_limit` (default: no limit)
+        :type timeout: :py:class:`float`
+
+        :Returns: seconds spent waiting
+        :rtype: :py:class:`float`
+        :raises: :py:class:`smartdc.waiter.OperationTimeout` at once, without
+            taking a token, if the wait would last beyond `timeout`
+        """
+        start = time.time()
+        while True:
+            with self._lock:
+                now = time.time()
+                self._refill(now)
+                if now < self._held_until:
+                    wait = self._held_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - start
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            if timeout is not None and now + wait > start + timeout:
+                raise OperationTimeout('no request allowed by the rate limit '
+                    'within %.1fs' % timeout)
+            time.sleep(wait)
+
+    def hold(self, seconds):
+        """
+        Keep all requests through this bucket waiting for at least `seconds`,
+        as when the server asks for a pause with ``Retry-After``.
+        """
+        with self._lock:
+            self._held_until = max(self._held_until, time.time() + seconds)
+
+
+def retry_after(resp):
+    """
+    :Returns: seconds to wait as requested by the response's ``Retry-After``
+        header (as delay-seconds or an HTTP-date), or ``None``
+    """
+    value = resp.headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        parsed = parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(mktime_tz(parsed) - time.time(), 0)
+
@@ -0,0 +1,258 @@
+"""
+The transports through which a :py:class:`smartdc.datacenter.DataCenter`
+exchanges requests and responses with a CloudAPI.
+
+A transport sends a signed, prepared request, and returns the response's
+status, reason, headers and body (see :py:meth:`Transport.send`); the
+DataCenter neither knows nor cares how. Three are provided:
+
+* :py:class:`RequestsTransport`, the default, sends through a
+  :py:class:`requests.Session` (and so through any adapters mounted on it,
+  such as those of a :py:class:`smartdc.cassette.Cassette`)
+* :py:class:`Urllib3Transport` sends straight through :py:mod:`urllib3`
+  connection pools, skipping the per-request work of a session (merging of
+  settings, cookies, redirects and hooks), for high request rates
+* :py:class:`MemoryTransport` hands each request to a function in the same
+  process, such as :py:meth:`smartdc.fakeapi.FakeCloudAPI.respond`, for
+  tests without any socket
+"""
+import time
+import httplib
+import threading
+from datetime import timedelta
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+import requests
+from requests.exceptions import (ConnectionError, ConnectTimeout,
+                                 ReadTimeout, SSLError)
+from requests.structures import CaseInsensitiveDict
+from requests.utils import (DEFAULT_CA_BUNDLE_PATH, default_headers,
+                            get_encoding_from_headers)
+
+__all__ = ['Transport', 'RequestsTransport', 'Urllib3Transport',
+           'MemoryTransport', 'build_response']
+
+
+def build_response(request, status, reason, headers, content, elapsed=0):
+    """
+    :param request: the request answered
+    :type request: :py:class:`requests.PreparedRequest`
+
+    :Returns: a response holding the given `status`, `reason`, `headers`
+        and `content`, received after `elapsed` seconds
+    :rtype: :py:class:`requests.Response`
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content or b''
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.elapsed = timedelta(seconds=elapsed)
+    return response
+
+
+class Transport(object):
+    """
+    The interface of a transport. Subclasses implement :py:meth:`send`,
+    and may override :py:meth:`request` where they can do better than to
+    prepare the request and send it.
+
+    Failures to reach the server are raised as
+    :py:class:`requests.exceptions.ConnectionError` (or its subclasses),
+    and timeouts as :py:class:`requests.exceptions.Timeout`, whatever the
+    transport, so that they are retried alike.
+    """
+    def __repr__(self):
+        return '<{module}.{cls}>'.format(module=self.__module__,
+            cls=self.__class__.__name__)
+
+    def request(self, method, url, params=None, data=None, headers=None,
+            auth=None, timeout=None, verify=True):
+        """
+        Prepare, sign and send a request, as
+        :py:meth:`requests.Session.request` would (less any redirection).
+
+        :param auth: signs the prepared request
+        :type auth: :py:class:`requests.auth.AuthBase`
+
+        :param timeout: seconds to wait for the connection and each read,
+            either as one number or a ``(connect, read)`` tuple
+        :type timeout: :py:class:`float` or :py:class:`tuple`
+
+        :Returns: the response
+        :rtype: :py:class:`requests.Response`
+        """
+        merged = default_headers()
+        if headers:
+            merged.update(headers)
+        prepared = requests.Request(method, url, params=params, data=data,
+            headers=merged, auth=auth).prepare()
+        start = time.time()
+        status, reason, response_headers, content = self.send(prepared,
+            timeout=timeout, verify=verify)
+        return build_response(prepared, status, reason, response_headers,
+            content, time.time() - start)
+
+    def send(self, request, timeout=None, verify=True):
+        """
+        :param request: a signed request
+        :type request: :py:class:`requests.PreparedRequest`
+
+        :param timeout: as for :py:meth:`request`
+
+        :param verify: whether to verify the server's TLS certificate, or
+            the path of the CA bundle with which to verify it
+        :type verify: :py:class:`bool` or :py:class:`str`
+
+        :Returns: the response's status code, reason, headers and body
+        :rtype: :py:class:`tuple` of :py:class:`int`, :py:class:`str`,
+            :py:class:`dict` and :py:class:`bytes`
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release any connections held.
+        """
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    Sends requests through a :py:class:`requests.Session`.
+    """
+    def __init__(self, session=None):
+        """
+        :param session: the session through which to send (default: a new
+            one)
+        :type session: :py:class:`requests.Session`
+        """
+        self.session = session or requests.Session()
+
+    def request(self, method, url, **kwargs):
+        return self.session.request(method, url, **kwargs)
+
+    def send(self, request, timeout=None, verify=True):
+        response = self.session.send(request, timeout=timeout, verify=verify,
+            allow_redirects=False)
+        return (response.status_code, response.reason, response.headers,
+                response.content)
+
+    def close(self):
+        self.session.close()
+
+
+class Urllib3Transport(Transport):
+    """
+    Sends requests through thread-safe :py:class:`urllib3.PoolManager`
+    connection pools, one per setting of `verify`. Redirects are not
+    followed, and no request is retried by urllib3 itself, so that retries
+    are left to the DataCenter's `retry_policy`.
+
+    Requires the :py:mod:`urllib3` package (not a dependency of smartdc
+    itself), imported once such a transport is created.
+    """
+    def __init__(self, pool_connections=10, pool_maxsize=10):
+        """
+        :param pool_connections: number of per-host connection pools to keep
+        :type pool_connections: :py:class:`int`
+
+        :param pool_maxsize: maximum number of connections kept alive per
+            host
+        :type pool_maxsize: :py:class:`int`
+        """
+        import urllib3
+        self._urllib3 = urllib3
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._managers = {}
+        self._lock = threading.Lock()
+
+    def manager(self, verify=True):
+        """
+        :Returns: the connection pools for requests verified as given
+        :rtype: :py:class:`urllib3.PoolManager`
+        """
+        with self._lock:
+            manager = self._managers.get(verify)
+            if manager is None:
+                if verify:
+                    tls = {'cert_reqs': 'CERT_REQUIRED', 'ca_certs':
+                           DEFAULT_CA_BUNDLE_PATH if verify is True
+                           else verify}
+                else:
+                    tls = {'cert_reqs': 'CERT_NONE'}
+                manager = self._urllib3.PoolManager(
+                    num_pools=self.pool_connections,
+                    maxsize=self.pool_maxsize, **tls)
+                self._managers[verify] = manager
+        return manager
+
+    def send(self, request, timeout=None, verify=True):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+        else:
+            connect = read = timeout
+        urllib3 = self._urllib3
+        exceptions = urllib3.exceptions
+        try:
+            response = self.manager(verify).urlopen(request.method,
+                request.url, body=request.body, headers=request.headers,
+                redirect=False, retries=False,
+                timeout=urllib3.Timeout(connect=connect, read=read))
+        except exceptions.SSLError as e:
+            raise SSLError(e, request=request)
+        except exceptions.NewConnectionError as e:
+            raise ConnectionError(e, request=request)
+        except exceptions.ConnectTimeoutError as e:
+            raise ConnectTimeout(e, request=request)
+        except exceptions.ReadTimeoutError as e:
+            raise ReadTimeout(e, request=request)
+        except exceptions.HTTPError as e:
+            raise ConnectionError(e, request=request)
+        return (response.status, response.reason, response.headers,
+                response.data)
+
+    def close(self):
+        with self._lock:
+            for manager in self._managers.values():
+                manager.clear()
+
+
+class MemoryTransport(Transport):
+    """
+    Hands each request to a function in the same process, e.g.::
+
+        api = FakeCloudAPI(machines=100)
+        sdc = DataCenter(location='local', transport=MemoryTransport(
+            api.respond), known_locations={'local': 'http://local.invalid'})
+
+    (which :py:meth:`smartdc.fakeapi.FakeCloudAPI.datacenter` does for an
+    API not started). Only the path and query of each URL reach the
+    function, and timeouts do not apply.
+    """
+    def __init__(self, respond):
+        """
+        :param respond: called with the method, path (with any query),
+            headers and body of each request, and returning the status,
+            body and headers (a :py:class:`list` of pairs) of its response
+        :type respond: callable
+        """
+        self.respond = respond
+
+    def send(self, request, timeout=None, verify=True):
+        parts = urlsplit(request.url)
+        path = parts.path + ('?' + parts.query if parts.query else '')
+        status, content, headers = self.respond(request.method, path,
+            request.headers, request.body or '')
+        if request.method == 'HEAD':
+            content = b''
+        return (status, httplib.responses.get(status, ''), dict(headers),
+                content)
@@ -0,0 +1,157 @@
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+__all__ = ['Waiter', 'OperationTimeout', 'UnexpectedTransition', 'time_limit',
+           'time_left']
+
+_scope = threading.local()
+
+
+class OperationTimeout(Exception):
+    """
+    An operation did not complete within its allotted time.
+    """
+    pass
+
+
+class UnexpectedTransition(Exception):
+    """
+    A polled resource moved into a state it was not expected to reach.
+    """
+    pass
+
+
+@contextmanager
+def time_limit(seconds):
+    """
+    :param seconds: time allowed for the body of the ``with`` block, or
+        ``None`` to keep any enclosing limit
+    :type seconds: :py:class:`float`
+
+    Bound everything the current thread does within the ``with`` block,
+    such as ``with time_limit(30): machine.delete_metadata_at_key('foo')``,
+    which makes two requests. Each request made inside the block has its
+    connect and read timeouts cut to the time left, and none is started
+    once the time is up; waits such as :py:meth:`Waiter.wait` give up at
+    the limit too. Either way, :py:class:`OperationTimeout` is raised.
+    Limits may be nested, the earliest one applying.
+    """
+    outer = getattr(_scope, 'finish', None)
+    finish = outer
+    if seconds is not None:
+        finish = time.time() + seconds
+        if outer is not None:
+            finish = min(finish, outer)
+    _scope.finish = finish
+    try:
+        yield
+    finally:
+        _scope.finish = outer
+
+
+def time_left():
+    """
+    :Returns: seconds left (possibly negative) until the innermost
+        :py:func:`time_limit` of the current thread, or ``None`` if there is
+        no limit
+    :rtype: :py:class:`float`
+    """
+    finish = getattr(_scope, 'finish', None)
+    if finish is None:
+        return None
+    return finish - time.time()
+
+
+class Waiter(object):
+    """
+    Repeatedly polls for a state until a condition is met.
+
+    The pause between polls starts at `interval` seconds and grows by a
+    factor of `backoff` after each poll, up to `max_interval`. Each pause is
+    randomly shortened by up to the fraction `jitter`, so that many waiters
+    started together do not poll in lockstep.
+    """
+    def __init__(self, interval=2, backoff=1.5, max_interval=30, jitter=0.1,
+            timeout=None, transitions=None):
+        """
+        :param interval: initial pause in seconds between polls
+        :type interval: :py:class:`float`
+
+        :param backoff: factor by which the pause grows after each poll
+        :type backoff: :py:class:`float`
+
+        :param max_interval: longest pause in seconds between polls
+        :type max_interval: :py:class:`float`
+
+        :param jitter: fraction by which each pause is randomly shortened
+        :type jitter: :py:class:`float`
+
+        :param timeout: seconds after which to give up, raising
+            :py:class:`OperationTimeout` (any enclosing :py:func:`time_limit`
+            applies as well)
+        :type timeout: :py:class:`float`
+
+        :param transitions: mapping of each state to the states it is expected
+            to move to, such as ``{'provisioning': ('running',)}``
+        :type transitions: :py:class:`dict`
+
+        A change from a state listed in `transitions` to a state not listed
+        for it raises :py:class:`UnexpectedTransition` straight away, rather
+        than waiting for a target that will never be reached. Changes from
+        unlisted states are not checked.
+        """
+        self.interval = interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.transitions = transitions or {}
+
+    def pauses(self):
+        """
+        Generate the successive (jittered) pauses between polls.
+        """
+        pause = self.interval
+        while True:
+            spread = 1 - random.uniform(0, self.jitter)
+            yield min(pause, self.max_interval) * spread
+            pause *= self.backoff
+
+    def wait(self, poll, condition):
+        """
+        :param poll: called to fetch the current state
+        :type poll: callable
+
+        :param condition: called with each state, returning whether to stop
+        :type condition: callable
+
+        :Returns: the state that met the `condition`
+        :raises: :py:class:`OperationTimeout` or
+            :py:class:`UnexpectedTransition`
+        """
+        start = time.time()
+        previous = None
+        pauses = self.pauses()
+        while True:
+            state = poll()
+            if (previous in self.transitions and state != previous and
+                    state not in self.transitions[previous]):
+                raise UnexpectedTransition('unexpected transition from '
+                    '{0!r} to {1!r}'.format(previous, state))
+            if condition(state):
+                return state
+            previous = state
+            pause = next(pauses)
+            remaining = time_left()
+            if self.timeout is not None:
+                own = start + self.timeout - time.time()
+                if remaining is None or own < remaining:
+                    remaining = own
+            if remaining is not None:
+                if remaining <= 0:
+                    raise OperationTimeout('still {0!r} after {1:.1f}s'.format(
+                        state, time.time() - start))
+                pause = min(pause, remaining)
+            time.sleep(pause)
@@ -0,0 +1,204 @@
+import time
+
+from requests.exceptions import HTTPError
+
+from .waiter import OperationTimeout, time_left
+
+__all__ = ['FleetWatcher']
+
+
+class FleetWatcher(object):
+    """
+    Tracks the state of many machines at once.
+
+    Where :py:meth:`smartdc.machine.Machine.poll_until` fetches each machine
+    individually, a :py:class:`smartdc.watcher.FleetWatcher` observes its
+    whole set of machines with one (paged) machine listing per poll, so the
+    load on the CloudAPI grows with the number of pages rather than with the
+    number of machines being waited upon.
+    """
+    def __init__(self, datacenter, machines=None, state=None, tags=None,
+            interval=2):
+        """
+        :param datacenter: datacenter that contains the machines
+        :type datacenter: :py:class:`smartdc.datacenter.DataCenter`
+
+        :param machines: machines to watch
+        :type machines: iterable of :py:class:`smartdc.machine.Machine`\s
+
+        :param state: only list machines in this state on each poll
+        :type state: :py:class:`basestring`
+
+        :param tags: only list machines with these tags on each poll
+        :type tags: :py:class:`dict`
+
+        :param interval: pause in seconds between polls
+        :type interval: :py:class:`int`
+
+        Narrowing the listing with `state` or `tags` reduces the number of
+        pages per poll. Without a `state` filter, a watched machine missing
+        from the listing is fetched on its own (once it is confirmed
+        ``deleted``, it is no longer fetched).
+        """
+        self.datacenter = datacenter
+        self.state = state
+        self.tags = tags
+        self.interval = interval
+        self.machines = {}
+        for machine in machines or []:
+            self.add(machine)
+
+    def __repr__(self):
+        return '<{module}.{cls}: {n} machines in {dc}>'.format(
+            module=self.__module__, cls=self.__class__.__name__,
+            n=len(self.machines), dc=str(self.datacenter))
+
+    def add(self, machine):
+        """
+        :param machine: an additional machine to watch
+        :type machine: :py:class:`smartdc.machine.Machine`
+        """
+        self.machines[machine.id] = machine
+
+    def discard(self, machine):
+        """
+        :param machine: a machine to stop watching
+        :type machine: :py:class:`smartdc.machine.Machine` or
+            :py:class:`basestring`
+        """
+        self.machines.pop(getattr(machine, 'id', machine), None)
+
+    def poll(self):
+        """
+        ::
+
+            GET /:login/machines
+            GET /:login/machines/:id
+
+        :Returns: mapping of watched machine IDs to their current states
+        :rtype: :py:class:`dict`
+
+        Fetch the listing once, and update each watched
+        :py:class:`smartdc.machine.Machine` with its latest data. Without a
+        `state` filter, each watched machine missing from the listing is then
+        fetched by itself, unless already known to be ``deleted``: machines
+        created or deleted while the listing is paged shift its offsets, so
+        that a machine may be skipped.
+        """
+        return self._poll(self.machines)
+
+    def _poll(self, pending):
+        """
+        Poll as :py:meth:`poll` does, fetching only the missing machines
+        whose IDs are in `pending`, and reporting the last known state of
+        the others.
+        """
+        params = self.datacenter._machine_params(state=self.state,
+            tags=self.tags)
+        states = {}
+        for page in self.datacenter._machine_pages(params):
+            for data in page:
+                machine = self.machines.get(data.get('id'))
+                if machine is not None:
+                    machine._save(data)
+                    states[machine.id] = machine.state
+        if not self.state:
+            for machine_id, machine in self.machines.items():
+                if machine_id in states:
+                    continue
+                if machine.state == 'deleted' or machine_id not in pending:
+                    states[machine_id] = machine.state
+                else:
+                    states[machine_id] = self._confirm(machine)
+        return states
+
+    def _confirm(self, machine):
+        """
+        Fetch the state of a watched machine missing from the listing,
+        ``deleted`` if it is not found.
+        """
+        try:
+            machine.refresh()
+        except HTTPError as e:
+            if e.response is None or e.response.status_code not in (404, 410):
+                raise
+            machine.state = 'deleted'
+        return machine.state
+
+    def events(self, target, timeout=None, callback=None):
+        """
+        ::
+
+            GET /:login/machines
+
+        :param target: state for all the machines to reach, or a mapping of
+            machines (or the IDs of watched machines) to the state each
+            should reach; machines not yet watched are added
+        :type target: :py:class:`basestring` or :py:class:`dict`
+
+        :param timeout: seconds after which to give up waiting
+        :type timeout: :py:class:`float`
+
+        :param callback: called with each machine as it reaches its target
+        :type callback: callable
+
+        :Returns: a ``(machine, state)`` tuple for each watched machine as it
+            reaches its target state
+        :rtype: generator of :py:class:`tuple`\s
+        :raises: :py:class:`smartdc.waiter.OperationTimeout` if the
+            `timeout` passes first, or :py:class:`KeyError` if the `target`
+            names the ID of a machine not watched
+
+        Poll every `interval` seconds until all watched machines have reached
+        their targets, or any enclosing :py:func:`smartdc.waiter.time_limit`
+        passes.
+        """
+        if isinstance(target, dict):
+            targets = {}
+            for machine, state in target.items():
+                if hasattr(machine, 'id'):
+                    self.add(machine)
+                targets[getattr(machine, 'id', machine)] = state
+            unknown = [machine_id for machine_id in targets
+                       if machine_id not in self.machines]
+            if unknown:
+                raise KeyError('not watching machines %s' %
+                    ', '.join(sorted(unknown)))
+        else:
+            targets = dict((machine_id, target) for machine_id in self.machines)
+        start = time.time()
+        finish = timeout and start + timeout
+        left = time_left()
+        if left is not None and (not finish or start + left < finish):
+            finish = start + left
+        while True:
+            states = self._poll(targets)
+            for machine_id, state in targets.items():
+                if states.get(machine_id) == state:
+                    del targets[machine_id]
+                    machine = self.machines[machine_id]
+                    if callback:
+                        callback(machine)
+                    yield (machine, state)
+            if not targets:
+                return
+            if finish and time.time() + self.interval > finish:
+                raise OperationTimeout('{0} machines still pending after '
+                    '{1:.1f}s'.format(len(targets), time.time() - start))
+            time.sleep(self.interval)
+
+    def wait(self, target, timeout=None, callback=None):
+        """
+        ::
+
+            GET /:login/machines
+
+        :Returns: the watched machines in the order in which they reached
+            their targets
+        :rtype: :py:class:`list` of :py:class:`smartdc.machine.Machine`\s
+
+        Block until all watched machines have reached their target states,
+        as with :py:meth:`events`.
+        """
+        return [machine for machine, _ in self.events(target,
+                timeout=timeout, callback=callback)]
@@ -0,0 +1,84 @@
+import time
+import unittest
+
+from requests.exceptions import HTTPError
+
+from smartdc.asyncdc import AsyncDataCenter
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.waiter import OperationTimeout, time_left, time_limit
+
+
+class AsyncDataCenterTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeCloudAPI(machines=5, latency=0.1, transition_delay=0)
+        self.api.start()
+        self.sdc = self.api.datacenter(cls=AsyncDataCenter, workers=5)
+
+    def tearDown(self):
+        self.sdc.close()
+        self.api.stop()
+
+    def test_async_methods_run_concurrently(self):
+        start = time.time()
+        listing = self.sdc.machines_async()
+        catalog = self.sdc.request_async('GET', 'packages')
+        machines = listing.get(5)
+        packages, _ = catalog.get(5)
+        self.assertTrue(time.time() - start < 0.18)
+        self.assertEqual(len(machines), 5)
+        self.assertEqual(len(packages), 4)
+        machine_id = machines[0].id
+        data = self.sdc.raw_machine_data_async(machine_id).get(5)
+        self.assertEqual(data['id'], machine_id)
+        created = self.sdc.create_machine_async(name='new').get(5)
+        self.assertEqual(created.name, 'new')
+
+    def test_submit(self):
+        machine = self.sdc.machines()[0]
+        self.assertEqual(self.sdc.submit(machine.status).get(5), 'running')
+        self.assertEqual(self.sdc.submit(lambda a, b=0: a + b, 1, b=2).get(5),
+                         3)
+
+    def test_submit_within_time_limit(self):
+        self.assertEqual(self.sdc.submit(time_left).get(5), None)
+        with time_limit(0.15):
+            left = self.sdc.submit(time_left)
+        self.assertTrue(0 < left.get(5) <= 0.15)
+
+    def test_time_limit_counted_from_submission(self):
+        sdc = self.api.datacenter(cls=AsyncDataCenter, workers=1)
+        try:
+            with time_limit(0.15):
+                sdc.submit(time.sleep, 0.2)
+                # queued behind the sleep, it starts after the limit
+                late = sdc.submit(sdc.packages)
+            self.assertRaises(OperationTimeout, late.get, 5)
+            self.assertEqual(self.api.requests.get(('GET', 'packages')), None)
+        finally:
+            sdc.close()
+
+    def test_errors_raised_by_get(self):
+        result = self.sdc.request_async('GET', 'machines/missing')
+        self.assertRaises(HTTPError, result.get, 5)
+        result.wait(5)
+        self.assertTrue(result.ready())
+        self.assertFalse(result.successful())
+
+    def test_close_waits_for_queued_calls(self):
+        results = [self.sdc.request_async('GET', 'packages')
+                   for _ in range(10)]
+        self.sdc.close()
+        self.assertTrue(all(result.ready() for result in results))
+        self.assertEqual(self.sdc._pool, None)
+        # a new pool is started upon the next call
+        self.assertEqual(len(self.sdc.submit(self.sdc.packages).get(5)), 4)
+
+    def test_derived_datacenter_stays_async(self):
+        derived = self.sdc.datacenter('local')
+        self.assertTrue(isinstance(derived, AsyncDataCenter))
+        self.assertTrue(derived.pool is self.sdc.pool)
+        self.assertEqual(len(derived.machines_async().get(5)), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+
+from requests.exceptions import HTTPError
+
+from smartdc import breaker as breaker_module
+from smartdc.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.hooks import RequestHook
+
+URL = 'https://us-west-1.api.joyentcloud.com'
+
+PACKAGES = ('GET', 'packages')
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class Recorder(RequestHook):
+    def __init__(self):
+        self.circuits = []
+        self.errors = []
+        self.fail_before = False
+
+    def before(self, event):
+        if self.fail_before:
+            self.fail_before = False
+            raise RuntimeError('hook failed')
+
+    def error(self, event):
+        self.errors.append(event.error)
+
+    def circuit(self, event, previous):
+        self.circuits.append((previous, event.circuit))
+
+
+class BreakerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.real_time = breaker_module.time
+        breaker_module.time = self.clock
+        self.breaker = CircuitBreaker(error_rate=0.5, window=4,
+            min_requests=4, cooldown=30)
+
+    def tearDown(self):
+        breaker_module.time = self.real_time
+
+
+class CircuitBreakerTest(BreakerTestCase):
+    def fail(self, times):
+        for _ in range(times):
+            self.assertTrue(self.breaker.allow(URL)[2])
+            self.breaker.record(URL, True)
+
+    def test_closed_open_half_open_closed(self):
+        self.breaker.record(URL, False)
+        self.fail(2)
+        self.assertEqual(self.breaker.state(URL), CLOSED)
+        self.fail(1)
+        self.assertEqual(self.breaker.state(URL), OPEN)
+        self.assertEqual(self.breaker.allow(URL), (OPEN, OPEN, False))
+
+        self.clock.now += 29
+        self.assertEqual(self.breaker.allow(URL), (OPEN, OPEN, False))
+        self.clock.now += 1
+        self.assertEqual(self.breaker.allow(URL), (OPEN, HALF_OPEN, True))
+        # a single trial at a time
+        self.assertEqual(self.breaker.allow(URL),
+                         (HALF_OPEN, HALF_OPEN, False))
+        self.assertEqual(self.breaker.record(URL, False),
+                         (HALF_OPEN, CLOSED))
+        self.assertEqual(self.breaker.allow(URL), (CLOSED, CLOSED, True))
+
+    def test_failed_trial_reopens(self):
+        self.fail(4)
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow(URL)[2])
+        self.assertEqual(self.breaker.record(URL, True), (HALF_OPEN, OPEN))
+        self.clock.now += 29
+        self.assertFalse(self.breaker.allow(URL)[2])
+        self.clock.now += 1
+        self.assertTrue(self.breaker.allow(URL)[2])
+
+    def test_released_trial(self):
+        self.fail(4)
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow(URL)[2])
+        self.breaker.release(URL)
+        self.assertEqual(self.breaker.allow(URL),
+                         (HALF_OPEN, HALF_OPEN, True))
+
+    def test_slow_call(self):
+        breaker = CircuitBreaker(slow_call=1, window=2, min_requests=2)
+        breaker.record(URL, False, 2)
+        breaker.record(URL, False, 0.5)
+        self.assertEqual(breaker.state(URL), OPEN)
+
+
+class DataCenterBreakerTest(BreakerTestCase):
+    def setUp(self):
+        BreakerTestCase.setUp(self)
+        self.api = FakeCloudAPI(error_rate=1)
+        self.hook = Recorder()
+        self.sdc = self.api.datacenter(retry=False, hooks=[self.hook],
+            circuit_breaker=self.breaker, http_cache=False)
+        for _ in range(4):
+            self.assertRaises(HTTPError, self.sdc.packages)
+
+    def test_open_circuit_reported(self):
+        self.assertEqual(self.hook.circuits, [(CLOSED, OPEN)])
+        self.assertRaises(CircuitOpen, self.sdc.packages)
+        self.assertEqual(self.api.requests[PACKAGES], 4)
+        self.assertTrue(isinstance(self.hook.errors[-1], CircuitOpen))
+
+        self.api.error_rate = 0
+        self.clock.now += 30
+        self.sdc.packages()
+        self.assertEqual(self.hook.circuits, [(CLOSED, OPEN),
+            (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)])
+        self.assertEqual(self.api.requests[PACKAGES], 5)
+
+    def test_trial_released_when_hook_fails(self):
+        self.api.error_rate = 0
+        self.clock.now += 30
+        self.hook.fail_before = True
+        self.assertRaises(RuntimeError, self.sdc.packages)
+        self.assertEqual(self.api.requests[PACKAGES], 4)
+        self.assertEqual(self.breaker.state(self.sdc.base_url), HALF_OPEN)
+        # the trial was given back, so the next attempt is let through
+        self.sdc.packages()
+        self.assertEqual(self.breaker.state(self.sdc.base_url), CLOSED)
+        self.assertEqual(self.api.requests[PACKAGES], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
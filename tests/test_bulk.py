@@ -0,0 +1,72 @@
+import time
+import unittest
+
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.waiter import OperationTimeout
+
+FETCH = ('GET', 'machines/:id')
+
+
+def refreshing(times):
+    def action(machine):
+        for _ in range(times):
+            machine.refresh()
+        return machine.id
+    return action
+
+
+class BulkTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeCloudAPI(machines=10, latency=0.05, transition_delay=0)
+        self.sdc = self.api.datacenter()
+        self.machines = self.sdc.machines()
+
+    def test_results_and_errors(self):
+        def action(machine):
+            if machine.name.endswith('3'):
+                raise ValueError(machine.name)
+            return machine.id
+
+        outcomes = list(self.sdc.bulk(action, self.machines, concurrency=4))
+        self.assertEqual(sorted(m.id for m, _, _ in outcomes),
+                         sorted(m.id for m in self.machines))
+        for machine, result, error in outcomes:
+            if machine.name.endswith('3'):
+                self.assertEqual(result, None)
+                self.assertTrue(isinstance(error, ValueError))
+            else:
+                self.assertEqual(result, machine.id)
+                self.assertEqual(error, None)
+
+    def test_action_by_name(self):
+        outcomes = list(self.sdc.bulk('stop', self.machines[:3]))
+        self.assertEqual([error for _, _, error in outcomes], [None] * 3)
+        self.assertEqual(self.api.requests[('POST', 'machines/:id')], 3)
+
+    def test_operation_timeout(self):
+        start = time.time()
+        outcomes = list(self.sdc.bulk(refreshing(10), self.machines[:4],
+            concurrency=4, timeout=0.12))
+        self.assertTrue(time.time() - start < 0.4)
+        self.assertEqual(len(outcomes), 4)
+        for machine, result, error in outcomes:
+            self.assertEqual(result, None)
+            self.assertTrue(isinstance(error, OperationTimeout))
+
+    def test_no_requests_after_deadline(self):
+        outcomes = list(self.sdc.bulk(refreshing(3), self.machines,
+            concurrency=2, deadline=0.3))
+        self.assertEqual(sorted(m.id for m, _, _ in outcomes),
+                         sorted(m.id for m in self.machines))
+        timed_out = [m for m, _, error in outcomes
+                     if isinstance(error, OperationTimeout)]
+        self.assertTrue(timed_out)
+        fetched = self.api.requests[FETCH]
+        # operations never started are skipped, not run after the deadline
+        self.assertTrue(fetched < 3 * len(self.machines))
+        time.sleep(0.3)
+        self.assertEqual(self.api.requests[FETCH], fetched)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,263 @@
+import time
+import threading
+import unittest
+
+from requests.exceptions import HTTPError
+
+from smartdc.cache import HTTPCache, SingleFlight, TTLCache
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.machine import Machine
+from smartdc.waiter import OperationTimeout, time_left, time_limit
+
+
+def run_together(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_callers_modifying_their_value(self):
+        flight = SingleFlight()
+        callers = 20
+
+        def compute():
+            # hold the call until every other caller has joined it
+            deadline = time.time() + 5
+            while flight.merged < callers - 1 and time.time() < deadline:
+                time.sleep(0.001)
+            return {'items': [1, 2, 3]}
+
+        seen = []
+
+        def call():
+            value = flight.do('key', compute)
+            seen.append(list(value['items']))
+            value['items'].pop()
+            del value['items']
+
+        run_together(callers, call)
+        self.assertEqual(flight.merged, callers - 1)
+        self.assertEqual(seen, [[1, 2, 3]] * callers)
+        self.assertEqual(len(flight), 0)
+
+    def test_error_shared(self):
+        flight = SingleFlight()
+        errors = []
+
+        def compute():
+            time.sleep(0.05)
+            raise ValueError('boom')
+
+        def call():
+            try:
+                flight.do('key', compute)
+            except ValueError as e:
+                errors.append(e)
+
+        run_together(5, call)
+        self.assertEqual(len(errors), 5)
+
+    def test_leader_timeout_not_shared(self):
+        flight = SingleFlight()
+        calls = []
+        outcomes = {}
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            if time_left() <= 0:
+                raise OperationTimeout('out of time')
+            return 'value'
+
+        def call(name, limit, delay):
+            time.sleep(delay)
+            with time_limit(limit):
+                try:
+                    outcomes[name] = flight.do('key', compute,
+                        timeout=time_left())
+                except OperationTimeout as e:
+                    outcomes[name] = e
+
+        hasty = threading.Thread(target=call, args=('hasty', 0.05, 0))
+        patient = threading.Thread(target=call, args=('patient', 5, 0.02))
+        hasty.start()
+        patient.start()
+        hasty.join()
+        patient.join()
+        self.assertTrue(isinstance(outcomes['hasty'], OperationTimeout))
+        self.assertEqual(outcomes['patient'], 'value')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(flight.merged, 0)
+
+
+class TTLCacheTest(unittest.TestCase):
+    def test_expired_entry_discarded(self):
+        cache = TTLCache(ttl={'machines': 0.01})
+        cache.fetch('machines', 'a', lambda: 1)
+        time.sleep(0.02)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.fetch('machines', 'a', lambda: 2), 2)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.fetch('machines', 'a', lambda: 3), 2)
+
+    def test_bounded(self):
+        cache = TTLCache(max_entries=10)
+        for key in range(100):
+            cache.fetch('machines', key, lambda: {'id': key})
+        self.assertEqual(len(cache), 10)
+        # the least recently used are evicted first
+        cache.fetch('machines', 90, lambda: None)
+        cache.fetch('machines', 100, lambda: None)
+        self.assertEqual(cache.fetch('machines', 90, lambda: None),
+                         {'id': 90})
+        self.assertEqual(cache.fetch('machines', 91, lambda: None), None)
+
+
+class CatalogTTLTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeCloudAPI()
+
+    def test_reused_within_ttl(self):
+        sdc = self.api.datacenter(catalog_ttl=60)
+        packages = sdc.packages()
+        packages[0]['name'] = 'changed'
+        self.assertNotEqual(sdc.packages(), packages)
+        sdc.package('g3-standard-1-smartos')
+        sdc.package('g3-standard-1-smartos')
+        sdc.images()
+        sdc.images()
+        self.assertEqual(self.api.requests[('GET', 'packages')], 1)
+        self.assertEqual(self.api.requests[('GET', 'packages/:package')], 1)
+        self.assertEqual(self.api.requests[('GET', 'images')], 1)
+
+    def test_invalidate(self):
+        sdc = self.api.datacenter(catalog_ttl=60)
+        sdc.packages()
+        sdc.images()
+        sdc.invalidate('packages')
+        sdc.packages()
+        sdc.images()
+        self.assertEqual(self.api.requests[('GET', 'packages')], 2)
+        self.assertEqual(self.api.requests[('GET', 'images')], 1)
+        sdc.invalidate()
+        sdc.images()
+        self.assertEqual(self.api.requests[('GET', 'images')], 2)
+
+    def test_expiry(self):
+        sdc = self.api.datacenter(catalog_ttl={'packages': 0.05})
+        sdc.packages()
+        sdc.packages()
+        sdc.images()
+        sdc.images()
+        self.assertEqual(self.api.requests[('GET', 'packages')], 1)
+        # kinds without a maximum age are not reused
+        self.assertEqual(self.api.requests[('GET', 'images')], 2)
+        time.sleep(0.06)
+        sdc.packages()
+        self.assertEqual(self.api.requests[('GET', 'packages')], 2)
+
+
+class Response(object):
+    def __init__(self, content, etag='"1"'):
+        self.status_code = 200
+        self.content = content
+        self.headers = {'etag': etag, 'content-type': 'application/json'}
+
+
+def evict_on_validation(cache):
+    """
+    Make the entries of `cache` go between sending their validators and
+    the 304 answering them.
+    """
+    validators = cache.validators
+
+    def evicting(key):
+        headers = validators(key)
+        cache.invalidate(key)
+        return headers
+
+    cache.validators = evicting
+
+
+class NotModifiedAPI(FakeCloudAPI):
+    """
+    Answers every request but the first with 304 Not Modified.
+    """
+    def respond(self, method, path, headers, body):
+        result = FakeCloudAPI.respond(self, method, path, headers, body)
+        if sum(self.requests.values()) > 1:
+            return 304, '', []
+        return result
+
+
+class HTTPCacheTest(unittest.TestCase):
+    def test_not_modified(self):
+        api = FakeCloudAPI()
+        sdc = api.datacenter()
+        first, r = sdc.request('GET', 'packages')
+        self.assertEqual(r.status_code, 200)
+        second, r = sdc.request('GET', 'packages')
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(second, first)
+        second[0]['name'] = 'changed'
+        third, _ = sdc.request('GET', 'packages')
+        self.assertEqual(third, first)
+        self.assertEqual(api.requests[('GET', 'packages')], 3)
+
+    def test_refetched_once_evicted(self):
+        api = FakeCloudAPI()
+        sdc = api.datacenter()
+        first, _ = sdc.request('GET', 'packages')
+        evict_on_validation(sdc.http_cache)
+        second, r = sdc.request('GET', 'packages')
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(second, first)
+        self.assertEqual(api.requests[('GET', 'packages')], 3)
+
+    def test_not_modified_without_validators(self):
+        api = NotModifiedAPI()
+        sdc = api.datacenter(retry=False)
+        sdc.request('GET', 'packages')
+        evict_on_validation(sdc.http_cache)
+        self.assertRaises(HTTPError, sdc.request, 'GET', 'packages')
+        self.assertEqual(api.requests[('GET', 'packages')], 3)
+
+    def test_bounded_by_bytes(self):
+        cache = HTTPCache(max_bytes=25)
+        for key in 'abc':
+            cache.store(key, Response(key * 10))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.size, 20)
+        self.assertEqual(cache.validators('a'), {})
+        self.assertEqual(cache.lookup('b'), ('b' * 10, 'application/json'))
+        cache.store('d', Response('d' * 10))
+        # b was used more recently than c
+        self.assertEqual(cache.lookup('c'), None)
+        self.assertEqual(cache.validators('b'), {'If-None-Match': '"1"'})
+        cache.store('e', Response('e' * 30))
+        self.assertEqual(cache.lookup('e'), None)
+        self.assertEqual(cache.size, 20)
+
+
+class CoalescedMachineTest(unittest.TestCase):
+    def test_boot_script_kept_by_every_caller(self):
+        api = FakeCloudAPI(latency=0.05, transition_delay=0)
+        sdc = api.datacenter()
+        machine_id = sdc.create_machine(name='m',
+            metadata={'user-script': '#!/bin/sh'}).id
+        machines = []
+
+        def fetch():
+            machines.append(Machine(sdc, machine_id=machine_id))
+
+        run_together(20, fetch)
+        self.assertTrue(sdc.single_flight.merged > 0)
+        self.assertEqual([m.boot_script for m in machines],
+                         ['#!/bin/sh'] * 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
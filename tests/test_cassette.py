@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from requests.auth import AuthBase
+
+from smartdc.cassette import Cassette, CassetteMiss
+from smartdc.datacenter import DataCenter
+from smartdc.fakeapi import FakeCloudAPI
+
+SIGNATURE = 'Signature keyId="/my/keys/x",algorithm="rsa-sha1" c2VjcmV0'
+
+
+class SigningAuth(AuthBase):
+    def __call__(self, request):
+        request.headers['Authorization'] = SIGNATURE
+        return request
+
+
+class CassetteTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'fleet.json')
+        with FakeCloudAPI(machines=3) as api:
+            self.known_locations = api.known_locations
+            with Cassette(self.path, mode='record') as cassette:
+                sdc = api.datacenter(cassette=cassette)
+                sdc.auth = SigningAuth()
+                self.machines = [m.name for m in sdc.machines()]
+                self.packages = sdc.packages()
+            self.served = sum(api.requests.values())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def replaying(self):
+        cassette = Cassette(self.path)
+        self.assertEqual(cassette.mode, 'replay')
+        return DataCenter(location='local', cassette=cassette,
+            known_locations=self.known_locations)
+
+    def test_replay_without_server(self):
+        sdc = self.replaying()
+        self.assertEqual([m.name for m in sdc.machines()], self.machines)
+        self.assertEqual(sdc.packages(), self.packages)
+        self.assertEqual(len(sdc.cassette.interactions), self.served)
+
+    def test_unrecorded_request(self):
+        sdc = self.replaying()
+        self.assertRaises(CassetteMiss, sdc.images)
+
+    def test_signature_scrubbed(self):
+        with open(self.path) as f:
+            recorded = f.read()
+        self.assertTrue('machine-00000' in recorded)
+        self.assertFalse('c2VjcmV0' in recorded)
+        self.assertFalse('authorization' in recorded.lower())
+
+
+class CassetteTransportTest(unittest.TestCase):
+    def test_memory_transport_recorded_and_replayed(self):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'memory.json')
+        try:
+            with Cassette(path, mode='record') as cassette:
+                sdc = FakeCloudAPI(machines=3).datacenter(cassette=cassette)
+                machines = [m.name for m in sdc.machines()]
+            self.assertEqual(len(cassette.interactions), 1)
+
+            empty = FakeCloudAPI()
+            sdc = empty.datacenter(cassette=Cassette(path))
+            self.assertEqual([m.name for m in sdc.machines()], machines)
+            self.assertEqual(empty.requests, {})
+            self.assertRaises(CassetteMiss, sdc.images)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_derived_datacenter_wrapped_once(self):
+        cassette = Cassette(mode='record')
+        sdc = FakeCloudAPI().datacenter(cassette=cassette)
+        derived = sdc.datacenter('local')
+        self.assertTrue(derived.transport is sdc.transport)
+        derived.packages()
+        self.assertEqual(len(cassette.interactions), 1)
+
+
+class NotModifiedReplayTest(unittest.TestCase):
+    def check(self, api, replayed):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'packages.json')
+        try:
+            with Cassette(path, mode='record') as cassette:
+                sdc = api.datacenter(cassette=cassette)
+                packages = sdc.packages()
+                self.assertEqual(sdc.packages(), packages)
+            statuses = [i['response']['status']
+                        for i in cassette.interactions]
+            self.assertEqual(statuses, [200, 304])
+
+            # fresh DataCenters, without cached copies, share the cassette:
+            # the unconditional GET of each gets the 200, never the 304
+            cassette = Cassette(path)
+            for _ in range(2):
+                sdc = replayed(cassette)
+                self.assertEqual(sdc.packages(), packages)
+                self.assertEqual(sdc.packages(), packages)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_session(self):
+        with FakeCloudAPI() as api:
+            self.check(api, lambda cassette: DataCenter(location='local',
+                cassette=cassette, known_locations=api.known_locations))
+
+    def test_transport(self):
+        empty = FakeCloudAPI()
+        self.check(FakeCloudAPI(),
+                   lambda cassette: empty.datacenter(cassette=cassette))
+        self.assertEqual(empty.requests, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from smartdc import _version
+from smartdc import datacenter as datacenter_module
+from smartdc.fakeapi import FakeCloudAPI
+
+
+class DerivedDataCenterTest(unittest.TestCase):
+    def test_shared_components(self):
+        with FakeCloudAPI() as api:
+            sdc = api.datacenter(catalog_ttl=60, rate_limit=100,
+                circuit_breaker=True, hedge=True)
+            clone = sdc.datacenter('local')
+            self.assertTrue(clone is not sdc)
+            for attr in ('session', 'transport', 'http_cache',
+                         'catalog_cache', 'rate_limiter', 'retry_policy',
+                         'key_cache', 'single_flight', 'circuit_breaker',
+                         'hedge_policy', 'auth'):
+                self.assertTrue(getattr(clone, attr) is getattr(sdc, attr),
+                                attr)
+            self.assertEqual(clone.hooks, sdc.hooks)
+            clone.packages()
+            self.assertEqual(api.connections, 1)
+            sdc.packages()
+            # the clone's keep-alive connection was reused
+            self.assertEqual(api.connections, 1)
+
+
+class UserAgentTest(unittest.TestCase):
+    def setUp(self):
+        self.saved = (_version._versions, _version.run_command,
+                      datacenter_module._user_agent)
+        _version._versions = None
+        datacenter_module._user_agent = None
+        self.commands = []
+        _version.run_command = lambda *args, **kwargs: \
+            self.commands.append(args)
+
+    def tearDown(self):
+        (_version._versions, _version.run_command,
+         datacenter_module._user_agent) = self.saved
+
+    def test_no_subprocess_on_request(self):
+        with FakeCloudAPI() as api:
+            api.datacenter().packages()
+        self.assertEqual(self.commands, [])
+        self.assertTrue(datacenter_module.user_agent().startswith(
+            'py-smartdc ('))
+
+    def test_version_already_looked_up(self):
+        _version._versions = {'version': '1.2.3', 'full': ''}
+        self.assertEqual(datacenter_module.user_agent(), 'py-smartdc (1.2.3)')
+        self.assertEqual(self.commands, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import time
+import threading
+import unittest
+
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.hedge import HedgePolicy
+from smartdc.hooks import RequestHook
+
+PACKAGES = ('GET', 'packages')
+
+
+class Latencies(object):
+    """
+    Delays the responses to successive requests by the given seconds, and
+    notes when each request arrives.
+    """
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.arrivals = []
+        self._lock = threading.Lock()
+
+    def __call__(self, method, template):
+        with self._lock:
+            self.arrivals.append(time.time())
+            if len(self.delays) > 1:
+                return self.delays.pop(0)
+            return self.delays[0]
+
+
+class Hedges(RequestHook):
+    def __init__(self):
+        self.answered = []
+
+    def after(self, event):
+        self.answered.append(event.hedge)
+
+
+class HedgeTest(unittest.TestCase):
+    def datacenter(self, latency, **kwargs):
+        self.api = FakeCloudAPI(latency=latency)
+        self.hook = Hedges()
+        self.policy = HedgePolicy(**kwargs)
+        return self.api.datacenter(hedge=self.policy, hooks=[self.hook],
+            http_cache=False, retry=False)
+
+    def test_hedge_after_delay_wins(self):
+        latency = Latencies(0.5, 0.01)
+        sdc = self.datacenter(latency, delay=0.1)
+        start = time.time()
+        sdc.packages()
+        self.assertTrue(time.time() - start < 0.3)
+        first, second = latency.arrivals
+        self.assertTrue(0.09 <= second - first < 0.3)
+        self.assertEqual(self.policy.hedged, 1)
+        self.assertEqual(self.policy.won, 1)
+        self.assertEqual(self.hook.answered, [True])
+
+    def test_loser_released(self):
+        latency = Latencies(0.3, 0.01)
+        sdc = self.datacenter(latency, delay=0.05)
+        sdc.packages()
+        time.sleep(0.4)
+        # the slower attempt completed, unread, and both workers are idle
+        self.assertEqual(self.hook.answered, [True, False])
+        self.assertEqual(self.policy.workers.idle, 2)
+        self.assertEqual(self.policy.workers.tasks.qsize(), 0)
+        self.assertEqual(self.api.requests[PACKAGES], 2)
+        # the workers are reused for the next request
+        sdc.packages()
+        time.sleep(0.05)
+        self.assertEqual(self.policy.workers.idle, 2)
+
+    def test_first_response_cancels_hedge(self):
+        sdc = self.datacenter(Latencies(0.01), delay=0.2)
+        for _ in range(5):
+            sdc.packages()
+        time.sleep(0.3)
+        self.assertEqual(self.policy.hedged, 0)
+        self.assertEqual(self.api.requests[PACKAGES], 5)
+        # a worker is idle only once it has handed over its response, so
+        # the next request may start another, but no more are needed
+        self.assertTrue(1 <= self.policy.workers.idle <= 2)
+        self.assertEqual(self.policy.timers.pending, [])
+
+    def test_budget_spent(self):
+        sdc = self.datacenter(Latencies(0.1), delay=0.01, budget_ratio=0,
+            budget_reserve=2)
+        for _ in range(4):
+            sdc.packages()
+        self.assertEqual(self.policy.hedged, 2)
+        self.assertEqual(self.api.requests[PACKAGES], 6)
+
+    def test_post_never_hedged(self):
+        sdc = self.datacenter(Latencies(0.2), delay=0.01)
+        sdc.add_key('k', 'ssh-rsa AAAA')
+        self.assertEqual(self.api.requests[('POST', 'keys')], 1)
+        self.assertEqual(self.policy.hedged, 0)
+        self.assertRaises(ValueError, HedgePolicy, methods=['GET', 'POST'])
+
+
+if __name__ == '__main__':
+    unittest.main()
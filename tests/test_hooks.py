@@ -0,0 +1,141 @@
+import unittest
+from StringIO import StringIO
+
+from requests.exceptions import HTTPError
+
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.hooks import Histogram, LatencyCollector, VerboseHook, \
+    path_template
+from smartdc.retry import RetryPolicy
+
+MACHINE = '0b6e8f3a-1c2d-4e5f-8a9b-0c1d2e3f4a5b'
+
+
+class PathTemplateTest(unittest.TestCase):
+    def test_identifiers_collapsed(self):
+        self.assertEqual(path_template('machines'), 'machines')
+        self.assertEqual(path_template('/machines/' + MACHINE + '/'),
+                         'machines/:id')
+        self.assertEqual(path_template('machines/%s/metadata/foo' % MACHINE),
+                         'machines/:id/metadata/:key')
+        self.assertEqual(path_template('machines/%s/tags/role' % MACHINE),
+                         'machines/:id/tags/:tag')
+        self.assertEqual(path_template('machines/%s/snapshots/s1' % MACHINE),
+                         'machines/:id/snapshots/:name')
+        self.assertEqual(path_template('packages/Small 1GB'),
+                         'packages/:package')
+        self.assertEqual(path_template('keys/laptop'), 'keys/:key')
+        self.assertEqual(path_template('datacenters/us-west-1'),
+                         'datacenters/:name')
+
+    def test_query_and_unknown_collections(self):
+        self.assertEqual(path_template('machines?offset=1000&limit=1000'),
+                         'machines')
+        self.assertEqual(path_template('widgets/w1'), 'widgets/:id')
+        self.assertEqual(path_template(''), '/')
+
+
+class HistogramTest(unittest.TestCase):
+    def test_quantiles_of_known_samples(self):
+        histogram = Histogram(buckets=(1, 2, 3, 4))
+        self.assertEqual(histogram.quantile(0.5), None)
+        # ten values in each of the four buckets
+        for bucket in range(4):
+            for i in range(10):
+                histogram.observe(bucket + (i + 1) / 10.0)
+        self.assertEqual(histogram.count, 40)
+        self.assertEqual(histogram.counts, [10, 10, 10, 10, 0])
+        self.assertEqual(histogram.max, 4.0)
+        self.assertAlmostEqual(histogram.sum, 4 * 5.5 + 10 * 6)
+        self.assertAlmostEqual(histogram.quantile(0.25), 1.0)
+        self.assertAlmostEqual(histogram.quantile(0.5), 2.0)
+        self.assertAlmostEqual(histogram.quantile(0.6), 2.4)
+        self.assertAlmostEqual(histogram.quantile(0.95), 3.8)
+        self.assertAlmostEqual(histogram.quantile(1), 4.0)
+
+    def test_beyond_last_bucket_bounded_by_max(self):
+        histogram = Histogram(buckets=(1,))
+        for value in (0.5, 5, 10):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2])
+        self.assertAlmostEqual(histogram.quantile(1), 10.0)
+        self.assertAlmostEqual(histogram.quantile(2 / 3.0), 5.5)
+        # an estimate never exceeds the largest value observed
+        histogram = Histogram(buckets=(1, 2))
+        histogram.observe(0.2)
+        self.assertAlmostEqual(histogram.quantile(1), 0.2)
+
+
+class LatencyCollectorTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeCloudAPI(machines=3)
+        self.collector = LatencyCollector()
+        self.sdc = self.api.datacenter(hooks=[self.collector],
+            http_cache=False, retry=False)
+
+    def test_counts_per_template(self):
+        machines = self.sdc.machines()
+        for machine in machines:
+            self.sdc.raw_machine_data(machine.id)
+        self.sdc.raw_machine_data(machines[0].id)
+        self.assertRaises(HTTPError, self.sdc.raw_machine_data, 'missing')
+        stats = self.collector.stats()
+        self.assertEqual(sorted(stats),
+                         [('GET', 'machines'), ('GET', 'machines/:id')])
+        listing = stats[('GET', 'machines')]
+        self.assertEqual((listing['count'], listing['errors']), (1, 0))
+        self.assertEqual(listing['statuses'], {200: 1})
+        self.assertTrue(listing['bytes'] > 0)
+        machine = stats[('GET', 'machines/:id')]
+        self.assertEqual((machine['count'], machine['errors']), (5, 1))
+        self.assertEqual(machine['statuses'], {200: 4, 404: 1})
+        self.assertAlmostEqual(machine['mean'], machine['total'] / 5)
+        self.assertTrue(machine['p50'] <= machine['p99'] <= machine['max'])
+
+        summary = self.collector.summary().splitlines()
+        self.assertEqual(summary[0].split()[:3],
+                         ['endpoint', 'count', 'errors'])
+        self.assertEqual(len(summary), 3)
+        self.collector.reset()
+        self.assertEqual(self.collector.stats(), {})
+
+    def test_retries_counted(self):
+        self.api.error_rate = 1
+        sdc = self.api.datacenter(hooks=[self.collector], http_cache=False,
+            retry=RetryPolicy(retries=2, backoff=0))
+        self.assertRaises(HTTPError, sdc.packages)
+        stats = self.collector.stats()[('GET', 'packages')]
+        self.assertEqual((stats['count'], stats['errors']), (3, 3))
+        self.assertEqual(stats['statuses'], {503: 3})
+
+
+class VerboseHookTest(unittest.TestCase):
+    def test_output(self):
+        api = FakeCloudAPI(error_rate=1)
+        stream = StringIO()
+        sdc = api.datacenter(hooks=[VerboseHook(stream)], http_cache=False,
+            retry=RetryPolicy(retries=1, backoff=0, jitter=0))
+        self.assertRaises(HTTPError, sdc.packages)
+        lines = stream.getvalue().splitlines()
+        url = sdc.base_url + '/my/packages'
+        # each attempt, the body of each error response, and the retry
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[0].split('\t')[1:], ['GET', url])
+        self.assertTrue('ServiceUnavailable' in lines[1])
+        self.assertEqual(lines[2].split('\t')[1],
+                         'retrying GET %s in 0.00s after 503' % url)
+        self.assertEqual(lines[3].split('\t')[1:], ['GET', url])
+        self.assertEqual(lines[4], lines[1])
+
+        # successful responses print only the request line
+        api.error_rate = 0
+        stream.truncate(0)
+        sdc.packages()
+        line, = stream.getvalue().splitlines()
+        timestamp, method, requested = line.split('\t')
+        self.assertEqual((method, requested), ('GET', url))
+        self.assertTrue(timestamp[:4].isdigit())
+
+
+if __name__ == '__main__':
+    unittest.main()
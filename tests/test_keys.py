@@ -0,0 +1,85 @@
+import base64
+import struct
+import unittest
+
+from requests.exceptions import HTTPError
+
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.keys import KeyCache, fingerprint
+
+
+def blob(*parts):
+    return ''.join(struct.pack('>I', len(p)) + p for p in parts)
+
+
+class Key(object):
+    def __init__(self, name):
+        self.name = name
+
+    def get_fingerprint(self):
+        return self.name.ljust(16, '\0')
+
+    def sign_ssh_data(self, rng, data):
+        return blob('ssh-rsa', 'sig-' + self.name)
+
+
+class Signer(object):
+    def __init__(self, keys):
+        self._agent_key = keys[0]
+        self._keys = keys[1:]
+
+
+class Auth(object):
+    headers = None
+    signature_string_head = ('Signature keyId="/my/keys/x",'
+                             'algorithm="rsa-sha1" %s')
+
+    def __init__(self, keys):
+        self.signer = Signer(keys)
+
+
+class KeyedCloudAPI(FakeCloudAPI):
+    """
+    Answers with the status given for the key each request is signed with.
+    """
+    def __init__(self, statuses, **kwargs):
+        FakeCloudAPI.__init__(self, **kwargs)
+        self.statuses = statuses
+
+    def respond(self, method, path, headers, body):
+        signature = headers.get('authorization', '').rsplit(' ', 1)[-1]
+        name = base64.b64decode(signature).split('sig-', 1)[-1]
+        status = self.statuses.get(name, 200)
+        if status != 200:
+            return status, '{"code":"Error"}', [('Content-Type',
+                                                 'application/json')]
+        return FakeCloudAPI.respond(self, method, path, headers, body)
+
+
+class KeyCacheTest(unittest.TestCase):
+    def datacenter(self, statuses):
+        api = KeyedCloudAPI(statuses)
+        cache = KeyCache()
+        sdc = api.datacenter(key_cache=cache, retry=False)
+        sdc.auth = Auth([Key('first'), Key('second')])
+        return sdc, cache
+
+    def test_accepted_key_stored(self):
+        sdc, cache = self.datacenter({'first': 401})
+        sdc.packages()
+        self.assertEqual(cache.lookup(sdc.location, sdc.login),
+                         fingerprint(Key('second')))
+
+    def test_failed_key_not_stored(self):
+        sdc, cache = self.datacenter({'first': 401, 'second': 500})
+        self.assertRaises(HTTPError, sdc.packages)
+        self.assertEqual(cache.lookup(sdc.location, sdc.login), None)
+
+    def test_forbidden_key_not_stored(self):
+        sdc, cache = self.datacenter({'first': 403})
+        self.assertRaises(HTTPError, sdc.packages)
+        self.assertEqual(cache.lookup(sdc.location, sdc.login), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
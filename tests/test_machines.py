@@ -0,0 +1,76 @@
+import unittest
+
+from smartdc.fakeapi import FakeCloudAPI
+
+LIST = ('GET', 'machines')
+
+
+def names(machines):
+    return [m.name for m in machines]
+
+
+def expected(start, stop):
+    return ['machine-%05d' % i for i in range(start, stop)]
+
+
+class IterMachinesTest(unittest.TestCase):
+    def listing(self, count, **kwargs):
+        api = FakeCloudAPI(machines=count)
+        sdc = api.datacenter()
+        return api, names(sdc.iter_machines(**kwargs))
+
+    def test_empty_account(self):
+        api, listed = self.listing(0)
+        self.assertEqual(listed, [])
+        self.assertEqual(api.requests[LIST], 1)
+
+    def test_single_machine(self):
+        api, listed = self.listing(1)
+        self.assertEqual(listed, expected(0, 1))
+        self.assertEqual(api.requests[LIST], 1)
+
+    def test_stops_at_resource_count(self):
+        api, listed = self.listing(2500)
+        self.assertEqual(listed, expected(0, 2500))
+        self.assertEqual(api.requests[LIST], 3)
+
+    def test_page_size_and_offset(self):
+        api, listed = self.listing(2500, page_size=700, offset=100)
+        self.assertEqual(listed, expected(100, 2500))
+        self.assertEqual(api.requests[LIST], 4)
+
+    def test_machines_collects_every_page(self):
+        api = FakeCloudAPI(machines=2500)
+        self.assertEqual(names(api.datacenter().machines()),
+                         expected(0, 2500))
+
+
+class PrefetchMachinesTest(unittest.TestCase):
+    def listing(self, count, **kwargs):
+        api = FakeCloudAPI(machines=count, latency=0.01)
+        sdc = api.datacenter()
+        return api, names(sdc.machines(workers=4, **kwargs))
+
+    def test_empty_account(self):
+        api, listed = self.listing(0)
+        self.assertEqual(listed, [])
+        self.assertEqual(api.requests[LIST], 1)
+
+    def test_single_machine(self):
+        api, listed = self.listing(1)
+        self.assertEqual(listed, expected(0, 1))
+        self.assertEqual(api.requests[LIST], 1)
+
+    def test_pages_kept_in_order(self):
+        api, listed = self.listing(2500, limit=300)
+        self.assertEqual(listed, expected(0, 2500))
+        self.assertEqual(api.requests[LIST], 9)
+
+    def test_offset(self):
+        api, listed = self.listing(2500, offset=100)
+        self.assertEqual(listed, expected(100, 2500))
+        self.assertEqual(api.requests[LIST], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.hooks import RequestHook
+from smartdc.metrics import MetricsCollector
+
+
+class Broken(Exception):
+    pass
+
+
+class RaisingHook(RequestHook):
+    def __init__(self, callback):
+        self.callback = callback
+
+    def before(self, event):
+        if self.callback == 'before':
+            raise Broken()
+
+    def after(self, event):
+        if self.callback == 'after':
+            raise Broken()
+
+
+class InFlightTest(unittest.TestCase):
+    def check(self, callback):
+        first, last = MetricsCollector(), MetricsCollector()
+        sdc = FakeCloudAPI().datacenter(
+            hooks=[first, RaisingHook(callback), last], retry=False)
+        for _ in range(3):
+            self.assertRaises(Broken, sdc.packages)
+        self.assertEqual(first.in_flight, {sdc.location: 0})
+        self.assertEqual(sum(first.requests.values()), 3)
+        self.assertFalse(any(last.in_flight.values()))
+
+    def test_raising_before(self):
+        self.check('before')
+
+    def test_raising_after(self):
+        self.check('after')
+
+    def test_in_flight_exported(self):
+        collector = MetricsCollector()
+        sdc = FakeCloudAPI().datacenter(
+            hooks=[collector, RaisingHook('before')])
+        self.assertRaises(Broken, sdc.packages)
+        self.assertTrue('smartdc_requests_in_flight{location="%s"} 0'
+                        % sdc.location in collector.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
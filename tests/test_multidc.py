@@ -0,0 +1,101 @@
+import socket
+import time
+import unittest
+
+from requests.exceptions import ConnectionError
+
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.multidc import MultiDataCenter
+from smartdc.waiter import OperationTimeout, time_limit
+
+
+def refused_url():
+    # a port just released, on which nothing listens
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return 'http://127.0.0.1:%d' % port
+
+
+class MultiDataCenterTest(unittest.TestCase):
+    def setUp(self):
+        self.east = FakeCloudAPI(machines=2, name='east').start()
+        self.west = FakeCloudAPI(machines=3, name='west').start()
+        self.slow = FakeCloudAPI(machines=1, name='slow', latency=1).start()
+        self.locations = {'east': self.east.url, 'west': self.west.url,
+                          'slow': self.slow.url, 'down': refused_url()}
+        self.sdc = self.east.datacenter(known_locations=self.locations,
+            retry=False)
+
+    def tearDown(self):
+        for api in (self.east, self.west, self.slow):
+            api.stop()
+
+    def test_merged_results(self):
+        multi = MultiDataCenter(self.sdc, locations=['west', 'east'])
+        machines, errors = multi.machines()
+        self.assertEqual(errors, {})
+        self.assertEqual([(m.name, m.datacenter.location) for m in machines],
+            [('machine-00000', 'west'), ('machine-00001', 'west'),
+             ('machine-00002', 'west'), ('machine-00000', 'east'),
+             ('machine-00001', 'east')])
+        packages, errors = multi.packages()
+        self.assertEqual(errors, {})
+        self.assertEqual(len(packages), 8)
+        self.assertEqual([p['location'] for p in packages],
+                         ['west'] * 4 + ['east'] * 4)
+        self.assertEqual(self.west.requests[('GET', 'machines')], 1)
+        self.assertEqual(self.east.requests[('GET', 'machines')], 1)
+
+    def test_per_location_results(self):
+        multi = MultiDataCenter(self.sdc, locations=['east', 'west'])
+        results, errors = multi.call('num_machines')
+        self.assertEqual(results, {'east': 2, 'west': 3})
+        self.assertEqual(errors, {})
+        completed = list(multi.each(lambda dc, n: (dc.location, n), 1))
+        self.assertEqual(sorted(completed), [
+            ('east', ('east', 1), None), ('west', ('west', 1), None)])
+        # the given DataCenter serves its own location; the others are
+        # derived from it once
+        self.assertTrue(multi.location('east') is self.sdc)
+        self.assertTrue(multi.location('west') is multi.location('west'))
+        self.assertTrue(multi.location('west').session is self.sdc.session)
+
+    def test_errors_do_not_abort_others(self):
+        multi = MultiDataCenter(self.sdc, timeout=5)
+        self.assertEqual(multi.locations, ['down', 'east', 'slow', 'west'])
+        machines, errors = multi.machines()
+        self.assertEqual(sorted(errors), ['down'])
+        self.assertTrue(isinstance(errors['down'], ConnectionError))
+        self.assertEqual(sorted(set(m.datacenter.location for m in machines)),
+                         ['east', 'slow', 'west'])
+        self.assertEqual(len(machines), 6)
+
+        results, errors = multi.call('raw_machine_data', 'missing')
+        self.assertEqual(results, {})
+        self.assertEqual(sorted(errors), ['down', 'east', 'slow', 'west'])
+
+    def test_timeout(self):
+        multi = MultiDataCenter(self.sdc, timeout=0.3)
+        start = time.time()
+        machines, errors = multi.machines()
+        # the sweep takes as long as the timeout, not the slow location
+        self.assertTrue(time.time() - start < 0.8)
+        self.assertEqual(sorted(errors), ['down', 'slow'])
+        self.assertTrue(isinstance(errors['slow'], OperationTimeout))
+        self.assertEqual(len(machines), 5)
+
+    def test_enclosing_time_limit(self):
+        multi = MultiDataCenter(self.sdc, locations=['east', 'slow'],
+            timeout=5)
+        start = time.time()
+        with time_limit(0.3):
+            results, errors = multi.call('num_machines')
+        self.assertTrue(time.time() - start < 0.8)
+        self.assertEqual(results, {'east': 2})
+        self.assertTrue(isinstance(errors['slow'], OperationTimeout))
+
+
+if __name__ == '__main__':
+    unittest.main()
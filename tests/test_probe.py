@@ -0,0 +1,35 @@
+import ssl
+import unittest
+
+from smartdc import probe
+from smartdc.probe import LocationProbe
+
+LOCATIONS = {'near': 'https://near.invalid', 'far': 'https://far.invalid',
+             'forged': 'https://forged.invalid'}
+
+
+def measure(url, timeout=None, verify=True):
+    if 'forged' in url:
+        raise ssl.CertificateError("hostname 'forged.invalid' doesn't match")
+    rtt = 0.01 if 'near' in url else 0.1
+    return {'connect': rtt, 'tls': rtt, 'rtt': rtt}
+
+
+class LocationProbeTest(unittest.TestCase):
+    def setUp(self):
+        self.real_measure = probe.measure
+        probe.measure = measure
+
+    def tearDown(self):
+        probe.measure = self.real_measure
+
+    def test_certificate_mismatch_unreachable(self):
+        locations = LocationProbe(LOCATIONS)
+        self.assertEqual(locations.probe(), ['near', 'far'])
+        error = locations.results['forged']['error']
+        self.assertTrue(isinstance(error, ssl.CertificateError))
+        self.assertEqual(locations.results['forged']['score'], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
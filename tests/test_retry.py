@@ -0,0 +1,63 @@
+import unittest
+
+from requests.exceptions import HTTPError
+
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.retry import RetryBudget, RetryPolicy
+from smartdc.throttle import TokenBucket
+
+
+class ThrottledRetryTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeCloudAPI(rate_limit=50)
+        self.policy = RetryPolicy(budget_reserve=2)
+
+    def test_throttled_retries_spare_the_budget(self):
+        sdc = self.api.datacenter(retry=self.policy)
+        for _ in range(80):
+            sdc.packages()
+        self.assertTrue(self.api.throttled > sdc.retry_budget.reserve)
+        self.assertEqual(sdc.retry_budget.balance, 2)
+
+    def test_rate_limiter_with_budget(self):
+        sdc = self.api.datacenter(retry=self.policy,
+            rate_limit=TokenBucket(100))
+        for _ in range(80):
+            sdc.packages()
+        self.assertTrue(self.api.throttled > 0)
+
+    def test_unpaced_failures_drawn_from_budget(self):
+        api = FakeCloudAPI(error_rate=1)
+        sdc = api.datacenter(retry=RetryPolicy(backoff=0, budget_reserve=2))
+        self.assertRaises(HTTPError, sdc.packages)
+        self.assertTrue(sdc.retry_budget.balance < 1)
+
+
+class Response(object):
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class RetryBudgetTest(unittest.TestCase):
+    def setUp(self):
+        self.policy = RetryPolicy(retries=10)
+        self.budget = RetryBudget(ratio=0, reserve=2)
+
+    def delays(self, resp):
+        return [self.policy.delay('GET', 0, resp=resp, budget=self.budget)
+                for _ in range(4)]
+
+    def test_throttled_paced_by_server(self):
+        delays = self.delays(Response(429, {'retry-after': '1'}))
+        self.assertEqual(delays, [1, 1, 1, 1])
+        self.assertEqual(self.budget.balance, 2)
+
+    def test_unavailable_drawn_from_budget(self):
+        delays = self.delays(Response(503, {'retry-after': '1'}))
+        self.assertEqual(delays, [1, 1, None, None])
+        self.assertTrue(self.budget.balance < 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import time
+import unittest
+
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.throttle import TokenBucket
+from smartdc.waiter import OperationTimeout, time_limit
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_invalid_rate_or_burst(self):
+        self.assertRaises(ValueError, TokenBucket, 0)
+        self.assertRaises(ValueError, TokenBucket, -1)
+        self.assertRaises(ValueError, TokenBucket, 10, burst=0)
+        self.assertRaises(ValueError, TokenBucket, 10, burst=0.5)
+        self.assertEqual(TokenBucket(0.5).burst, 1)
+
+    def test_wait_within_timeout(self):
+        bucket = TokenBucket(20, burst=1)
+        bucket.acquire()
+        self.assertTrue(bucket.acquire(timeout=1) > 0)
+
+    def test_wait_beyond_timeout(self):
+        bucket = TokenBucket(1, burst=1)
+        bucket.acquire()
+        start = time.time()
+        self.assertRaises(OperationTimeout, bucket.acquire, timeout=0.5)
+        self.assertTrue(time.time() - start < 0.1)
+        self.assertTrue(bucket.tokens < 1)
+
+    def test_hold_beyond_timeout(self):
+        bucket = TokenBucket(100)
+        bucket.hold(5)
+        self.assertRaises(OperationTimeout, bucket.acquire, timeout=1)
+
+    def test_request_within_time_limit(self):
+        sdc = FakeCloudAPI().datacenter(rate_limit=TokenBucket(1, burst=1))
+        sdc.packages()
+        start = time.time()
+        with time_limit(0.5):
+            self.assertRaises(OperationTimeout, sdc.packages)
+        self.assertTrue(time.time() - start < 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
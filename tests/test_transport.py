@@ -0,0 +1,109 @@
+import json
+import socket
+import unittest
+
+from requests.exceptions import ConnectionError, HTTPError, ReadTimeout
+
+from smartdc.datacenter import DataCenter
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.hooks import RequestHook
+from smartdc.retry import RetryPolicy
+from smartdc.transport import (MemoryTransport, RequestsTransport,
+                               Urllib3Transport)
+
+HEADERS = {'Accept': 'application/json',
+           'Content-Type': 'application/json; charset=UTF-8'}
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class Attempts(RequestHook):
+    def __init__(self):
+        self.count = 0
+
+    def before(self, event):
+        self.count += 1
+
+
+class TransportTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeCloudAPI().start()
+        self.transports = [RequestsTransport(), Urllib3Transport(),
+                           MemoryTransport(self.api.respond)]
+
+    def tearDown(self):
+        for transport in self.transports:
+            transport.close()
+        self.api.stop()
+
+    def exchange(self, method, path, data=None):
+        responses = [transport.request(method, self.api.url + '/my/' + path,
+                         data=data, headers=HEADERS, timeout=5)
+                     for transport in self.transports]
+        statuses = set(r.status_code for r in responses)
+        self.assertEqual(len(statuses), 1, statuses)
+        for r in responses:
+            self.assertEqual(r.headers['content-type'], 'application/json')
+            self.assertEqual(r.url, self.api.url + '/my/' + path)
+        return responses
+
+    def test_get(self):
+        responses = self.exchange('GET', 'packages')
+        self.assertEqual(responses[0].status_code, 200)
+        self.assertEqual(len(set(r.content for r in responses)), 1)
+        self.assertEqual(len(set(r.headers['etag'] for r in responses)), 1)
+        for r in responses:
+            self.assertEqual(r.json(), responses[0].json())
+            self.assertEqual(r.reason, 'OK')
+
+    def test_post(self):
+        body = json.dumps({'name': 'k', 'key': 'ssh-rsa AAAA'})
+        responses = self.exchange('POST', 'keys', data=body)
+        self.assertEqual(responses[0].status_code, 201)
+        for r in responses:
+            self.assertEqual(r.json()['name'], 'k')
+            self.assertEqual(r.json()['key'], 'ssh-rsa AAAA')
+
+    def test_not_found(self):
+        responses = self.exchange('GET', 'machines/missing')
+        self.assertEqual(responses[0].status_code, 404)
+        self.assertEqual(len(set(r.content for r in responses)), 1)
+        for r in responses:
+            self.assertEqual(r.json()['code'], 'ResourceNotFound')
+            self.assertRaises(HTTPError, r.raise_for_status)
+
+    def test_connection_refused(self):
+        url = 'http://127.0.0.1:%d/my/packages' % free_port()
+        for transport in self.transports[:2]:
+            self.assertRaises(ConnectionError, transport.request, 'GET', url,
+                headers=HEADERS, timeout=5)
+
+    def test_refused_connection_retried_alike(self):
+        # a refused connection was never sent, so even a POST is retried,
+        # as many times whichever the transport
+        url = 'http://127.0.0.1:%d' % free_port()
+        for transport in self.transports[:2]:
+            attempts = Attempts()
+            sdc = DataCenter(location='down', known_locations={'down': url},
+                transport=transport, hooks=[attempts],
+                retry=RetryPolicy(retries=3, backoff=0, jitter=0))
+            self.assertRaises(ConnectionError, sdc.add_key, 'k',
+                'ssh-rsa AAAA')
+            self.assertEqual(attempts.count, 4, transport)
+
+    def test_read_timeout(self):
+        with FakeCloudAPI(latency=0.5) as slow:
+            for transport in self.transports[:2]:
+                self.assertRaises(ReadTimeout, transport.request, 'GET',
+                    slow.url + '/my/packages', headers=HEADERS,
+                    timeout=(5, 0.1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+
+from smartdc import waiter as waiter_module
+from smartdc.machine import Machine
+from smartdc.waiter import (OperationTimeout, UnexpectedTransition, Waiter,
+                            time_limit)
+
+
+class FakeClock(object):
+    """
+    Stands in for the :py:mod:`time` module, sleeping without delay.
+    """
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def polling(states):
+    states = iter(states)
+    return lambda: next(states)
+
+
+class WaiterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.real_time = waiter_module.time
+        waiter_module.time = self.clock
+
+    def tearDown(self):
+        waiter_module.time = self.real_time
+
+    def test_backoff_up_to_max_interval(self):
+        waiter = Waiter(interval=1, backoff=2, max_interval=5, jitter=0)
+        state = waiter.wait(polling(['a'] * 6 + ['b']), lambda s: s == 'b')
+        self.assertEqual(state, 'b')
+        self.assertEqual(self.clock.sleeps, [1, 2, 4, 5, 5, 5])
+
+    def test_jitter_shortens_pauses(self):
+        waiter = Waiter(interval=1, backoff=2, max_interval=8, jitter=0.25)
+        pauses = waiter.pauses()
+        for nominal in [1, 2, 4, 8, 8]:
+            pause = next(pauses)
+            self.assertTrue(0.75 * nominal <= pause <= nominal)
+
+    def test_timeout(self):
+        waiter = Waiter(interval=1, backoff=2, jitter=0, timeout=10)
+        self.assertRaises(OperationTimeout, waiter.wait,
+            lambda: 'pending', lambda s: False)
+        # the last pause is cut short at the timeout
+        self.assertEqual(self.clock.sleeps, [1, 2, 4, 3])
+
+    def test_time_limit(self):
+        waiter = Waiter(interval=1, backoff=1, jitter=0, timeout=100)
+        with time_limit(2.5):
+            self.assertRaises(OperationTimeout, waiter.wait,
+                lambda: 'pending', lambda s: False)
+        self.assertEqual(self.clock.sleeps, [1, 1, 0.5])
+
+    def test_unexpected_transition(self):
+        waiter = Waiter(interval=1, jitter=0,
+            transitions={'stopping': ('stopped',)})
+        self.assertRaises(UnexpectedTransition, waiter.wait,
+            polling(['stopping', 'running']), lambda s: s == 'stopped')
+        self.assertEqual(len(self.clock.sleeps), 1)
+
+
+class MachinePollTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.real_time = waiter_module.time
+        waiter_module.time = self.clock
+        self.machine = Machine(None, data={'id': 'abc', 'state':
+            'provisioning', 'created': '2013-01-01T00:00:00'})
+
+    def tearDown(self):
+        waiter_module.time = self.real_time
+
+    def test_provisioning_failed(self):
+        self.machine.status = polling(['provisioning', 'failed'])
+        self.assertRaises(UnexpectedTransition, self.machine.poll_until,
+            'running')
+        self.assertEqual(len(self.clock.sleeps), 1)
+
+    def test_waiting_for_failed(self):
+        self.machine.status = polling(['provisioning', 'failed'])
+        self.assertEqual(self.machine.poll_until('failed'), 'failed')
+
+    def test_poll_while(self):
+        self.machine.status = polling(['stopping', 'stopping', 'stopped'])
+        self.assertEqual(self.machine.poll_while('stopping', interval=1),
+                         'stopped')
+
+
+if __name__ == '__main__':
+    unittest.main()
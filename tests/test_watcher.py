@@ -0,0 +1,62 @@
+import uuid
+import unittest
+
+from smartdc.fakeapi import FakeCloudAPI
+from smartdc.machine import Machine
+from smartdc.watcher import FleetWatcher
+
+FETCH = ('GET', 'machines/:id')
+
+
+def ghost(sdc):
+    return Machine(sdc, data={'id': str(uuid.uuid4()), 'state': 'running',
+                              'created': '2013-01-01T00:00:00'})
+
+
+class FleetWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeCloudAPI(machines=10, transition_delay=0)
+        self.sdc = self.api.datacenter()
+
+    def test_missing_machines_confirmed_once(self):
+        gone = [ghost(self.sdc) for _ in range(200)]
+        watcher = FleetWatcher(self.sdc, self.sdc.machines() + gone)
+        for _ in range(3):
+            states = watcher.poll()
+        self.assertEqual(self.api.requests[FETCH], 200)
+        self.assertEqual(set(states[m.id] for m in gone), set(['deleted']))
+
+    def test_reached_machines_not_fetched(self):
+        gone = [ghost(self.sdc) for _ in range(50)]
+        watcher = FleetWatcher(self.sdc, gone, interval=0)
+        self.assertEqual(len(watcher.wait('deleted')), 50)
+        self.assertEqual(self.api.requests[FETCH], 50)
+
+        pending = ghost(self.sdc)
+        watcher.add(pending)
+        watcher.wait({pending: 'deleted'})
+        self.assertEqual(self.api.requests[FETCH], 51)
+
+    def test_skipped_machine_not_deleted(self):
+        machines = self.sdc.machines()
+        skipped = machines[0]
+        pages = self.sdc._machine_pages
+
+        def skipping(params):
+            for page in pages(params):
+                yield [data for data in page if data['id'] != skipped.id]
+
+        self.sdc._machine_pages = skipping
+        watcher = FleetWatcher(self.sdc, machines)
+        self.assertEqual(watcher.poll()[skipped.id], 'running')
+
+    def test_unknown_id_in_target(self):
+        watcher = FleetWatcher(self.sdc, self.sdc.machines()[:2])
+        target = dict((machine_id, 'running') for machine_id in
+                      list(watcher.machines) + ['no-such-machine'])
+        self.assertRaises(KeyError, watcher.wait, target, timeout=1)
+        self.assertEqual(self.api.requests.get(('GET', 'machines')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
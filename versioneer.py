@@ -275,16 +275,27 @@ tag_prefix = "%(TAG_PREFIX)s"
 parentdir_prefix = "%(PARENTDIR_PREFIX)s"
 versionfile_source = "%(VERSIONFILE_SOURCE)s"
 
-def get_versions(default={"version": "unknown", "full": ""}, verbose=False):
+_versions = None
+
+def get_versions(default={"version": "unknown", "full": ""}, verbose=False,
+                 vcs=True):
+    # finding the version may run git, so only do it once per process; with
+    # vcs=False, git is not run, and `default` is returned if it is needed
+    global _versions
+    if _versions is not None:
+        return _versions
     variables = { "refnames": git_refnames, "full": git_full }
     ver = versions_from_expanded_variables(variables, tag_prefix, verbose)
-    if not ver:
+    if not ver and vcs:
         ver = versions_from_vcs(tag_prefix, versionfile_source, verbose)
     if not ver:
         ver = versions_from_parentdir(parentdir_prefix, versionfile_source,
                                       verbose)
     if not ver:
+        if not vcs:
+            return default
         ver = default
+    _versions = ver
     return ver
 
 '''
@@ -485,7 +496,7 @@ SHORT_VERSION_PY = """
 
 version_version = '%(version)s'
 version_full = '%(full)s'
-def get_versions(default={}, verbose=False):
+def get_versions(default={}, verbose=False, vcs=True):
     return {'version': version_version, 'full': version_full}
 
 """